@@ -0,0 +1,78 @@
+"""Shared setup for the benchmark scripts: a throwaway database and fixtures."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path: str | None = None, database: dict | None = None, **db_options) -> str:
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    # بنچمارک‌ها تک‌پروسه‌اند و نباید به Redis نیاز داشته باشند
+    os.environ.setdefault("EXHIBITION_CHANNEL_LAYER", "local")
+
+    import django
+    from django.conf import settings
+
+    if database is not None:
+        settings.DATABASES["default"] = database
+    elif db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="exhibition-bench-"), "bench.sqlite3")
+    if db_path is not None:
+        settings.DATABASES["default"]["NAME"] = db_path
+    settings.DATABASES["default"].setdefault("OPTIONS", {}).update(db_options)
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0, interactive=False)
+    return str(settings.DATABASES["default"]["NAME"])
+
+
+def populate(booths: int, leaders: int, capacity: int | None = None, active: bool = True) -> None:
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Group, User
+
+    from exhibition.models import Booth, BoothVisit
+
+    if capacity is None:
+        capacity = -(-leaders // booths) + 1
+
+    leaders_group, _ = Group.objects.get_or_create(name="leaders")
+    Group.objects.get_or_create(name="exhibition_admins")
+
+    Booth.objects.bulk_create(
+        Booth(name=f"booth-{i}", slug=f"booth-{i}", max_groups=capacity)
+        for i in range(booths)
+    )
+    unusable = make_password(None)
+    User.objects.bulk_create(
+        User(username=f"leader-{i}", password=unusable) for i in range(leaders)
+    )
+
+    booth_ids = list(Booth.objects.order_by("id").values_list("id", flat=True))
+    user_ids = list(
+        User.objects.filter(username__startswith="leader-").order_by("id").values_list("id", flat=True)
+    )
+    User.groups.through.objects.bulk_create(
+        User.groups.through(user_id=uid, group_id=leaders_group.id) for uid in user_ids
+    )
+
+    if active:
+        BoothVisit.objects.bulk_create(
+            BoothVisit(booth_id=booth_ids[i % len(booth_ids)], leader_id=uid, is_active=True)
+            for i, uid in enumerate(user_ids)
+        )
+
+
+def reset() -> None:
+    from django.contrib.auth.models import User
+
+    from exhibition.models import Booth
+
+    Booth.objects.all().delete()
+    User.objects.all().delete()
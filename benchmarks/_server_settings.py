@@ -0,0 +1,66 @@
+"""Settings for the ASGI server started by benchmarks.loadtest.
+
+Same as config.settings plus a middleware that reports the number of SQL
+queries each request ran in an X-Query-Count response header.
+"""
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import MIDDLEWARE
+
+MIDDLEWARE = ["benchmarks._server_settings.QueryCountMiddleware", *MIDDLEWARE]
+
+_query_count: ContextVar[list[int] | None] = ContextVar("query_count", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_counter(sender, connection, **kwargs) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class QueryCountMiddleware:
+    # sync_to_async کپی context را می‌برد، پس شمارنده‌ی ContextVar در thread های
+    # ORM هم همان شیء لیست است
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        from django.db.backends.signals import connection_created
+
+        connection_created.connect(_install_counter)
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        counter = [0]
+        token = _query_count.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        response["X-Query-Count"] = str(counter[0])
+        return response
+
+    async def _acall(self, request):
+        counter = [0]
+        token = _query_count.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        response["X-Query-Count"] = str(counter[0])
+        return response
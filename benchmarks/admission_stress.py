@@ -0,0 +1,135 @@
+"""Concurrency stress test for the admission engine: proves there is no over-admission.
+
+Every leader is driven by several threads at once, all released together by a
+barrier, so the same leader races itself on different booths while all leaders
+race each other for a handful of slots. After each round the invariants are
+checked against the database:
+
+* active visits per booth <= max_groups
+* Booth.current_visitors == active visits per booth
+* at most one active visit per leader
+
+Usage: python -m benchmarks.admission_stress [--leaders 50] [--booths 3] [--capacity 3]
+       [--rounds 20] [--threads-per-leader 2] [--backend exhibition.admission.RedisAdmissionBackend]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from ._bootstrap import populate, setup_django
+
+
+def check_invariants() -> list[str]:
+    from django.db.models import Count, Q
+
+    from exhibition.models import Booth, BoothVisit
+
+    violations = []
+    booths = Booth.objects.annotate(active=Count("visits", filter=Q(visits__is_active=True)))
+    for booth in booths:
+        if booth.active > booth.max_groups:
+            violations.append(f"booth {booth.id}: {booth.active} active > max_groups {booth.max_groups}")
+        if booth.active != booth.current_visitors:
+            violations.append(f"booth {booth.id}: counter {booth.current_visitors} != active {booth.active}")
+    doubled = (
+        BoothVisit.objects.filter(is_active=True)
+        .values("leader")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=1)
+    )
+    for row in doubled:
+        violations.append(f"leader {row['leader']}: {row['total']} active visits")
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leaders", type=int, default=50)
+    parser.add_argument("--booths", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--threads-per-leader", type=int, default=2)
+    parser.add_argument("--backend", default=None, help="Admission backend dotted path.")
+    parser.add_argument("--redis-url", default=None, help="OPTIONS url for the Redis backend.")
+    args = parser.parse_args()
+
+    setup_django(timeout=30)
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from exhibition.admission import Outcome, get_admission_backend
+    from exhibition.models import Booth
+
+    if args.backend:
+        settings.EXHIBITION_ADMISSION = {
+            "BACKEND": args.backend,
+            "OPTIONS": {"url": args.redis_url} if args.redis_url else {},
+        }
+    populate(args.booths, args.leaders, capacity=args.capacity, active=False)
+    backend = get_admission_backend()
+    backend.sync()
+
+    booths = list(Booth.objects.order_by("id"))
+    leader_ids = list(User.objects.filter(username__startswith="leader-").values_list("pk", flat=True))
+    workers = [(leader_ids[i // args.threads_per_leader]) for i in range(len(leader_ids) * args.threads_per_leader)]
+
+    outcomes: Counter = Counter()
+    violations: list[str] = []
+    lock = threading.Lock()
+
+    def verify() -> None:
+        found = check_invariants()
+        if found:
+            violations.extend(found)
+
+    barrier = threading.Barrier(len(workers), action=verify)
+
+    def run(user_id: int, seed: int) -> None:
+        rng = random.Random(seed)
+        try:
+            for _ in range(args.rounds):
+                barrier.wait()
+                booth = rng.choice(booths)
+                outcome = backend.enter(booth, user_id)
+                with lock:
+                    outcomes[outcome] += 1
+                barrier.wait()
+                if outcome is Outcome.ADMITTED and rng.random() < 0.5:
+                    result, _ = backend.exit(booth.id, user_id)
+                    with lock:
+                        outcomes[result] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(uid, i)) for i, uid in enumerate(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    attempts = sum(outcomes.values())
+    print(f"backend: {type(backend).__name__}")
+    print(f"{len(workers)} threads, {args.leaders} leaders, {args.booths} booths x {args.capacity} slots, {args.rounds} rounds")
+    print(f"{attempts} operations in {elapsed:.2f}s ({attempts / elapsed:.0f} ops/s)")
+    for outcome, count in sorted(outcomes.items(), key=lambda item: item[0].value):
+        print(f"  {outcome.value:>15}: {count}")
+
+    if violations:
+        print(f"FAILED: {len(violations)} invariant violation(s)")
+        for violation in violations[:20]:
+            print(f"  {violation}")
+        return 1
+    print("OK: no over-admission, counters consistent, one active visit per leader")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Compare database configurations under the exhibition's real mixed workload.
+
+Writer threads run enter/exit cycles through the admission engine while reader
+threads rebuild the occupancy snapshot and leader state straight from the
+database (the work behind every uncached poll). After each operation the
+thread calls close_old_connections(), exactly like the end of a request, so
+CONN_MAX_AGE decides whether the next operation reconnects.
+
+Profiles (each runs in its own process, since Django settings are per process):
+
+* sqlite-default  stock settings: rollback journal, DEFERRED transactions, no reuse
+* sqlite-tuned    config.database.sqlite_config(): WAL, synchronous=NORMAL,
+                  busy timeout, BEGIN IMMEDIATE, persistent connections
+* postgresql      config.database.postgresql_config() from EXHIBITION_DB_* env;
+                  point it at a scratch database, all booths and users are deleted
+
+Usage: python -m benchmarks.database [--profiles sqlite-default sqlite-tuned postgresql]
+       [--seconds 10] [--writers 8] [--readers 8] [--booths 20] [--leaders 100]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from ._bootstrap import BASE_DIR, populate, reset, setup_django
+
+PROFILES = ("sqlite-default", "sqlite-tuned", "postgresql")
+
+
+def _database(profile: str) -> dict:
+    from config.database import postgresql_config, sqlite_config
+
+    path = os.path.join(tempfile.mkdtemp(prefix="exhibition-bench-"), "bench.sqlite3")
+    if profile == "sqlite-default":
+        return {"ENGINE": "django.db.backends.sqlite3", "NAME": path}
+    if profile == "sqlite-tuned":
+        return sqlite_config(path)
+    return postgresql_config()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_profile(profile: str, args: argparse.Namespace) -> dict:
+    setup_django(database=_database(profile))
+
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, close_old_connections, connection
+
+    from exhibition.admission import Outcome, get_admission_backend
+    from exhibition.models import Booth
+    from exhibition.occupancy import build_snapshot, leader_state
+
+    reset()
+    populate(args.booths, args.leaders, active=False)
+    backend = get_admission_backend()
+    booths = list(Booth.objects.order_by("id"))
+    leader_ids = list(User.objects.filter(username__startswith="leader-").values_list("pk", flat=True))
+    connection.close()
+
+    latencies: dict[str, list[float]] = {"write": [], "read": []}
+    errors: Counter = Counter()
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def timed(kind: str, func) -> object:
+        start = time.perf_counter()
+        try:
+            result = func()
+        except OperationalError as exc:
+            with lock:
+                errors[str(exc).split("\n")[0][:60]] += 1
+            return None
+        finally:
+            close_old_connections()
+        with lock:
+            latencies[kind].append(time.perf_counter() - start)
+        return result
+
+    def writer(index: int) -> None:
+        user_id = leader_ids[index % len(leader_ids)]
+        step = index
+        try:
+            while time.perf_counter() < deadline:
+                booth = booths[step % len(booths)]
+                step += 1
+                outcome = timed("write", lambda: backend.enter(booth, user_id))
+                if outcome is not None:
+                    with lock:
+                        outcomes[outcome.value] += 1
+                if outcome is Outcome.ADMITTED:
+                    outcome = timed("write", lambda: backend.exit(booth.id, user_id)[0])
+                    if outcome is not None:
+                        with lock:
+                            outcomes[outcome.value] += 1
+        finally:
+            connection.close()
+
+    def reader(index: int) -> None:
+        user_id = leader_ids[index % len(leader_ids)]
+        try:
+            while time.perf_counter() < deadline:
+                timed("read", lambda: (build_snapshot(), leader_state(user_id)))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if profile == "postgresql":
+        reset()
+        connection.close()
+
+    return {
+        "profile": profile,
+        "seconds": args.seconds,
+        "writes": len(latencies["write"]),
+        "reads": len(latencies["read"]),
+        "write_p50_ms": statistics.median(latencies["write"]) * 1000 if latencies["write"] else 0.0,
+        "write_p95_ms": _percentile(latencies["write"], 95) * 1000,
+        "read_p50_ms": statistics.median(latencies["read"]) * 1000 if latencies["read"] else 0.0,
+        "read_p95_ms": _percentile(latencies["read"], 95) * 1000,
+        "outcomes": dict(outcomes),
+        "errors": dict(errors),
+    }
+
+
+def _spawn(profile: str, argv: list[str]) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.database", "--run", profile, *argv],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        return {"profile": profile, "failed": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES[:2]))
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--booths", type=int, default=20)
+    parser.add_argument("--leaders", type=int, default=100)
+    parser.add_argument("--run", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_profile(args.run, args)))
+        return 0
+
+    argv = [
+        f"--seconds={args.seconds}", f"--writers={args.writers}", f"--readers={args.readers}",
+        f"--booths={args.booths}", f"--leaders={args.leaders}",
+    ]
+    print(f"{args.writers} writers + {args.readers} readers for {args.seconds:.0f}s, "
+          f"{args.booths} booths, {args.leaders} leaders")
+    print(f"{'profile':<16}{'writes/s':>10}{'w p50ms':>9}{'w p95ms':>9}{'reads/s':>10}{'r p50ms':>9}{'r p95ms':>9}{'errors':>8}")
+    for profile in args.profiles:
+        result = _spawn(profile, argv)
+        if "failed" in result:
+            print(f"{profile:<16}failed: {' '.join(result['failed'])}")
+            continue
+        seconds = result["seconds"]
+        print(
+            f"{profile:<16}{result['writes'] / seconds:>10.0f}"
+            f"{result['write_p50_ms']:>9.1f}{result['write_p95_ms']:>9.1f}"
+            f"{result['reads'] / seconds:>10.0f}"
+            f"{result['read_p50_ms']:>9.1f}{result['read_p95_ms']:>9.1f}"
+            f"{sum(result['errors'].values()):>8}"
+        )
+        for message, count in result["errors"].items():
+            print(f"    {count} x {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Time to provision leaders: one create_user() + groups.add() per leader vs. the CSV import.
+
+The per-leader path is what leader_create did for every POST; the import path is
+exhibition.provisioning.import_leaders (process-pool hashing, bulk_create for users
+and group memberships). Both use the configured PASSWORD_HASHERS, so the hash
+dominates and the import scales with --workers (default: number of CPUs).
+
+Usage: python -m benchmarks.leader_import [--leaders 100] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from ._bootstrap import setup_django
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leaders", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import Group, User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from exhibition.provisioning import import_leaders
+
+    leaders_group, _ = Group.objects.get_or_create(name="leaders")
+    workers = args.workers or os.cpu_count() or 1
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for i in range(args.leaders):
+            user = User.objects.create_user(username=f"single-{i}", password=f"pw-{i}")
+            user.groups.add(leaders_group)
+        single = time.perf_counter() - start
+    single_queries = len(queries)
+
+    text = "username,password\n" + "\n".join(f"bulk-{i},pw-{i}" for i in range(args.leaders))
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = import_leaders(text, workers=args.workers)
+        bulk = time.perf_counter() - start
+    assert len(result["created"]) == args.leaders, result["errors"][:3]
+
+    print(f"{args.leaders} leaders, {workers} hashing worker(s), {os.cpu_count()} CPU(s)")
+    print(f"{'path':<26}{'seconds':>10}{'per 1000':>12}{'queries':>10}")
+    for label, elapsed, count in (
+        ("create_user per leader", single, single_queries),
+        ("CSV import", bulk, len(queries)),
+    ):
+        print(f"{label:<26}{elapsed:>10.2f}{elapsed / args.leaders * 1000:>11.0f}s{count:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
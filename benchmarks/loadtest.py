@@ -0,0 +1,624 @@
+"""Load test for the enter/exit/poll workload against a local ASGI (daphne) server.
+
+Simulated leaders behave like the dashboard: they poll /leader/api/status/ every
+2 s and /leader/api/all-booths-status/ every 3 s (revalidating with the last
+ETag), enter and exit booths and toggle their checklist. Simulated admins hold
+a /ws/capacity/ socket and kick random leaders out of booths.
+
+Reported per endpoint: p50/p95/p99 latency, request rate, status codes and SQL
+queries per request (the server adds an X-Query-Count header, see
+benchmarks/_server_settings.py). WebSocket fan-out delay is measured from the
+moment a successful enter/exit/kick request was sent until each admin socket
+received a capacity.update covering that booth.
+
+Results can be saved as JSON and compared with an earlier run; the comparison
+exits 1 when an endpoint's p95 or query count regressed.
+
+Usage: python -m benchmarks.loadtest [--leaders 50] [--admins 3] [--booths 10]
+       [--duration 30] [--output results.json] [--compare baseline.json]
+       [--threshold 0.2] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import base64
+import bisect
+import json
+import os
+import random
+import secrets
+import signal
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+from ._bootstrap import BASE_DIR, populate, setup_django
+
+POLL_STATUS_EVERY = 2.0
+POLL_ALL_BOOTHS_EVERY = 3.0
+# مثل capacity-wire.js، ack ها با این تاخیر (ثانیه) تجمیع می‌شوند
+ACK_DELAY = 0.05
+
+
+# ========== آمار ==========
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "max_ms": max(samples, default=0.0) * 1000,
+    }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, endpoint: str, elapsed: float, status: int, queries: int | None) -> None:
+        self.latencies[endpoint].append(elapsed)
+        self.statuses[endpoint][status] += 1
+        if queries is not None:
+            self.queries[endpoint].append(queries)
+
+
+class FanoutTracker:
+    # برای هر سوکت ادمین: زمان دریافت پیام‌های هر غرفه و تغییرهایی که هنوز پیامشان نرسیده
+    def __init__(self) -> None:
+        self.received: list[dict[int, list[float]]] = []
+        self.pending: list[dict[int, list[float]]] = []
+        self.delays: list[float] = []
+        self.messages = 0
+
+    def register(self) -> int:
+        self.received.append(defaultdict(list))
+        self.pending.append(defaultdict(list))
+        return len(self.received) - 1
+
+    def changed(self, booth_id: int, sent_at: float) -> None:
+        # پاسخ HTTP ممکن است بعد از پیام WebSocket برسد؛ پس اول پیام‌های رسیده را می‌گردیم
+        for index, received in enumerate(self.received):
+            times = received[booth_id]
+            position = bisect.bisect_left(times, sent_at)
+            if position < len(times):
+                self.delays.append(times[position] - sent_at)
+            else:
+                self.pending[index][booth_id].append(sent_at)
+
+    def update(self, index: int, booth_id: int, now: float) -> None:
+        self.received[index][booth_id].append(now)
+        for sent_at in self.pending[index].pop(booth_id, []):
+            self.delays.append(now - sent_at)
+
+
+# ========== کلاینت HTTP ==========
+
+
+class HttpClient:
+    # HTTP/1.1 با keep-alive روی asyncio خالص؛ مثل مرورگر، درخواست‌های هم‌زمان یک کاربر
+    # هر کدام اتصال آزاد خودشان را می‌گیرند
+    def __init__(self, host: str, port: int, cookies: dict[str, str], recorder: Recorder) -> None:
+        self.host, self.port = host, port
+        self.cookie_header = "; ".join(f"{k}={v}" for k, v in cookies.items())
+        self.csrf = cookies["csrftoken"]
+        self.recorder = recorder
+        self.etags: dict[str, str] = {}
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+    async def request(self, method: str, path: str, endpoint: str) -> tuple[int, dict | None]:
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Cookie: {self.cookie_header}",
+            "Connection: keep-alive",
+        ]
+        if method == "POST":
+            headers += [f"X-CSRFToken: {self.csrf}", "Content-Length: 0"]
+        elif path in self.etags:
+            headers.append(f"If-None-Match: {self.etags[path]}")
+        raw = ("\r\n".join(headers) + "\r\n\r\n").encode()
+
+        start = time.perf_counter()
+        try:
+            status, response_headers, body = await self._roundtrip(raw)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            self.recorder.errors[f"{endpoint}: {type(exc).__name__}"] += 1
+            return 0, None
+        elapsed = time.perf_counter() - start
+
+        queries = response_headers.get("x-query-count")
+        self.recorder.record(endpoint, elapsed, status, int(queries) if queries else None)
+        if "etag" in response_headers:
+            self.etags[path] = response_headers["etag"]
+        if status == 200 and response_headers.get("content-type", "").startswith("application/json"):
+            return status, json.loads(body)
+        return status, None
+
+    async def _roundtrip(self, raw: bytes) -> tuple[int, dict[str, str], bytes]:
+        if self.idle:
+            reader, writer = self.idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            status, headers, body, keep_alive = await self._exchange(reader, writer, raw)
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+        return status, headers, body
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        raw: bytes) -> tuple[int, dict[str, str], bytes, bool]:
+        writer.write(raw)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        else:
+            return status, headers, await reader.read(), False
+        return status, headers, body, headers.get("connection", "").lower() != "close"
+
+
+# ========== کلاینت WebSocket ==========
+
+
+class WebSocketClient:
+    # فقط آنچه برای /ws/capacity/ لازم است: handshake، فریم‌های متنی، ping/pong و close
+    def __init__(self, host: str, port: int, path: str, cookies: dict[str, str]) -> None:
+        self.host, self.port, self.path = host, port, path
+        self.cookie_header = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        handshake = (
+            f"GET {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+            f"Cookie: {self.cookie_header}\r\n\r\n"
+        )
+        self.writer.write(handshake.encode())
+        await self.writer.drain()
+        response = await self.reader.readuntil(b"\r\n\r\n")
+        if not response.startswith(b"HTTP/1.1 101"):
+            raise ConnectionError(response.split(b"\r\n")[0].decode())
+
+    async def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 65536:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.writer.write(header + mask + masked)
+        await self.writer.drain()
+
+    async def send_json(self, message: dict) -> None:
+        await self._send_frame(0x1, json.dumps(message).encode())
+
+    async def receive(self) -> str | bytes | None:
+        fragments = b""
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode, length = first & 0x0F, second & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", await self.reader.readexactly(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", await self.reader.readexactly(8))
+            payload = await self.reader.readexactly(length)
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                await self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            fragments += payload
+            if first & 0x80:
+                return fragments.decode() if opcode in (0x0, 0x1) else fragments
+
+    async def close(self) -> None:
+        try:
+            await self._send_frame(0x8, struct.pack("!H", 1000))
+        except (OSError, RuntimeError):
+            pass
+        self.writer.close()
+
+
+# ========== کاربران شبیه‌سازی‌شده ==========
+
+
+async def _every(interval: float, deadline: float, func) -> None:
+    await asyncio.sleep(min(random.uniform(0, interval), deadline - time.perf_counter()))
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await func()
+        now = time.perf_counter()
+        await asyncio.sleep(max(0.0, min(interval - (now - started), deadline - now)))
+
+
+async def run_leader(client: HttpClient, booth_ids: list[int], deadline: float,
+                     action_interval: float, fanout: FanoutTracker) -> None:
+    inside: list[int | None] = [None]
+
+    async def poll_status() -> None:
+        status, data = await client.request("GET", "/leader/api/status/", "GET /leader/api/status/")
+        if status == 200 and data is not None:
+            inside[0] = data["active_booth_ids"][0] if data["active_booth_ids"] else None
+
+    async def poll_all_booths() -> None:
+        await client.request(
+            "GET", "/leader/api/all-booths-status/", "GET /leader/api/all-booths-status/"
+        )
+
+    async def act() -> None:
+        sent_at = time.perf_counter()
+        if inside[0] is None:
+            booth_id = random.choice(booth_ids)
+            status, _ = await client.request(
+                "POST", f"/booths/{booth_id}/enter/", "POST /booths/{id}/enter/"
+            )
+            if status == 200:
+                inside[0] = booth_id
+                fanout.changed(booth_id, sent_at)
+        else:
+            booth_id = inside[0]
+            status, _ = await client.request(
+                "POST", f"/booths/{booth_id}/exit/", "POST /booths/{id}/exit/"
+            )
+            if status in (200, 400):
+                inside[0] = None
+            if status == 200:
+                fanout.changed(booth_id, sent_at)
+            if random.random() < 0.5:
+                await client.request(
+                    "POST", f"/leader/toggle-check/{booth_id}/", "POST /leader/toggle-check/{id}/"
+                )
+
+    try:
+        await asyncio.gather(
+            _every(POLL_STATUS_EVERY, deadline, poll_status),
+            _every(POLL_ALL_BOOTHS_EVERY, deadline, poll_all_booths),
+            _every(action_interval, deadline, act),
+        )
+    finally:
+        await client.close()
+
+
+async def run_admin(client: HttpClient, socket_client: WebSocketClient, deadline: float,
+                    kick_interval: float, fanout: FanoutTracker, recorder: Recorder) -> None:
+    index = fanout.register()
+    occupants: dict[int, list[int]] = {}
+    start = time.perf_counter()
+    try:
+        await socket_client.connect()
+    except (OSError, ConnectionError) as exc:
+        recorder.errors[f"ws connect: {exc}"] += 1
+        return
+    recorder.record("WS connect", time.perf_counter() - start, 101, None)
+
+    acked = {"seq": None, "timer": None}
+
+    async def ack_later() -> None:
+        await asyncio.sleep(ACK_DELAY)
+        acked["timer"] = None
+        await socket_client.send_json({"type": "ack", "seq": acked["seq"]})
+
+    async def listen() -> None:
+        while True:
+            text = await socket_client.receive()
+            if text is None:
+                return
+            now = time.perf_counter()
+            message = json.loads(text)
+            # بدون ack سرور بعد از چند فریم فقط پیام جبرانی می‌فرستد و بدون pong اتصال را می‌بندد
+            if message.get("type") == "ping":
+                await socket_client.send_json({"type": "pong"})
+                continue
+            if message.get("type") not in ("capacity.snapshot", "capacity.update"):
+                continue
+            acked["seq"] = message["seq"]
+            if acked["timer"] is None:
+                acked["timer"] = asyncio.create_task(ack_later())
+            fanout.messages += 1
+            for booth in message["booths"]:
+                occupants[booth["id"]] = [leader["id"] for leader in booth["leaders"]]
+                if message["type"] == "capacity.update":
+                    fanout.update(index, booth["id"], now)
+
+    async def kick() -> None:
+        candidates = [(b, l) for b, leaders in occupants.items() for l in leaders]
+        if not candidates:
+            return
+        booth_id, leader_id = random.choice(candidates)
+        sent_at = time.perf_counter()
+        status, _ = await client.request(
+            "POST",
+            f"/exhibition-admin/booths/{booth_id}/kick/{leader_id}/",
+            "POST /exhibition-admin/booths/{id}/kick/{id}/",
+        )
+        if status == 200:
+            fanout.changed(booth_id, sent_at)
+
+    listener = asyncio.create_task(listen())
+    try:
+        await _every(kick_interval, deadline, kick)
+    finally:
+        listener.cancel()
+        await socket_client.close()
+        await client.close()
+
+
+# ========== راه‌اندازی سرور و داده ==========
+
+
+def _session_cookies(users) -> list[dict[str, str]]:
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.sessions.backends.db import SessionStore
+
+    cookies = []
+    for user in users:
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        cookies.append({
+            settings.SESSION_COOKIE_NAME: session.session_key,
+            settings.CSRF_COOKIE_NAME: secrets.token_hex(16),
+        })
+    return cookies
+
+
+def prepare_database(args: argparse.Namespace) -> tuple[str, list[int], list[dict], list[dict]]:
+    db_path = setup_django()
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Group, User
+    from django.db import connection
+
+    from exhibition.models import Booth
+
+    populate(args.booths, args.leaders, capacity=args.capacity, active=False)
+    admins_group = Group.objects.get(name="exhibition_admins")
+    unusable = make_password(None)
+    User.objects.bulk_create(
+        User(username=f"admin-{i}", password=unusable) for i in range(args.admins)
+    )
+    admins = list(User.objects.filter(username__startswith="admin-").order_by("pk"))
+    admins_group.user_set.add(*admins)
+    leaders = list(User.objects.filter(username__startswith="leader-").order_by("pk"))
+
+    booth_ids = list(Booth.objects.values_list("pk", flat=True))
+    leader_cookies, admin_cookies = _session_cookies(leaders), _session_cookies(admins)
+    connection.close()
+    return db_path, booth_ids, leader_cookies, admin_cookies
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmarks._server_settings",
+        "EXHIBITION_DB_ENGINE": "sqlite",
+        "EXHIBITION_DB_PATH": db_path,
+        # یک پروسه‌ی daphne؛ بدون Redis
+        "EXHIBITION_CHANNEL_LAYER": os.environ.get("EXHIBITION_CHANNEL_LAYER", "local"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "daphne", "-b", "127.0.0.1", "-p", str(port), "config.asgi:application"],
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited: {server.stderr.read().decode()[-2000:]}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start listening within 30s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# ========== اجرا، گزارش و مقایسه ==========
+
+
+async def run_load(args: argparse.Namespace, port: int, booth_ids: list[int],
+                   leader_cookies: list[dict], admin_cookies: list[dict]) -> dict:
+    recorder, fanout = Recorder(), FanoutTracker()
+    host = "127.0.0.1"
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    tasks = [
+        run_admin(
+            HttpClient(host, port, cookies, recorder),
+            WebSocketClient(host, port, "/ws/capacity/", cookies),
+            deadline, args.kick_interval, fanout, recorder,
+        )
+        for cookies in admin_cookies
+    ]
+    tasks += [
+        run_leader(HttpClient(host, port, cookies, recorder), booth_ids, deadline,
+                   args.action_interval, fanout)
+        for cookies in leader_cookies
+    ]
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.latencies.items()):
+        queries = recorder.queries.get(endpoint, [])
+        endpoints[endpoint] = {
+            **_summary(samples),
+            "rps": len(samples) / elapsed,
+            "queries_mean": statistics.fmean(queries) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "statuses": {str(k): v for k, v in sorted(recorder.statuses[endpoint].items())},
+        }
+    total = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        "config": {
+            "leaders": args.leaders, "admins": args.admins, "booths": args.booths,
+            "capacity": args.capacity, "duration": args.duration,
+            "action_interval": args.action_interval, "kick_interval": args.kick_interval,
+        },
+        "elapsed": elapsed,
+        "throughput_rps": total / elapsed,
+        "endpoints": endpoints,
+        "fanout": {**_summary(fanout.delays), "messages": fanout.messages},
+        "errors": dict(recorder.errors),
+    }
+
+
+def print_report(result: dict) -> None:
+    config = result["config"]
+    print(
+        f"{config['leaders']} leaders, {config['admins']} admins, {config['booths']} booths, "
+        f"{result['elapsed']:.1f}s, {result['throughput_rps']:.1f} req/s total"
+    )
+    print(f"{'endpoint':<46}{'count':>7}{'rps':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'queries':>9}  statuses")
+    for endpoint, row in result["endpoints"].items():
+        queries = "-" if row["queries_mean"] is None else f"{row['queries_mean']:.1f}"
+        statuses = " ".join(f"{code}:{n}" for code, n in row["statuses"].items())
+        print(
+            f"{endpoint:<46}{row['count']:>7}{row['rps']:>7.1f}{row['p50_ms']:>8.1f}"
+            f"{row['p95_ms']:>8.1f}{row['p99_ms']:>8.1f}{queries:>9}  {statuses}"
+        )
+    fan = result["fanout"]
+    print(
+        f"ws fan-out delay: {fan['count']} deliveries, p50 {fan['p50_ms']:.1f} ms, "
+        f"p95 {fan['p95_ms']:.1f} ms, p99 {fan['p99_ms']:.1f} ms ({fan['messages']} messages)"
+    )
+    for error, count in result["errors"].items():
+        print(f"  error {count} x {error}")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"\ncompared with baseline (threshold {threshold:.0%}):")
+    rows = [(name, row, baseline["endpoints"].get(name)) for name, row in result["endpoints"].items()]
+    rows.append(("ws fan-out", result["fanout"], baseline.get("fanout")))
+    for name, row, base in rows:
+        if not base or not base["count"] or not row["count"]:
+            print(f"  {name:<46} {'new' if not base else 'no samples'}")
+            continue
+        change = (row["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        line = f"  {name:<46} p95 {base['p95_ms']:>7.1f} -> {row['p95_ms']:>7.1f} ms ({change:+.0%})"
+        if change > threshold:
+            regressions.append(f"{name}: p95 {change:+.0%}")
+        if row.get("queries_mean") is not None and base.get("queries_mean") is not None:
+            line += f", queries {base['queries_mean']:.1f} -> {row['queries_mean']:.1f}"
+            if row["queries_mean"] > base["queries_mean"] + 0.5:
+                regressions.append(f"{name}: queries {base['queries_mean']:.1f} -> {row['queries_mean']:.1f}")
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leaders", type=int, default=50)
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument("--booths", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=None, help="Slots per booth (default: enough for all).")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--action-interval", type=float, default=5.0, help="Seconds between a leader's enter/exit.")
+    parser.add_argument("--kick-interval", type=float, default=10.0, help="Seconds between an admin's kicks.")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --output run.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative p95 increase.")
+    args = parser.parse_args()
+
+    db_path, booth_ids, leader_cookies, admin_cookies = prepare_database(args)
+    port = args.port or _free_port()
+    server = start_server(db_path, port)
+    try:
+        result = asyncio.run(run_load(args, port, booth_ids, leader_cookies, admin_cookies))
+    finally:
+        stop_server(server)
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(result, fp, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(result, json.load(fp), args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
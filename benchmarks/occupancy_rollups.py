@@ -0,0 +1,96 @@
+"""Cost of a one-day occupancy chart: scanning visit intervals vs. reading the rollups.
+
+Fills BoothVisitArchive with a day of closed visits, then compares
+* the naive chart: load every visit that overlaps the day and count, per booth and
+  minute, how many intervals cover that minute
+* exhibition.rollups.occupancy_series over the BoothOccupancyRollup rows
+and reports how long rebuild_rollups takes to derive those rows from the history.
+
+Usage: python -m benchmarks.occupancy_rollups [--booths 40] [--leaders 400] [--visits 20]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, time as day_time, timedelta
+
+from ._bootstrap import populate, setup_django
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--booths", type=int, default=40)
+    parser.add_argument("--leaders", type=int, default=400)
+    parser.add_argument("--visits", type=int, default=20, help="visits per leader in the day")
+    args = parser.parse_args()
+
+    setup_django()
+    populate(args.booths, args.leaders, active=False)
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from exhibition.models import Booth, BoothVisitArchive
+    from exhibition.rollups import MINUTES_PER_DAY, minute_of, occupancy_series, rebuild_rollups
+
+    rng = random.Random(0)
+    booth_ids = list(Booth.objects.values_list("id", flat=True))
+    day = timezone.localdate() - timedelta(days=1)
+    opening = timezone.make_aware(datetime.combine(day, day_time(9)))
+    visits = []
+    for leader_id in range(1, args.leaders + 1):
+        moment = opening
+        for _ in range(args.visits):
+            moment += timedelta(minutes=rng.randint(1, 10))
+            stay = timedelta(minutes=rng.randint(3, 25))
+            visits.append(
+                BoothVisitArchive(
+                    booth_id=rng.choice(booth_ids),
+                    leader_id=leader_id,
+                    entered_at=moment,
+                    exited_at=moment + stay,
+                )
+            )
+            moment += stay
+    BoothVisitArchive.objects.bulk_create(visits, batch_size=5000)
+
+    start = time.perf_counter()
+    rows = rebuild_rollups()
+    rebuild = time.perf_counter() - start
+
+    def naive_chart() -> dict[int, list[int]]:
+        start_of_day = timezone.make_aware(datetime.combine(day, day_time.min))
+        end_of_day = start_of_day + timedelta(days=1)
+        chart = {booth_id: [0] * MINUTES_PER_DAY for booth_id in booth_ids}
+        for booth_id, entered_at, exited_at in BoothVisitArchive.objects.filter(
+            entered_at__lt=end_of_day, exited_at__gte=start_of_day
+        ).values_list("booth_id", "entered_at", "exited_at"):
+            first = minute_of(max(entered_at, start_of_day))[1]
+            last = minute_of(min(exited_at, end_of_day - timedelta(minutes=1)))[1]
+            for minute in range(first, last):
+                chart[booth_id][minute] += 1
+        return chart
+
+    timings = []
+    for label, build in (
+        ("scan visit intervals", naive_chart),
+        ("read rollups (1 min)", lambda: occupancy_series(day, resolution=1)),
+        ("read rollups (5 min)", lambda: occupancy_series(day, resolution=5)),
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            build()
+            timings.append((label, time.perf_counter() - start, len(queries)))
+
+    print(f"{len(visits)} visits in {args.booths} booths; {rows} booth-day rollup rows")
+    print(f"rebuild_rollups: {rebuild:.2f} s")
+    print(f"{'one-day chart':<24}{'ms':>10}{'queries':>10}")
+    for label, elapsed, count in timings:
+        print(f"{label:<24}{elapsed * 1000:>10.1f}{count:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
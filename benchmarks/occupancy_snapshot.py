@@ -0,0 +1,71 @@
+"""Query count and latency of the occupancy snapshot vs. the per-booth loop.
+
+Usage: python -m benchmarks.occupancy_snapshot [--repeat 20]
+"""
+
+import argparse
+import statistics
+import time
+
+from ._bootstrap import populate, reset, setup_django
+
+GRID = [(10, 50), (50, 250), (100, 1000), (200, 2000)]
+
+
+def legacy_loop() -> list[dict]:
+    from exhibition.models import Booth, BoothVisit
+
+    result = []
+    for booth in Booth.objects.all().order_by("id"):
+        active_visits = (
+            BoothVisit.objects.filter(booth=booth, is_active=True)
+            .select_related("leader")
+            .order_by("leader__username")
+        )
+        occupied = active_visits.count()
+        result.append(
+            {
+                "id": booth.id,
+                "occupied": occupied,
+                "remaining": max(booth.max_groups - occupied, 0),
+                "leaders": [{"username": v.leader.username, "id": v.leader.id} for v in active_visits],
+            }
+        )
+    return result
+
+
+def measure(func, repeat: int) -> tuple[int, float]:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    queries = len(ctx.captured_queries)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return queries, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from exhibition.occupancy import build_snapshot
+
+    print(f"{'booths':>6} {'leaders':>7} | {'loop q':>6} {'loop ms':>8} | {'snap q':>6} {'snap ms':>8}")
+    for booths, leaders in GRID:
+        reset()
+        populate(booths, leaders)
+        loop_q, loop_ms = measure(legacy_loop, args.repeat)
+        snap_q, snap_ms = measure(build_snapshot, args.repeat)
+        print(f"{booths:>6} {leaders:>7} | {loop_q:>6} {loop_ms:>8.2f} | {snap_q:>6} {snap_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
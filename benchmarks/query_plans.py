@@ -0,0 +1,82 @@
+"""Check that the hot occupancy queries stay on the partial indexes as visit history grows.
+
+Seeds a large history of closed BoothVisit rows (a multi-day exhibition) on top
+of the usual active visits, refreshes planner statistics and runs the
+check_query_plans command, then times the queries behind the status endpoints.
+Exits 1 if any plan falls back to the full visit history.
+
+Usage: python -m benchmarks.query_plans [--history 1000000] [--booths 40] [--leaders 400]
+"""
+
+import argparse
+import sys
+import time
+
+from ._bootstrap import populate, setup_django
+
+BATCH = 50_000
+
+
+def seed_history(rows: int) -> None:
+    from django.utils import timezone
+
+    from exhibition.models import Booth, BoothVisit
+
+    booth_ids = list(Booth.objects.values_list("pk", flat=True))
+    leader_ids = list(BoothVisit.objects.values_list("leader_id", flat=True))
+    now = timezone.now()
+    for start in range(0, rows, BATCH):
+        BoothVisit.objects.bulk_create(
+            BoothVisit(
+                booth_id=booth_ids[i % len(booth_ids)],
+                leader_id=leader_ids[i % len(leader_ids)],
+                is_active=False,
+                exited_at=now,
+            )
+            for i in range(start, min(rows, start + BATCH))
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=1_000_000)
+    parser.add_argument("--booths", type=int, default=40)
+    parser.add_argument("--leaders", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+
+    from exhibition.occupancy import build_snapshot, find_counter_drift, leader_state
+
+    populate(args.booths, args.leaders)
+    start = time.perf_counter()
+    seed_history(args.history)
+    print(f"seeded {args.history} history rows in {time.perf_counter() - start:.1f}s")
+
+    try:
+        call_command("check_query_plans", analyze=True)
+    except CommandError as exc:
+        print(f"FAILED: {exc}")
+        return 1
+
+    from exhibition.models import BoothVisit
+
+    leader_id = BoothVisit.objects.filter(is_active=True).values_list("leader_id", flat=True).first()
+    for label, func in (
+        ("build_snapshot()", build_snapshot),
+        ("leader_state()", lambda: leader_state(leader_id)),
+        ("find_counter_drift()", find_counter_drift),
+    ):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            func()
+        print(f"{label:<22}{(time.perf_counter() - start) / args.repeat * 1000:>8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Latency of the next-booth recommendation endpoint for a large exhibition.
+
+Populates --booths booths with leaders inside, a waitlist on the full booths, a
+dwell history and a checklist covering half the booths, then times
+* exhibition.recommend.recommend over the scored rows (the per-request pass)
+* a full GET /leader/api/recommendations/ through the test client (auth, one
+  LeaderBoothStatus query, cached document), next to GET /leader/checked-booths/
+  which runs the same query and shows the client/auth overhead alone
+
+Usage: python -m benchmarks.recommendations [--booths 300] [--leaders 1500] [--requests 200]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from ._bootstrap import populate, setup_django
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--booths", type=int, default=300)
+    parser.add_argument("--leaders", type=int, default=1500)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    populate(args.booths, args.leaders, capacity=4, active=False)
+
+    from datetime import timedelta
+
+    from asgiref.sync import async_to_sync
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from exhibition.dwell import estimator
+    from exhibition.models import Booth, BoothVisit, BoothWaitlistEntry, LeaderBoothStatus
+    from exhibition.occupancy import get_document
+    from exhibition.recommend import ascored_booths, recommend
+
+    settings.ALLOWED_HOSTS = ["*"]
+    now = timezone.now()
+    booths = list(Booth.objects.order_by("id"))
+    booth_ids = [booth.id for booth in booths]
+    leaders = iter(User.objects.filter(username__startswith="leader-").order_by("id"))
+
+    # دو سوم غرفه‌ها پر و بقیه نیمه‌پر؛ لیدرهای باقی‌مانده در صف غرفه‌های پر
+    visits = []
+    for i, booth in enumerate(booths):
+        booth.current_visitors = booth.max_groups if i % 3 else i % booth.max_groups
+        visits += [
+            BoothVisit(booth=booth, leader=next(leaders), is_active=True, entered_at=now)
+            for _ in range(booth.current_visitors)
+        ]
+    Booth.objects.bulk_update(booths, ["current_visitors"])
+    BoothVisit.objects.bulk_create(visits)
+    BoothVisit.objects.filter(is_active=True).update(entered_at=now - timedelta(minutes=5))
+    outside = list(leaders)
+    full = [booth.id for i, booth in enumerate(booths) if i % 3]
+    BoothWaitlistEntry.objects.bulk_create(
+        BoothWaitlistEntry(booth_id=full[i % len(full)], leader=user)
+        for i, user in enumerate(outside[1:])
+    )
+    for i, booth_id in enumerate(booth_ids):
+        for minutes in (8, 10, 12):
+            estimator.observe(booth_id, (minutes + i % 5) * 60)
+
+    leader = outside[0]
+    LeaderBoothStatus.objects.bulk_create(
+        LeaderBoothStatus(leader=leader, booth_id=booth_id, is_checked=True)
+        for booth_id in booth_ids[::2]
+    )
+
+    checked = set(booth_ids[::2])
+    scored = async_to_sync(ascored_booths)()
+    scoring = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        recommend(scored, leader.id, checked, 5)
+        scoring.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    estimator.annotate(get_document()["booths"])
+    rescore = time.perf_counter() - start
+
+    client = Client()
+    client.force_login(leader)
+    client.get("/leader/api/recommendations/")
+    baseline = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        client.get("/leader/checked-booths/")
+        baseline.append(time.perf_counter() - start)
+    requests = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get("/leader/api/recommendations/")
+            requests.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.content
+
+    print(f"{args.booths} booths, {len(visits)} leaders inside, {len(outside) - 1} waiting")
+    print(f"{'path':<30}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, samples in (
+        ("rank unchecked booths", scoring),
+        ("GET checked-booths (baseline)", baseline),
+        ("GET recommendations", requests),
+    ):
+        ordered = sorted(samples)
+        print(
+            f"{label:<30}{statistics.median(ordered) * 1000:>9.2f}"
+            f"{ordered[int(len(ordered) * 0.95) - 1] * 1000:>9.2f}"
+        )
+    print(f"queries per request: {len(queries) / args.requests:.1f}")
+    print(f"rescoring after a version bump: {rescore * 1000:.2f} ms (once per process)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
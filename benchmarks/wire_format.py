@@ -0,0 +1,67 @@
+"""Size and CPU of the /ws/capacity/ frames: JSON per socket vs. shared JSON/msgpack frames.
+
+Builds the occupancy document for a populated exhibition and compares
+* bytes per snapshot and per single-booth update, JSON vs. the msgpack subprotocol
+* CPU to fan one update out to N sockets when every consumer calls json.dumps
+  (the old behaviour) vs. encoding once in the dispatcher and sharing the frame
+
+Usage: python -m benchmarks.wire_format [--booths 40] [--leaders 400] [--sockets 2000]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from ._bootstrap import populate, setup_django
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--booths", type=int, default=40)
+    parser.add_argument("--leaders", type=int, default=400)
+    parser.add_argument("--sockets", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    populate(args.booths, args.leaders)
+
+    from exhibition.occupancy import build_snapshot
+    from exhibition.wire import encode_snapshot, update_frames
+
+    booths = build_snapshot()
+    busiest = max(booths, key=lambda booth: len(booth["leaders"]))
+
+    json_snapshot = encode_snapshot(1, booths, binary=False).encode()
+    packed_snapshot = encode_snapshot(1, booths, binary=True)
+    frames = update_frames(2, [busiest])
+    json_update, packed_update = frames["text"].encode(), frames["bytes"]
+
+    print(f"{args.booths} booths, {args.leaders} leaders inside")
+    print(f"{'frame':<22}{'json':>10}{'msgpack':>10}{'ratio':>8}")
+    for label, plain, packed in (
+        ("snapshot", json_snapshot, packed_snapshot),
+        ("update (1 booth)", json_update, packed_update),
+    ):
+        print(f"{label:<22}{len(plain):>10}{len(packed):>10}{len(packed) / len(plain):>8.2f}")
+
+    event = {"type": "capacity.update", "seq": 2, "booths": [busiest]}
+    start = time.perf_counter()
+    for _ in range(args.sockets):
+        json.dumps(event)
+    per_socket = time.perf_counter() - start
+
+    start = time.perf_counter()
+    shared = update_frames(2, [busiest])
+    for _ in range(args.sockets):
+        shared["bytes"]
+    once = time.perf_counter() - start
+
+    print(f"fan-out of one update to {args.sockets} sockets:")
+    print(f"  json.dumps per socket  {per_socket * 1000:>8.2f} ms")
+    print(f"  encoded once, shared   {once * 1000:>8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
@@ -8,6 +9,12 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 django_asgi_app = get_asgi_application()
 
+if settings.EXHIBITION_SWEEP_INTERVAL > 0:
+    # بستن دوره‌ای حضورهای فراموش‌شده در همین پروسه (exhibition.sweeper)
+    from exhibition.sweeper import sweeper
+
+    sweeper.start()
+
 try:
     from exhibition import routing as exhibition_routing
 except Exception:  # pragma: no cover - during initial setup
@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+from typing import Any
+
+# PRAGMA هایی که روی هر اتصال جدید SQLite اجرا می‌شوند:
+#   WAL: خواندن‌ها (polling) پشت نوشتن‌ها (ورود/خروج) قفل نمی‌شوند
+#   synchronous=NORMAL: در حالت WAL امن است و fsync هر commit را حذف می‌کند
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def sqlite_config(path: str | Path) -> dict[str, Any]:
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        # اتصال بین درخواست‌ها باز می‌ماند تا هزینه‌ی باز کردن فایل و اجرای PRAGMA ها تکرار نشود
+        "CONN_MAX_AGE": _env_int("EXHIBITION_DB_CONN_MAX_AGE", 600),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # busy timeout (ثانیه): به جای خطای فوری «database is locked» منتظر قفل می‌ماند
+            "timeout": _env_int("EXHIBITION_DB_TIMEOUT", 20),
+            # قفل نوشتن از ابتدای تراکنش گرفته می‌شود؛ ارتقای قفل خواندن به نوشتن
+            # وسط تراکنش (که busy timeout را دور می‌زند) دیگر پیش نمی‌آید
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "; ".join(SQLITE_PRAGMAS) + ";",
+        },
+        # تست‌های هم‌زمانی (exhibition/tests) از چند thread اتصال جدا باز می‌کنند؛ دیتابیس
+        # in-memory با shared cache به جای busy timeout فوراً «table is locked» می‌دهد
+        "TEST": {"NAME": str(Path(path).with_name(f"test_{Path(path).name}"))},
+    }
+
+
+def postgresql_config() -> dict[str, Any]:
+    # نیاز به نصب psycopg (نسخه‌ی ۳) دارد
+    config: dict[str, Any] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("EXHIBITION_DB_NAME", "exhibition"),
+        "USER": os.environ.get("EXHIBITION_DB_USER", "exhibition"),
+        "PASSWORD": os.environ.get("EXHIBITION_DB_PASSWORD", ""),
+        "HOST": os.environ.get("EXHIBITION_DB_HOST", "127.0.0.1"),
+        "PORT": os.environ.get("EXHIBITION_DB_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if _env_bool("EXHIBITION_DB_POOL", False):
+        # connection pool داخلی psycopg؛ با pool نباید CONN_MAX_AGE تنظیم شود
+        config["OPTIONS"]["pool"] = {
+            "min_size": _env_int("EXHIBITION_DB_POOL_MIN", 2),
+            "max_size": _env_int("EXHIBITION_DB_POOL_MAX", 10),
+        }
+    else:
+        config["CONN_MAX_AGE"] = _env_int("EXHIBITION_DB_CONN_MAX_AGE", 600)
+    return config
+
+
+def database_config(base_dir: Path) -> dict[str, Any]:
+    # EXHIBITION_DB_ENGINE: sqlite (پیش‌فرض) یا postgresql
+    engine = os.environ.get("EXHIBITION_DB_ENGINE", "sqlite").strip().lower()
+    if engine in ("postgres", "postgresql"):
+        return postgresql_config()
+    if engine != "sqlite":
+        raise ValueError(f"Unknown EXHIBITION_DB_ENGINE: {engine!r}")
+    return sqlite_config(os.environ.get("EXHIBITION_DB_PATH") or base_dir / "db.sqlite3")
@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from .database import database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = "CHANGE_ME_FOR_PRODUCTION"
@@ -21,11 +23,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "exhibition.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "exhibition.middleware.RoleMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -51,11 +55,10 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 ASGI_APPLICATION = "config.asgi.application"
 
+# SQLite با WAL و اتصال پایدار؛ با EXHIBITION_DB_ENGINE=postgresql به PostgreSQL می‌رود
+# (جزئیات و متغیرهای محیطی در config/database.py)
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(BASE_DIR),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -84,11 +87,149 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+# سند اشغال و شمارنده‌های نسخه/ترتیب در cache نگه داشته می‌شوند.
+# با چند پروسه (چند worker) باید cache مشترک مثل Redis تنظیم شود. management command ها
+# (repair_occupancy، sweep_visits، import_leaders، create_booths از shell و ...) هم پروسه‌ی
+# جدایی هستند: با LocMemCache نسخه‌ای که جلو می‌برند به سرور نمی‌رسد و سند اشغال سرور
+# تا DOCUMENT_TIMEOUT (۳۰۰ ثانیه) کهنه می‌ماند.
+if os.environ.get("EXHIBITION_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["EXHIBITION_CACHE_URL"],
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# EXHIBITION_CHANNEL_LAYER:
+#   redis   channels_redis روی EXHIBITION_CHANNEL_REDIS_URL (برای چند پروسه/چند سرور لازم است)
+#   local   exhibition.layers.LocalFanoutChannelLayer، fan-out درون‌پروسه‌ای برای تک‌نود
+#   memory  InMemoryChannelLayer خود channels
+# پیش‌فرض redis است؛ local و memory فقط با تنظیم صریح (تک‌پروسه) انتخاب می‌شوند، چون با چند
+# worker پیام‌های broadcast بی‌صدا به worker های دیگر نمی‌رسند
+EXHIBITION_CHANNEL_LAYER = os.environ.get("EXHIBITION_CHANNEL_LAYER", "redis")
+if EXHIBITION_CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.environ.get("EXHIBITION_CHANNEL_REDIS_URL", "redis://127.0.0.1:6379")],
+            },
+        },
+    }
+elif EXHIBITION_CHANNEL_LAYER == "local":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "exhibition.layers.LocalFanoutChannelLayer",
+            "CONFIG": {
+                "shard_size": int(os.environ.get("EXHIBITION_CHANNEL_SHARD_SIZE", "500")),
+            },
+        },
+    }
+elif EXHIBITION_CHANNEL_LAYER == "memory":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+else:
+    raise ValueError(f"Unknown EXHIBITION_CHANNEL_LAYER: {EXHIBITION_CHANNEL_LAYER!r}")
+
+# پنجره‌ی تجمیع پیام‌های ظرفیت (ثانیه) قبل از ارسال به WebSocket ها
+EXHIBITION_BROADCAST_WINDOW = float(os.environ.get("EXHIBITION_BROADCAST_WINDOW", "0.05"))
+
+# موتور پذیرش ورود/خروج غرفه‌ها:
+#   exhibition.admission.DatabaseAdmissionBackend  (UPDATE شرطی روی دیتابیس)
+#   exhibition.admission.RedisAdmissionBackend     (اسکریپت اتمیک Redis، OPTIONS: {"url": ...})
+EXHIBITION_ADMISSION = {
+    "BACKEND": os.environ.get(
+        "EXHIBITION_ADMISSION_BACKEND", "exhibition.admission.DatabaseAdmissionBackend"
+    ),
+    "OPTIONS": (
+        {"url": os.environ["EXHIBITION_ADMISSION_REDIS_URL"]}
+        if os.environ.get("EXHIBITION_ADMISSION_REDIS_URL")
+        else {}
+    ),
+}
+
+# بازدیدهای بسته‌شده‌ی قدیمی‌تر از این مقدار (ساعت) با دستور archive_visits
+# به جدول BoothVisitArchive منتقل می‌شوند
+EXHIBITION_ARCHIVE_AFTER_HOURS = float(os.environ.get("EXHIBITION_ARCHIVE_AFTER_HOURS", "6"))
+EXHIBITION_ARCHIVE_BATCH_SIZE = int(os.environ.get("EXHIBITION_ARCHIVE_BATCH_SIZE", "5000"))
+
+# بستن خودکار حضورهایی که لیدر خروج را فراموش کرده (exhibition.sweeper):
+#   MAX_VISIT_MINUTES: سقف پیش‌فرض مدت حضور برای غرفه‌هایی که max_visit_minutes ندارند (صفر = بدون سقف).
+#     پیش‌فرض صفر است: بدون تنظیم صریح فقط غرفه‌هایی که خودشان سقف دارند sweep می‌شوند
+#   SWEEP_INTERVAL: فاصله‌ی دورهای sweeper داخل پروسه‌ی سرور (ثانیه، صفر = خاموش)
+#   SWEEP_LIMIT: حداکثر حضوری که در هر دور بسته می‌شود
+EXHIBITION_MAX_VISIT_MINUTES = int(os.environ.get("EXHIBITION_MAX_VISIT_MINUTES", "0"))
+EXHIBITION_SWEEP_INTERVAL = float(os.environ.get("EXHIBITION_SWEEP_INTERVAL", "60"))
+EXHIBITION_SWEEP_LIMIT = int(os.environ.get("EXHIBITION_SWEEP_LIMIT", "500"))
+
+# ورود/خروج‌ها در حافظه جمع می‌شوند و هر چند ثانیه یک بار در BoothOccupancyRollup نوشته می‌شوند
+EXHIBITION_ROLLUP_FLUSH_INTERVAL = float(os.environ.get("EXHIBITION_ROLLUP_FLUSH_INTERVAL", "5"))
+
+# تخمین زمان انتظار هر غرفه از مدت حضورهای اخیر (exhibition.dwell):
+#   ALPHA: وزن هر خروج جدید در میانگین متحرک نمایی
+#   MIN_SAMPLES: تا این تعداد خروج ثبت نشده، تخمینی برای غرفه داده نمی‌شود
+#   WARMUP: تعداد آخرین خروج‌هایی که هر پروسه یک بار هنگام شروع از دیتابیس می‌خواند
+EXHIBITION_DWELL_ALPHA = float(os.environ.get("EXHIBITION_DWELL_ALPHA", "0.2"))
+EXHIBITION_DWELL_MIN_SAMPLES = int(os.environ.get("EXHIBITION_DWELL_MIN_SAMPLES", "3"))
+EXHIBITION_DWELL_WARMUP = int(os.environ.get("EXHIBITION_DWELL_WARMUP", "500"))
+
+# هر چند ثانیه یک خط خلاصه از آمار WebSocket ها (exhibition.consumers) لاگ شود
+EXHIBITION_WS_STATS_INTERVAL = float(os.environ.get("EXHIBITION_WS_STATS_INTERVAL", "60"))
+
+# کنترل جریان /ws/capacity/:
+#   WINDOW: حداکثر فریم capacity ارسال‌شده‌ای که کلاینت هنوز ack نکرده؛ بعد از آن فقط شناسه‌ی
+#           غرفه‌های تغییرکرده نگه داشته می‌شود و با ack بعدی آخرین وضعیتشان یکجا می‌رود
+#   HEARTBEAT: فاصله‌ی ping سرور (ثانیه)
+#   TIMEOUT: اتصالی که این مدت هیچ پیامی (ack/pong) نفرستد بسته می‌شود
+#   EVICT_AFTER: کلاینتی که این مدت پیوسته پشت window مانده باشد بسته می‌شود
+EXHIBITION_WS_WINDOW = int(os.environ.get("EXHIBITION_WS_WINDOW", "8"))
+EXHIBITION_WS_HEARTBEAT = float(os.environ.get("EXHIBITION_WS_HEARTBEAT", "20"))
+EXHIBITION_WS_TIMEOUT = float(os.environ.get("EXHIBITION_WS_TIMEOUT", "60"))
+EXHIBITION_WS_EVICT_AFTER = float(os.environ.get("EXHIBITION_WS_EVICT_AFTER", "30"))
+
+# توکن scraper برای /metrics/؛ خالی = فقط ادمین نمایشگاه با session
+EXHIBITION_METRICS_TOKEN = os.environ.get("EXHIBITION_METRICS_TOKEN", "")
+
+# پروفایل کوئری‌ها (exhibition.middleware.QueryProfilerMiddleware): نسبت درخواست‌هایی که
+# کوئری‌هایشان ثبت می‌شود (0 = خاموش، مثلا 0.05 حین نمایشگاه). گزارش کندترین endpoint ها و
+# الگوهای N+1 هر REPORT_INTERVAL ثانیه در فایل REPORT بازنویسی می‌شود. شکلی از کوئری که در
+# یک درخواست REPEAT_THRESHOLD بار یا بیشتر با پارامتر متفاوت اجرا شود N+1 حساب می‌شود و
+# شکلی که در یک درخواست ROWS_THRESHOLD ردیف یا بیشتر بخواند (مثلا کل group.user_set) نتیجه‌ی بزرگ.
+EXHIBITION_PROFILE_SAMPLE_RATE = float(os.environ.get("EXHIBITION_PROFILE_SAMPLE_RATE", "0"))
+EXHIBITION_PROFILE_REPORT = os.environ.get(
+    "EXHIBITION_PROFILE_REPORT", str(BASE_DIR / "query_profile.txt")
+)
+EXHIBITION_PROFILE_REPORT_INTERVAL = float(
+    os.environ.get("EXHIBITION_PROFILE_REPORT_INTERVAL", "30")
+)
+EXHIBITION_PROFILE_REPEAT_THRESHOLD = int(os.environ.get("EXHIBITION_PROFILE_REPEAT_THRESHOLD", "3"))
+EXHIBITION_PROFILE_ROWS_THRESHOLD = int(os.environ.get("EXHIBITION_PROFILE_ROWS_THRESHOLD", "500"))
+if EXHIBITION_PROFILE_SAMPLE_RATE > 0:
+    MIDDLEWARE.insert(1, "exhibition.middleware.QueryProfilerMiddleware")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "{asctime} {levelname} {name}: {message}", "style": "{"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        "exhibition": {
+            "handlers": ["console"],
+            "level": os.environ.get("EXHIBITION_LOG_LEVEL", "INFO"),
+            "propagate": False,
         },
     },
 }
@@ -17,12 +17,22 @@ urlpatterns = [
         views.all_booths_status_api,
         name="all_booths_status_api",
     ),
+    path(
+        "leader/api/recommendations/",
+        views.recommended_booths_api,
+        name="recommended_booths_api",
+    ),
     path("exhibition-admin/dashboard/", views.admin_dashboard, name="admin_dashboard"),
     path(
         "exhibition-admin/api/booth-status/",
         views.admin_booth_status_api,
         name="admin_booth_status_api",
     ),
+    path(
+        "exhibition-admin/api/occupancy-history/",
+        views.occupancy_history_api,
+        name="occupancy_history_api",
+    ),
     path(
         "booths/<int:booth_id>/enter/",
         views.enter_booth,
@@ -33,6 +43,16 @@ urlpatterns = [
         views.exit_booth,
         name="exit_booth",
     ),
+    path(
+        "booths/<int:booth_id>/waitlist/join/",
+        views.join_waitlist,
+        name="join_waitlist",
+    ),
+    path(
+        "booths/<int:booth_id>/waitlist/leave/",
+        views.leave_waitlist,
+        name="leave_waitlist",
+    ),
     path(
         "exhibition-admin/booths/<int:booth_id>/kick/<int:user_id>/",
         views.admin_force_exit,
@@ -44,11 +64,21 @@ urlpatterns = [
         views.leader_list,
         name="leader_list",
     ),
+    path(
+        "exhibition-admin/api/leaders/",
+        views.leader_list_api,
+        name="leader_list_api",
+    ),
     path(
         "exhibition-admin/leaders/create/",
         views.leader_create,
         name="leader_create",
     ),
+    path(
+        "exhibition-admin/leaders/import/",
+        views.leader_import,
+        name="leader_import",
+    ),
     path(
         "exhibition-admin/leaders/<int:user_id>/edit/",
         views.leader_edit,
@@ -70,5 +100,7 @@ urlpatterns = [
     path('leader/checked-booths/', views.get_checked_booths, name='get_checked_booths'),
     path('leader/reset-all-checks/', views.reset_all_booth_checks, name='reset_all_booth_checks'),
 
+    path("metrics/", views.metrics, name="metrics"),
+
     
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from exhibition.models import Booth
+from exhibition.occupancy import local_cache_warning
 
 def run():
     booths = [
@@ -16,4 +17,8 @@ def run():
         Booth.objects.get_or_create(
             slug=slug,
             defaults={"name": name, "max_groups": max_groups},
-        )
\ No newline at end of file
+        )
+
+    warning = local_cache_warning()
+    if warning:
+        print(warning)
@@ -1,18 +1,87 @@
-from django.contrib import admin
-from .models import Booth, BoothVisit, LeaderBoothStatus
+from django.contrib import admin, messages
+from .admission import get_admission_backend
+from .models import Booth, BoothVisit, BoothVisitArchive, BoothWaitlistEntry, LeaderBoothStatus
+from .occupancy import repair_counter_drift
+from .sweeper import close_visits
 
 
+# current_visitors شمارنده‌ی ظرفیت است و فقط claim_slot/release_slots آن را عوض می‌کنند؛
+# ذخیره‌ی فرم با مقدار کهنه‌ی صفحه باعث پذیرش بیش از ظرفیت یا قفل شدن غرفه می‌شد
 @admin.register(Booth)
 class BoothAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "max_groups")
+    list_display = ("name", "slug", "max_groups", "current_visitors", "max_visit_minutes")
     prepopulated_fields = {"slug": ("name",)}
+    readonly_fields = ("current_visitors",)
+    actions = ("repair_counters",)
 
+    @admin.action(description="اصلاح شمارنده‌ی ظرفیت از روی حضورهای فعال (repair_counter_drift)")
+    def repair_counters(self, request, queryset) -> None:
+        # مثل دستور repair_occupancy همه‌ی غرفه‌ها بررسی می‌شوند، نه فقط انتخاب‌شده‌ها
+        drift = repair_counter_drift()
+        get_admission_backend().sync()
+        if drift:
+            self.message_user(request, f"شمارنده‌ی {len(drift)} غرفه اصلاح شد.", messages.WARNING)
+        else:
+            self.message_user(request, "شمارنده‌ی همه‌ی غرفه‌ها با حضورهای فعال یکی است.")
 
+
+# فقط خواندنی؛ حضورها از مسیر admission backend باز و بسته می‌شوند تا اسلات غرفه آزاد شود
 @admin.register(BoothVisit)
 class BoothVisitAdmin(admin.ModelAdmin):
     list_display = ("booth", "leader", "is_active", "entered_at", "exited_at")
     list_filter = ("booth", "is_active")
     search_fields = ("leader__username",)
+    list_select_related = ("booth", "leader")
+    actions = ("close_selected",)
+
+    @admin.action(description="بستن حضورهای فعال انتخاب‌شده")
+    def close_selected(self, request, queryset) -> None:
+        closed = close_visits(list(queryset.filter(is_active=True).values_list("pk", flat=True)))
+        self.message_user(request, f"{sum(closed.values())} حضور بسته شد.")
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        return False
+
+
+# فقط خواندنی؛ ردیف‌ها را دستور archive_visits می‌سازد
+@admin.register(BoothVisitArchive)
+class BoothVisitArchiveAdmin(admin.ModelAdmin):
+    list_display = ("booth", "leader", "entered_at", "exited_at", "duration")
+    list_filter = ("booth",)
+    search_fields = ("leader__username",)
+    list_select_related = ("booth", "leader")
+    date_hierarchy = "entered_at"
+    ordering = ("-entered_at",)
+    show_full_result_count = False
+
+    @admin.display(description="مدت حضور")
+    def duration(self, obj: BoothVisitArchive):
+        return obj.exited_at - obj.entered_at
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(BoothWaitlistEntry)
+class BoothWaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("booth", "leader", "joined_at")
+    list_filter = ("booth",)
+    search_fields = ("leader__username",)
+    list_select_related = ("booth", "leader")
+    ordering = ("booth", "joined_at", "id")
+
 
 @admin.register(LeaderBoothStatus)
 class LeaderBoothStatusAdmin(admin.ModelAdmin):
@@ -0,0 +1,278 @@
+import enum
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Booth, BoothVisit
+from .occupancy import claim_slot, release_slots
+
+
+class Outcome(enum.Enum):
+    ADMITTED = "admitted"
+    EXITED = "exited"
+    FULL = "full"
+    ALREADY_INSIDE = "already_inside"
+    NOT_INSIDE = "not_inside"
+    LOCK_TIMEOUT = "lock_timeout"
+    QUEUED = "queued"
+    ALREADY_WAITING = "already_waiting"
+
+
+class _BoothFull(Exception):
+    pass
+
+
+def is_lock_error(exc: OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "lock timeout" in message or "deadlock" in message
+
+
+class BaseAdmissionBackend:
+    # قوانین ثابت: هر لیدر حداکثر یک حضور فعال، هر غرفه حداکثر max_groups حضور فعال
+
+    def __init__(self, **options) -> None:
+        self.options = options
+
+    def enter(self, booth: Booth, user_id: int) -> Outcome:
+        raise NotImplementedError
+
+    # در کنار نتیجه، entered_at حضور بسته‌شده (برای آمار مدت حضور در exhibition.dwell)
+    def exit(self, booth_id: int, user_id: int) -> tuple[Outcome, datetime | None]:
+        raise NotImplementedError
+
+    # حضورهای فعال داده‌شده را می‌بندد و entered_at بسته‌شده‌ها را به تفکیک غرفه برمی‌گرداند
+    def close_visits(self, visits: QuerySet) -> dict[int, list[datetime]]:
+        raise NotImplementedError
+
+    # بازسازی وضعیت سمت backend از روی دیتابیس (برای repair_occupancy)
+    def sync(self) -> None:
+        pass
+
+    def _exit_in_db(self, booth_id: int, user_id: int) -> tuple[Outcome, datetime | None]:
+        try:
+            with transaction.atomic():
+                visit = (
+                    BoothVisit.objects.filter(booth_id=booth_id, leader_id=user_id, is_active=True)
+                    .values_list("pk", "entered_at")
+                    .first()
+                )
+                # UPDATE شرطی روی همان ردیف؛ خروج هم‌زمان همین لیدر فقط یک بار موفق می‌شود
+                if visit is None or not BoothVisit.objects.filter(
+                    pk=visit[0], is_active=True
+                ).update(is_active=False, exited_at=timezone.now()):
+                    return Outcome.NOT_INSIDE, None
+                release_slots(booth_id)
+        except OperationalError as exc:
+            if is_lock_error(exc):
+                return Outcome.LOCK_TIMEOUT, None
+            raise
+        return Outcome.EXITED, visit[1]
+
+    def _close_in_db(self, visits: QuerySet) -> dict[int, list[datetime]]:
+        closed_per_booth: dict[int, list[datetime]] = {}
+        now = timezone.now()
+        with transaction.atomic():
+            per_booth: dict[int, dict[int, datetime]] = {}
+            for pk, booth_id, entered_at in visits.filter(is_active=True).values_list(
+                "pk", "booth_id", "entered_at"
+            ):
+                per_booth.setdefault(booth_id, {})[pk] = entered_at
+            for booth_id in sorted(per_booth):
+                started = per_booth[booth_id]
+                closed = BoothVisit.objects.filter(pk__in=list(started), is_active=True).update(
+                    is_active=False, exited_at=now
+                )
+                if closed:
+                    release_slots(booth_id, closed)
+                    # بخشی هم‌زمان جای دیگری بسته شده؛ ردیف‌های همین UPDATE دوباره خوانده می‌شوند
+                    if closed != len(started):
+                        started = dict(
+                            BoothVisit.objects.filter(
+                                pk__in=list(started), exited_at=now
+                            ).values_list("pk", "entered_at")
+                        )
+                    closed_per_booth[booth_id] = list(started.values())
+        return closed_per_booth
+
+
+class DatabaseAdmissionBackend(BaseAdmissionBackend):
+    # بدون select_for_update: یکتایی حضور فعال هر لیدر را constraint دیتابیس تضمین
+    # می‌کند و ظرفیت را UPDATE شرطی روی Booth.current_visitors
+    def enter(self, booth: Booth, user_id: int) -> Outcome:
+        try:
+            with transaction.atomic():
+                BoothVisit.objects.create(booth=booth, leader_id=user_id, is_active=True)
+                if not claim_slot(booth.id):
+                    raise _BoothFull
+        except IntegrityError:
+            return Outcome.ALREADY_INSIDE
+        except _BoothFull:
+            return Outcome.FULL
+        except OperationalError as exc:
+            if is_lock_error(exc):
+                return Outcome.LOCK_TIMEOUT
+            raise
+        return Outcome.ADMITTED
+
+    def exit(self, booth_id: int, user_id: int) -> tuple[Outcome, datetime | None]:
+        return self._exit_in_db(booth_id, user_id)
+
+    def close_visits(self, visits: QuerySet) -> dict[int, list[datetime]]:
+        return self._close_in_db(visits)
+
+
+# KEYS[1] = شمارنده‌ی غرفه، KEYS[2] = غرفه‌ی فعلی لیدر؛ ARGV[1] = max_groups، ARGV[2] = booth id
+# -2 یعنی شمارنده‌ی غرفه هنوز در Redis نیست (Redis تازه یا flush شده) و باید از دیتابیس seed شود
+_ENTER_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return -1
+end
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+
+# KEYS[1] = شمارنده‌ی غرفه، KEYS[2] = غرفه‌ی فعلی لیدر؛ ARGV[1] = booth id
+_EXIT_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+    redis.call('DECR', KEYS[1])
+end
+return 1
+"""
+
+
+class RedisAdmissionBackend(BaseAdmissionBackend):
+    # اسلات‌های ظرفیت با یک اسکریپت Lua اتمیک در Redis گرفته می‌شوند؛ Redis فقط فیلتر سریع
+    # جلوی دیتابیس است و ظرفیت واقعی را همان UPDATE شرطی claim_slot تضمین می‌کند.
+    # هر جا Redis و دیتابیس اختلاف داشته باشند (Redis خالی، اسلاتی که تراکنش rollback شده‌ی
+    # بیرونی نگه داشته، ...) شمارنده‌ی غرفه دوباره از Booth.current_visitors پر می‌شود.
+    BOOTH_KEY = "exhibition:admission:booth:{booth_id}"
+    LEADER_KEY = "exhibition:admission:leader:{user_id}"
+
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0", **options) -> None:
+        super().__init__(**options)
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._enter = self.client.register_script(_ENTER_SCRIPT)
+        self._exit = self.client.register_script(_EXIT_SCRIPT)
+
+    def _keys(self, booth_id: int, user_id: int) -> list[str]:
+        return [
+            self.BOOTH_KEY.format(booth_id=booth_id),
+            self.LEADER_KEY.format(user_id=user_id),
+        ]
+
+    def _seed_booth(self, booth_id: int, force: bool = False) -> None:
+        occupied = (
+            Booth.objects.filter(pk=booth_id).values_list("current_visitors", flat=True).first()
+        )
+        # بدون force فقط اگر درخواست هم‌زمان دیگری زودتر seed نکرده باشد
+        self.client.set(self.BOOTH_KEY.format(booth_id=booth_id), occupied or 0, nx=not force)
+
+    def _reserve(self, booth: Booth, keys: list[str]) -> int:
+        result = self._enter(keys=keys, args=[booth.max_groups, booth.id])
+        if result == -2:
+            self._seed_booth(booth.id)
+            result = self._enter(keys=keys, args=[booth.max_groups, booth.id])
+        return result
+
+    def _release(self, booth_id: int, user_id: int) -> None:
+        self._exit(keys=self._keys(booth_id, user_id), args=[booth_id])
+
+    def enter(self, booth: Booth, user_id: int) -> Outcome:
+        keys = self._keys(booth.id, user_id)
+        result = self._reserve(booth, keys)
+        if (
+            result == -1
+            and not BoothVisit.objects.filter(leader_id=user_id, is_active=True).exists()
+        ):
+            # کلید لیدری که حضورش در دیتابیس ثبت نشد (rollback تراکنش بیرونی)
+            self.client.delete(keys[1])
+            result = self._reserve(booth, keys)
+        if result == 0 and Booth.objects.filter(
+            pk=booth.id, current_visitors__lt=F("max_groups")
+        ).exists():
+            # اسلاتی که تراکنش rollback شده نگه داشته؛ شمارنده از دیتابیس نو می‌شود
+            self._seed_booth(booth.id, force=True)
+            result = self._reserve(booth, keys)
+        if result == -1:
+            return Outcome.ALREADY_INSIDE
+        if result == 0:
+            return Outcome.FULL
+
+        try:
+            with transaction.atomic():
+                BoothVisit.objects.create(booth=booth, leader_id=user_id, is_active=True)
+                if not claim_slot(booth.id):
+                    raise _BoothFull
+        except (IntegrityError, OperationalError, _BoothFull) as exc:
+            # اسلات Redis را برگردان تا ظرفیت نشت نکند
+            self._release(booth.id, user_id)
+            if isinstance(exc, _BoothFull):
+                # Redis کمتر از دیتابیس شمرده است (مثلا seed هم‌زمان با یک خروج)
+                self._seed_booth(booth.id, force=True)
+                return Outcome.FULL
+            if isinstance(exc, IntegrityError):
+                return Outcome.ALREADY_INSIDE
+            if is_lock_error(exc):
+                return Outcome.LOCK_TIMEOUT
+            raise
+        return Outcome.ADMITTED
+
+    # اسلات‌های Redis بعد از commit آزاد می‌شوند تا rollback تراکنش بیرونی آن‌ها را دو بار آزاد نکند
+    def exit(self, booth_id: int, user_id: int) -> tuple[Outcome, datetime | None]:
+        outcome, entered_at = self._exit_in_db(booth_id, user_id)
+        if outcome is Outcome.EXITED:
+            transaction.on_commit(partial(self._release, booth_id, user_id))
+        return outcome, entered_at
+
+    def close_visits(self, visits: QuerySet) -> dict[int, list[datetime]]:
+        pairs = list(visits.filter(is_active=True).values_list("booth_id", "leader_id"))
+        closed_per_booth = self._close_in_db(visits)
+        for booth_id, user_id in pairs:
+            if booth_id in closed_per_booth:
+                transaction.on_commit(partial(self._release, booth_id, user_id))
+        return closed_per_booth
+
+    def sync(self) -> None:
+        occupied = Counter()
+        leaders: dict[int, int] = {}
+        for booth_id, user_id in BoothVisit.objects.filter(is_active=True).values_list(
+            "booth_id", "leader_id"
+        ):
+            occupied[booth_id] += 1
+            leaders[user_id] = booth_id
+
+        pipe = self.client.pipeline(transaction=True)
+        for pattern in (self.BOOTH_KEY, self.LEADER_KEY):
+            for key in self.client.scan_iter(pattern.split("{")[0] + "*"):
+                pipe.delete(key)
+        for booth_id in Booth.objects.values_list("pk", flat=True):
+            pipe.set(self.BOOTH_KEY.format(booth_id=booth_id), occupied[booth_id])
+        for user_id, booth_id in leaders.items():
+            pipe.set(self.LEADER_KEY.format(user_id=user_id), booth_id)
+        pipe.execute()
+
+
+@lru_cache(maxsize=None)
+def get_admission_backend() -> BaseAdmissionBackend:
+    backend_class = import_string(settings.EXHIBITION_ADMISSION["BACKEND"])
+    return backend_class(**settings.EXHIBITION_ADMISSION.get("OPTIONS", {}))
@@ -5,3 +5,19 @@ class ExhibitionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "exhibition"
 
+    def ready(self) -> None:
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .metrics import install_query_counter
+
+        # شمارنده‌ی کوئری MetricsMiddleware باید قبل از ساخته شدن اولین اتصال نصب شود
+        connection_created.connect(install_query_counter, dispatch_uid="exhibition_query_counter")
+
+        if settings.EXHIBITION_PROFILE_SAMPLE_RATE > 0:
+            from .profiler import install_query_profiler
+
+            connection_created.connect(
+                install_query_profiler, dispatch_uid="exhibition_query_profiler"
+            )
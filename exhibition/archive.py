@@ -0,0 +1,62 @@
+from collections.abc import Callable
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BoothVisit, BoothVisitArchive
+
+
+def archive_cutoff(older_than: timedelta | None = None):
+    if older_than is None:
+        older_than = timedelta(hours=settings.EXHIBITION_ARCHIVE_AFTER_HOURS)
+    return timezone.now() - older_than
+
+
+def _archivable(cutoff):
+    return BoothVisit.objects.filter(is_active=False, exited_at__lt=cutoff)
+
+
+def count_archivable(older_than: timedelta | None = None) -> int:
+    return _archivable(archive_cutoff(older_than)).count()
+
+
+def _archive_batch(cutoff, batch_size: int) -> int:
+    with transaction.atomic():
+        rows = list(
+            _archivable(cutoff)
+            .order_by("pk")
+            .values_list("pk", "booth_id", "leader_id", "entered_at", "exited_at")[:batch_size]
+        )
+        if not rows:
+            return 0
+        BoothVisitArchive.objects.bulk_create(
+            BoothVisitArchive(
+                booth_id=booth_id, leader_id=leader_id, entered_at=entered_at, exited_at=exited_at
+            )
+            for _, booth_id, leader_id, entered_at, exited_at in rows
+        )
+        # شرط is_active=False دوباره چک می‌شود؛ حضور بسته‌شده هیچ‌وقت دوباره فعال نمی‌شود
+        # ولی حذف نباید به هیچ ردیف زنده‌ای دست بزند
+        BoothVisit.objects.filter(pk__in=[row[0] for row in rows], is_active=False).delete()
+    return len(rows)
+
+
+def archive_visits(
+    older_than: timedelta | None = None,
+    batch_size: int | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    # هر batch در تراکنش جداگانه منتقل می‌شود تا قفل نوشتن طولانی نشود و
+    # ورود/خروج لیدرها بین batch ها ادامه پیدا کند
+    cutoff = archive_cutoff(older_than)
+    batch_size = batch_size or settings.EXHIBITION_ARCHIVE_BATCH_SIZE
+    total = 0
+    while True:
+        moved = _archive_batch(cutoff, batch_size)
+        total += moved
+        if moved and progress is not None:
+            progress(total)
+        if moved < batch_size:
+            return total
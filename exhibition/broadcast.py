@@ -0,0 +1,224 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import BROADCAST_LATENCY
+from .dwell import estimator
+from .occupancy import get_document, leader_state, next_sequence
+from .wire import update_frames
+
+logger = logging.getLogger(__name__)
+
+CAPACITY_GROUP = "capacity_updates"
+SEND_TIMEOUT = 5.0
+
+
+def leader_group_name(user_id: int) -> str:
+    return f"leader_{user_id}"
+
+
+# view ها فقط شناسه‌ی غرفه/لیدر تغییرکرده را (بعد از commit) علامت می‌زنند؛
+# thread پس‌زمینه بعد از یک پنجره‌ی کوتاه همه را یکجا جمع می‌کند و
+# یک پیام ظرفیت برای همه‌ی غرفه‌ها + یک پیام وضعیت برای هر لیدر می‌فرستد.
+class BroadcastDispatcher:
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self.stats = {
+            "queued": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "sent": 0,
+            "failed": 0,
+            "dropped": 0,
+        }
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._dirty_booths: set[int] = set()
+        self._dirty_leaders: set[int] = set()
+        # زمان اولین علامت بعد از آخرین flush؛ برای متریک تاخیر broadcast
+        self._pending_since: float | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._stopping = False
+        self._server_loop: asyncio.AbstractEventLoop | None = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        # وقتی consumer ها روی event loop سرور اجرا می‌شوند، ارسال هم همان‌جا انجام
+        # می‌شود تا channel layer (و connection pool آن) بین thread ها تقسیم نشود
+        self._server_loop = loop
+
+    # ---------- سمت view ها ----------
+
+    def booth_changed(self, booth_id: int) -> None:
+        self._mark(booth_ids=(booth_id,))
+
+    def leader_changed(self, user_id: int) -> None:
+        self._mark(leader_ids=(user_id,))
+
+    # چند تغییر هم‌زمان (مثلا یک دور sweeper) زیر یک قفل علامت می‌خورند و در یک batch می‌روند
+    def changed(self, booth_ids: Iterable[int] = (), leader_ids: Iterable[int] = ()) -> None:
+        self._mark(booth_ids=booth_ids, leader_ids=leader_ids)
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _mark(self, booth_ids: Iterable[int] = (), leader_ids: Iterable[int] = ()) -> None:
+        with self._lock:
+            pending = ((self._dirty_booths, booth_ids), (self._dirty_leaders, leader_ids))
+            for dirty, item_ids in pending:
+                for item_id in item_ids:
+                    if self._stopping:
+                        self.stats["dropped"] += 1
+                        continue
+                    self.stats["queued"] += 1
+                    if item_id in dirty:
+                        self.stats["coalesced"] += 1
+                    dirty.add(item_id)
+            if self._stopping:
+                return
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+        self._ensure_worker()
+        self._wakeup.set()
+
+    # ---------- worker ----------
+
+    def _ensure_worker(self) -> None:
+        # بعد از fork شدن پروسه، thread قبلی وجود ندارد
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="exhibition-broadcast", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stopping:
+                self._wakeup.wait()
+                time.sleep(self.window)
+                self._wakeup.clear()
+                self._flush(loop)
+        finally:
+            self._flush(loop)
+            loop.close()
+
+    def _drain(self) -> tuple[list[int], list[int], float | None]:
+        with self._lock:
+            booths, leaders = sorted(self._dirty_booths), sorted(self._dirty_leaders)
+            self._dirty_booths.clear()
+            self._dirty_leaders.clear()
+            since, self._pending_since = self._pending_since, None
+        return booths, leaders, since
+
+    def flush(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            self._flush(loop)
+        finally:
+            loop.close()
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        booth_ids, leader_ids, since = self._drain()
+        if not booth_ids and not leader_ids:
+            return
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            self._count("dropped", len(booth_ids) + len(leader_ids))
+            logger.warning(
+                "No channel layer configured; dropped %d broadcasts.",
+                len(booth_ids) + len(leader_ids),
+            )
+            return
+
+        close_old_connections()
+        try:
+            messages = self._build_messages(booth_ids, leader_ids)
+        except Exception:
+            self._count("failed", len(booth_ids) + len(leader_ids))
+            logger.exception("Failed to build capacity broadcast.")
+            return
+        finally:
+            close_old_connections()
+
+        self._count("batches")
+        for group, message in messages:
+            try:
+                self._send(loop, channel_layer.group_send(group, message))
+            except Exception:
+                self._count("failed")
+                logger.exception("Failed to send %s to group %s.", message["type"], group)
+            else:
+                self._count("sent")
+        if since is not None:
+            BROADCAST_LATENCY.observe(value=time.monotonic() - since)
+
+    def _send(self, loop: asyncio.AbstractEventLoop, coro) -> None:
+        server_loop = self._server_loop
+        if server_loop is not None and server_loop.is_running():
+            asyncio.run_coroutine_threadsafe(coro, server_loop).result(SEND_TIMEOUT)
+        else:
+            loop.run_until_complete(coro)
+
+    def _build_messages(
+        self, booth_ids: list[int], leader_ids: list[int]
+    ) -> list[tuple[str, dict[str, Any]]]:
+        messages: list[tuple[str, dict[str, Any]]] = []
+        if booth_ids:
+            wanted = set(booth_ids)
+            estimator.warm()
+            booths = estimator.annotate(b for b in get_document()["booths"] if b["id"] in wanted)
+            seq = next_sequence()
+            # JSON و msgpack همین‌جا یک بار ساخته می‌شوند و consumer ها فقط فریم آماده را می‌فرستند
+            messages.append(
+                (
+                    CAPACITY_GROUP,
+                    {
+                        "type": "capacity.update",
+                        "seq": seq,
+                        # consumer های کند به جای فریم، فقط آخرین ردیف هر غرفه را نگه می‌دارند
+                        "booths": booths,
+                        **update_frames(seq, booths),
+                    },
+                )
+            )
+        for user_id in leader_ids:
+            messages.append(
+                (leader_group_name(user_id), {"type": "leader.state", **leader_state(user_id)})
+            )
+        return messages
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._lock:
+            self.stats["dropped"] += len(self._dirty_booths) + len(self._dirty_leaders)
+            self._dirty_booths.clear()
+            self._dirty_leaders.clear()
+
+
+dispatcher = BroadcastDispatcher(window=settings.EXHIBITION_BROADCAST_WINDOW)
+atexit.register(dispatcher.stop)
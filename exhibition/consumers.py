@@ -1,25 +1,308 @@
+import asyncio
 import json
+import logging
+import time
+from collections import Counter, deque
 from typing import Any
 
+import msgpack
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 
+from .broadcast import CAPACITY_GROUP, dispatcher, leader_group_name
+from .dwell import estimator
+from .occupancy import current_sequence, get_document, leader_state, sequence_epoch
+from .roles import LEADERS, aget_roles
+from .wire import MSGPACK_SUBPROTOCOL, encode_json, encode_msgpack, encode_snapshot, encode_update
 
+logger = logging.getLogger(__name__)
+
+# ارسالی که بیشتر از این (ثانیه) طول بکشد کند حساب می‌شود
+SLOW_SEND_SECONDS = 0.05
+
+# کد بستن اتصال‌هایی که سرور بیرون می‌کند؛ داشبوردها بعد از هر close دوباره وصل می‌شوند
+CLOSE_IDLE = 4000
+CLOSE_SLOW = 4008
+
+
+# شمارنده‌های تجمیعی همه‌ی consumer های این پروسه. به جای print برای هر پیام،
+# هر report_interval ثانیه (در صورت فعالیت) یک خط خلاصه در سطح INFO لاگ می‌شود.
+# همه‌ی consumer ها روی یک event loop اجرا می‌شوند، پس قفل لازم نیست.
+class ConsumerStats:
+    def __init__(self, report_interval: float) -> None:
+        self.report_interval = report_interval
+        self.active = 0
+        self.counters: Counter = Counter()
+        self.send_seconds = 0.0
+        self.send_max = 0.0
+        self._window_send_max = 0.0
+        self._reported: Counter = Counter()
+        self._last_report = time.monotonic()
+
+    def connected(self) -> None:
+        self.active += 1
+        self.counters["connected"] += 1
+        self._maybe_report()
+
+    def disconnected(self) -> None:
+        self.active -= 1
+        self.counters["disconnected"] += 1
+        self._maybe_report()
+
+    def count(self, key: str) -> None:
+        self.counters[key] += 1
+
+    def sent(self, size: int, elapsed: float) -> None:
+        self.counters["messages_sent"] += 1
+        self.counters["bytes_sent"] += size
+        self.send_seconds += elapsed
+        self.send_max = max(self.send_max, elapsed)
+        self._window_send_max = max(self._window_send_max, elapsed)
+        if elapsed >= SLOW_SEND_SECONDS:
+            self.counters["slow_sends"] += 1
+        self._maybe_report()
+
+    def snapshot(self, channel_layer=None) -> dict[str, Any]:
+        sent = self.counters["messages_sent"]
+        return {
+            "active": self.active,
+            **self.counters,
+            "send_seconds_total": self.send_seconds,
+            "send_seconds_avg": self.send_seconds / sent if sent else 0.0,
+            "send_seconds_max": self.send_max,
+            # پیام‌هایی که channel layer به خاطر پر بودن صف consumer کند دور ریخته است
+            "layer_dropped": getattr(channel_layer, "stats", {}).get("dropped", 0),
+        }
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval:
+            return
+        elapsed, self._last_report = now - self._last_report, now
+        delta = self.counters - self._reported
+        self._reported = self.counters.copy()
+        window_max, self._window_send_max = self._window_send_max, 0.0
+        if not delta or not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(
+            "capacity sockets: active=%d connected=%d disconnected=%d rejected=%d "
+            "sent=%d (%.1f/s) bytes=%d slow_sends=%d max_send_ms=%.1f resyncs=%d "
+            "coalesced=%d catch_ups=%d evicted_slow=%d evicted_idle=%d",
+            self.active,
+            delta["connected"],
+            delta["disconnected"],
+            delta["rejected"],
+            delta["messages_sent"],
+            delta["messages_sent"] / elapsed,
+            delta["bytes_sent"],
+            delta["slow_sends"],
+            window_max * 1000,
+            delta["resyncs"],
+            delta["coalesced"],
+            delta["catch_ups"],
+            delta["evicted_slow"],
+            delta["evicted_idle"],
+        )
+
+
+stats = ConsumerStats(report_interval=settings.EXHIBITION_WS_STATS_INTERVAL)
+
+
+@database_sync_to_async
+def _load_snapshot(binary: bool) -> tuple[int, str | bytes]:
+    # شماره‌ی ترتیب قبل از ساختن snapshot خوانده می‌شود تا هیچ تغییری جا نماند
+    seq = current_sequence()
+    estimator.warm()
+    return seq, encode_snapshot(seq, estimator.annotate(get_document()["booths"]), binary)
+
+
+@database_sync_to_async
+def _load_leader_state(user_id: int) -> dict[str, Any]:
+    return {"type": "leader.state", **leader_state(user_id)}
+
+
+# ========== کنترل جریان ==========
+# هر اتصال حداکثر EXHIBITION_WS_WINDOW فریم capacity بدون ack در راه دارد. وقتی window پر است
+# پیام‌های بعدی فریم نگه نمی‌دارند، فقط ردیف غرفه‌هایشان در dirty جایگزین می‌شود (آخرین وضعیت
+# هر غرفه برنده است) و با ack بعدی یک پیام جبرانی با همین ردیف‌ها می‌رود.
+# پس حافظه‌ی هر اتصال به window و تعداد غرفه‌ها محدود است، هر قدر هم کلاینت کند باشد.
+# کلاینتی که بیش از EXHIBITION_WS_EVICT_AFTER پشت window بماند یا EXHIBITION_WS_TIMEOUT
+# هیچ پیامی (ack/pong) نفرستد بسته می‌شود.
 class CapacityConsumer(AsyncWebsocketConsumer):
     async def connect(self) -> None:
         if self.scope["user"].is_anonymous:
-            print("کاربر ناشناس سعی در اتصال به WebSocket داشت")
+            stats.count("rejected")
+            logger.debug("Rejected anonymous WebSocket connection.")
             await self.close()
             return
 
-        self.group_name = "capacity_updates"
+        dispatcher.bind_loop(asyncio.get_running_loop())
+
+        user = self.scope["user"]
+        self.group_name = CAPACITY_GROUP
+        stats.connected()
+        is_leader = LEADERS in await aget_roles(user)
+        self.leader_group = leader_group_name(user.id) if is_leader else None
+
+        self.window = settings.EXHIBITION_WS_WINDOW
+        self.inflight: deque[int] = deque()
+        self.sent_seq = 0
+        self.seen_seq = 0
+        self.dirty: dict[int, dict[str, Any]] = {}
+        self.dirty_nv: int | None = None
+        self.pending_leader_state: dict[str, Any] | None = None
+        self.behind_since: float | None = None
+        self.last_seen = time.monotonic()
+        self.closing = False
+
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
-        print(f"کاربر {self.scope['user'].username} به گروه capacity_updates متصل شد")
+        if self.leader_group:
+            await self.channel_layer.group_add(self.leader_group, self.channel_name)
+        # کلاینت‌هایی که زیرپروتکل msgpack را اعلام کنند فریم باینری فشرده می‌گیرند
+        self.binary = MSGPACK_SUBPROTOCOL in self.scope.get("subprotocols", [])
+        await self.accept(subprotocol=MSGPACK_SUBPROTOCOL if self.binary else None)
+        logger.debug("User %s joined %s (binary=%s).", user.username, self.group_name, self.binary)
+
+        self.heartbeat = asyncio.create_task(self._heartbeat())
+        await self._send_full_state()
 
     async def disconnect(self, close_code: int) -> None:
+        if not hasattr(self, "group_name"):
+            return
+        self.heartbeat.cancel()
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
-        print(f"کاربر {self.scope['user'].username} از WebSocket قطع شد (کد: {close_code})")
+        if self.leader_group:
+            await self.channel_layer.group_discard(self.leader_group, self.channel_name)
+        stats.disconnected()
+        logger.debug("User %s disconnected (code %s).", self.scope["user"].username, close_code)
+
+    async def receive(self, text_data: str | None = None, bytes_data: bytes | None = None) -> None:
+        # هر پیامی از کلاینت (از جمله pong) یعنی اتصال زنده است
+        self.last_seen = time.monotonic()
+        try:
+            if bytes_data is not None:
+                message = msgpack.unpackb(bytes_data)
+            else:
+                message = json.loads(text_data or "")
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+
+        if message.get("type") == "ack":
+            await self._acked(message.get("seq"))
+        elif message.get("type") == "resync":
+            # کلاینت با دیدن فاصله در seq درخواست همگام‌سازی کامل می‌دهد. snapshot جای همه‌ی
+            # فریم‌های در راه را می‌گیرد، پس window خالی می‌شود و snapshot بی‌معطلی می‌رود؛
+            # پارک کردن آن پشت window پر به بسته شدن اتصال (evicted_slow) ختم می‌شد
+            stats.count("resyncs")
+            self.inflight.clear()
+            await self._send_full_state()
+
+    async def _send_frame(self, frame: str | bytes) -> None:
+        start = time.perf_counter()
+        if self.binary:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+        stats.sent(len(frame), time.perf_counter() - start)
+
+    async def _send_message(self, message: dict[str, Any]) -> None:
+        await self._send_frame(encode_msgpack(message) if self.binary else encode_json(message))
+
+    async def _send_capacity(self, seq: int, frame: str | bytes) -> None:
+        self.inflight.append(seq)
+        self.sent_seq = seq
+        await self._send_frame(frame)
+
+    async def _send_full_state(self) -> None:
+        seq, frame = await _load_snapshot(self.binary)
+        self.dirty.clear()
+        self.behind_since = None
+        if sequence_epoch(seq) == sequence_epoch(self.seen_seq):
+            self.seen_seq = max(self.seen_seq, seq)
+        else:
+            self.seen_seq = seq
+        await self._send_capacity(seq, frame)
+        if self.leader_group:
+            self.pending_leader_state = None
+            await self._send_message(await _load_leader_state(self.scope["user"].id))
+
+    def _congested(self) -> bool:
+        return len(self.inflight) >= self.window
+
+    async def _acked(self, seq: Any) -> None:
+        if not isinstance(seq, int):
+            return
+        while self.inflight and self.inflight[0] <= seq:
+            self.inflight.popleft()
+        if self._congested():
+            return
+
+        if self.dirty:
+            booths, self.dirty = list(self.dirty.values()), {}
+            frame = encode_update(
+                self.seen_seq, booths, self.binary, since=self.sent_seq, nv=self.dirty_nv
+            )
+            stats.count("catch_ups")
+            await self._send_capacity(self.seen_seq, frame)
+        if self.pending_leader_state is not None:
+            event, self.pending_leader_state = self.pending_leader_state, None
+            await self._send_message(event)
+        self.behind_since = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(settings.EXHIBITION_WS_HEARTBEAT)
+            if time.monotonic() - self.last_seen > settings.EXHIBITION_WS_TIMEOUT:
+                await self._evict("evicted_idle", CLOSE_IDLE)
+                return
+            await self._send_message({"type": "ping"})
+
+    async def _evict(self, reason: str, code: int) -> None:
+        if self.closing:
+            return
+        self.closing = True
+        stats.count(reason)
+        logger.debug("Evicting %s from %s (%s).", self.scope["user"].username, self.group_name, reason)
+        await self.close(code=code)
+
+    def _fell_behind(self) -> bool:
+        now = time.monotonic()
+        if self.behind_since is None:
+            self.behind_since = now
+        return now - self.behind_since > settings.EXHIBITION_WS_EVICT_AFTER
 
     async def capacity_update(self, event: dict[str, Any]) -> None:
-        print(f"پیام capacity_update به کاربر {self.scope['user'].username} ارسال می‌شود: {event}")
-        await self.send(text_data=json.dumps(event))
\ No newline at end of file
+        seq = event["seq"]
+        if self.closing:
+            return
+        if sequence_epoch(seq) != sequence_epoch(self.sent_seq):
+            # شمارنده‌ی seq در cache از نو ساخته شده (cull، flush یا restart)؛ seq های قبلی دیگر
+            # قابل مقایسه نیستند، پس به جای دور ریختن پیام، snapshot کامل جای همه چیز را می‌گیرد
+            stats.count("resyncs")
+            self.inflight.clear()
+            await self._send_full_state()
+            return
+        # قبلا در snapshot یا پیام جبرانی به کلاینت رسیده
+        if seq <= self.sent_seq:
+            return
+        self.seen_seq = max(self.seen_seq, seq)
+        if self._congested() or self.dirty:
+            for booth in event["booths"]:
+                self.dirty[booth["id"]] = booth
+            self.dirty_nv = event["nv"]
+            stats.count("coalesced")
+            if self._fell_behind():
+                await self._evict("evicted_slow", CLOSE_SLOW)
+            return
+        await self._send_capacity(seq, event["bytes"] if self.binary else event["text"])
+
+    async def leader_state(self, event: dict[str, Any]) -> None:
+        if self.closing:
+            return
+        if self._congested():
+            self.pending_leader_state = event
+            return
+        await self._send_message(event)
@@ -0,0 +1,176 @@
+import math
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.conf import settings
+
+from .models import BoothVisit
+
+# ========== آمار جریانی مدت حضور در هر غرفه ==========
+# با هر خروج (exit_booth، admin_force_exit، leader_delete) مدت حضور در O(1) به آمار همان غرفه
+# اضافه می‌شود (entered_at را backend پذیرش در همان کوئری بستن حضور برمی‌گرداند): یک EWMA برای میانگین اخیر و دو تخمین‌گر P² برای میانه و صدک ۹۰.
+# زمان تا خالی شدن اسلات بعدی فقط از همین حالت درون‌حافظه و entered_at لیدرهای داخل غرفه
+# (در سند اشغال cache شده) ساخته می‌شود و هیچ درخواستی تاریخچه‌ی BoothVisit را نمی‌خواند.
+
+
+# الگوریتم P² (Jain & Chlamtac 1985): پنج نشانگر به جای نگه‌داشتن نمونه‌ها
+class P2Quantile:
+    def __init__(self, quantile: float) -> None:
+        self.quantile = quantile
+        self.count = 0
+        self._heights: list[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4]
+        self._increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (
+                offset <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float | None:
+        if not self.count:
+            return None
+        if self.count <= 5:
+            return self._heights[min(int(self.quantile * self.count), self.count - 1)]
+        return self._heights[2]
+
+
+class BoothDwell:
+    def __init__(self, alpha: float) -> None:
+        self.alpha = alpha
+        self.count = 0
+        self.ewma = 0.0
+        self.median = P2Quantile(0.5)
+        self.p90 = P2Quantile(0.9)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.ewma = seconds if self.count == 1 else self.ewma + self.alpha * (seconds - self.ewma)
+        self.median.add(seconds)
+        self.p90.add(seconds)
+
+    # زمان باقی‌مانده‌ی لیدری که elapsed ثانیه داخل است: تا میانگین اخیر، اگر از آن گذشته
+    # تا صدک ۹۰، و بعد از آن هر لحظه ممکن است خارج شود
+    def remaining(self, elapsed: float) -> float:
+        if elapsed < self.ewma:
+            return self.ewma - elapsed
+        return max(self.p90.value() - elapsed, 0.0)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "ewma": round(self.ewma),
+            "p50": round(self.median.value()),
+            "p90": round(self.p90.value()),
+        }
+
+
+class DwellEstimator:
+    def __init__(self, alpha: float, min_samples: int, warmup: int) -> None:
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.warmup = warmup
+        self.warmed = False
+        self._lock = threading.Lock()
+        self._booths: dict[int, BoothDwell] = {}
+
+    def _observe(self, booth_id: int, seconds: float) -> None:
+        stats = self._booths.get(booth_id)
+        if stats is None:
+            stats = self._booths[booth_id] = BoothDwell(self.alpha)
+        stats.observe(max(seconds, 0.0))
+
+    # مسیرهای خروج warm() را قبل از بستن حضور صدا می‌زنند؛ این فراخوانی فقط پشتیبان است
+    def observe(self, booth_id: int, seconds: float) -> None:
+        self.warm()
+        with self._lock:
+            self._observe(booth_id, seconds)
+
+    # یک بار در هر پروسه (بعد از راه‌اندازی) آمار از آخرین خروج‌های ثبت‌شده پر می‌شود
+    def warm(self) -> None:
+        if self.warmed:
+            return
+        recent = list(
+            BoothVisit.objects.filter(is_active=False, exited_at__isnull=False)
+            .order_by("-exited_at")
+            .values_list("booth_id", "entered_at", "exited_at")[: self.warmup]
+        )
+        with self._lock:
+            if self.warmed:
+                return
+            for booth_id, entered_at, exited_at in reversed(recent):
+                self._observe(booth_id, (exited_at - entered_at).total_seconds())
+            self.warmed = True
+
+    # ثانیه تا آزاد شدن اسلاتی که به تازه‌وارد می‌رسد (بعد از صف انتظار)؛ None یعنی داده‌ی کافی نیست
+    def wait_seconds(self, booth: dict[str, Any], now: float) -> int | None:
+        ahead = booth["waiting"] - booth["remaining"]
+        if ahead < 0:
+            return 0
+        stats = self._booths.get(booth["id"])
+        leaders = booth["leaders"]
+        if stats is None or stats.count < self.min_samples or not leaders:
+            return None
+        residuals = sorted(stats.remaining(now - leader["entered_at"]) for leader in leaders)
+        # اسلات ahead+1 ام؛ اگر از تعداد داخل‌ها بیشتر است دورهای بعدی با میانگین اخیر
+        rounds, index = divmod(ahead, len(residuals))
+        return math.ceil(residuals[index] + rounds * stats.ewma)
+
+    def annotate(self, booths: Iterable[dict[str, Any]], now: float | None = None) -> list[dict[str, Any]]:
+        # ردیف‌های سند cache شده (و پیام‌های مشترک channel layer) نباید تغییر کنند
+        now = time.time() if now is None else now
+        with self._lock:
+            return [{**booth, "wait_seconds": self.wait_seconds(booth, now)} for booth in booths]
+
+    def snapshot(self) -> dict[int, dict[str, Any]]:
+        with self._lock:
+            return {booth_id: stats.as_dict() for booth_id, stats in self._booths.items()}
+
+
+estimator = DwellEstimator(
+    alpha=settings.EXHIBITION_DWELL_ALPHA,
+    min_samples=settings.EXHIBITION_DWELL_MIN_SAMPLES,
+    warmup=settings.EXHIBITION_DWELL_WARMUP,
+)
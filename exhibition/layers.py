@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Any
+
+from channels.layers import InMemoryChannelLayer
+
+
+# channel layer درون‌پروسه‌ای برای استقرار تک‌نود (یک پروسه‌ی daphne):
+#   - پیام گروهی یک بار ساخته می‌شود و همان dict (بدون deepcopy/serialize) در صف همه‌ی
+#     consumer ها گذاشته می‌شود؛ consumer ها نباید event را تغییر دهند
+#   - تحویل با put_nowait است و منتظر هیچ کلاینتی نمی‌ماند؛ صف پر = پیام آن کانال دور
+#     ریخته می‌شود و کلاینت با دیدن فاصله در seq خودش resync می‌کند
+#   - اعضای گروه در shard های shard_size تایی پر می‌شوند و بین shard ها event loop آزاد
+#     می‌شود تا fan-out به هزاران سوکت بقیه‌ی کارها را معطل نکند
+#   - فراخوانی از thread دیگر (مثلا BroadcastDispatcher) به event loop سرور منتقل می‌شود
+class LocalFanoutChannelLayer(InMemoryChannelLayer):
+    def __init__(self, shard_size: int = 500, cleanup_interval: float = 1.0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.shard_size = shard_size
+        self.cleanup_interval = cleanup_interval
+        self.stats = {"group_sends": 0, "delivered": 0, "dropped": 0}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last_cleanup = 0.0
+
+    def _clean_expired(self) -> None:
+        # نسخه‌ی پایه روی هر send/receive همه‌ی کانال‌ها را پیمایش می‌کند
+        now = time.monotonic()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        super()._clean_expired()
+
+    def _foreign_loop(self) -> asyncio.AbstractEventLoop | None:
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return None
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        return loop if current is not loop else None
+
+    async def _on_home_loop(self, loop: asyncio.AbstractEventLoop, coro) -> Any:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def receive(self, channel: str) -> dict[str, Any]:
+        if self._loop is None or not self._loop.is_running():
+            self._loop = asyncio.get_running_loop()
+        return await super().receive(channel)
+
+    async def send(self, channel: str, message: dict[str, Any]) -> None:
+        loop = self._foreign_loop()
+        if loop is not None:
+            return await self._on_home_loop(loop, self.send(channel, message))
+        await super().send(channel, message)
+
+    async def group_add(self, group: str, channel: str) -> None:
+        loop = self._foreign_loop()
+        if loop is not None:
+            return await self._on_home_loop(loop, self.group_add(group, channel))
+        await super().group_add(group, channel)
+
+    async def group_discard(self, group: str, channel: str) -> None:
+        loop = self._foreign_loop()
+        if loop is not None:
+            return await self._on_home_loop(loop, self.group_discard(group, channel))
+        await super().group_discard(group, channel)
+
+    def _put(self, channel: str, message: dict[str, Any], expires: float) -> bool:
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        try:
+            queue.put_nowait((expires, message))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def group_send(self, group: str, message: dict[str, Any]) -> None:
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        loop = self._foreign_loop()
+        if loop is not None:
+            return await self._on_home_loop(loop, self.group_send(group, message))
+
+        self._clean_expired()
+        channels = list(self.groups.get(group, ()))
+        expires = time.time() + self.expiry
+        self.stats["group_sends"] += 1
+        for start in range(0, len(channels), self.shard_size):
+            if start:
+                await asyncio.sleep(0)
+                members = self.groups.get(group, {})
+            else:
+                members = None
+            for channel in channels[start : start + self.shard_size]:
+                # بعد از آزاد کردن loop ممکن است سوکت قطع و از گروه خارج شده باشد
+                if members is not None and channel not in members:
+                    continue
+                if self._put(channel, message, expires):
+                    self.stats["delivered"] += 1
+                else:
+                    self.stats["dropped"] += 1
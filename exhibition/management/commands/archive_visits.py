@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from exhibition.archive import archive_visits, count_archivable
+
+
+class Command(BaseCommand):
+    help = (
+        "Move closed booth visits older than the configured age from BoothVisit into "
+        "BoothVisitArchive in bulk batches, keeping the live table small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-hours",
+            type=float,
+            default=settings.EXHIBITION_ARCHIVE_AFTER_HOURS,
+            help="Archive visits that exited more than this many hours ago "
+            "(default: EXHIBITION_ARCHIVE_AFTER_HOURS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EXHIBITION_ARCHIVE_BATCH_SIZE,
+            help="Rows moved per transaction (default: EXHIBITION_ARCHIVE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many visits would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(hours=options["older_than_hours"])
+        if options["dry_run"]:
+            self.stdout.write(f"{count_archivable(older_than)} closed visit(s) would be archived.")
+            return
+
+        def progress(total: int) -> None:
+            self.stdout.write(f"  archived {total} visit(s)...")
+
+        total = archive_visits(older_than, options["batch_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} closed visit(s)."))
@@ -0,0 +1,117 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.functions import Coalesce
+
+from exhibition.models import Booth, BoothVisit, LeaderBoothStatus
+from exhibition.occupancy import _active_count_subquery, _active_visits_prefetch
+
+# ایندکس‌های جزئی (فقط ردیف‌های فعال/تیک‌خورده) که کوئری‌های داغ باید از آن‌ها استفاده کنند
+PARTIAL_INDEXES = {
+    BoothVisit._meta.db_table: {
+        "active_visit_booth_idx",
+        "active_visit_leader_idx",
+        "unique_active_visit_per_booth_leader",
+        "unique_active_visit_per_leader",
+    },
+    LeaderBoothStatus._meta.db_table: {"checked_status_leader_idx"},
+}
+
+
+def _hot_queries(booth_id: int, leader_id: int) -> list[tuple[str, str, object]]:
+    visits = BoothVisit._meta.db_table
+    return [
+        (
+            "snapshot: active visits per booth",
+            visits,
+            _active_visits_prefetch().queryset.filter(booth_id__in=[booth_id]),
+        ),
+        (
+            "drift check: active count per booth",
+            visits,
+            Booth.objects.annotate(actual=Coalesce(_active_count_subquery(), 0)),
+        ),
+        (
+            "leader state: active booths",
+            visits,
+            BoothVisit.objects.filter(leader_id=leader_id, is_active=True).values_list("booth_id"),
+        ),
+        (
+            "exit: active visit of leader in booth",
+            visits,
+            BoothVisit.objects.filter(booth_id=booth_id, leader_id=leader_id, is_active=True),
+        ),
+        (
+            "leader state: checked booths",
+            LeaderBoothStatus._meta.db_table,
+            LeaderBoothStatus.objects.filter(leader_id=leader_id, is_checked=True).values_list("booth_id"),
+        ),
+    ]
+
+
+def _other_indexes(table: str) -> set[str]:
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {name for name, info in constraints.items() if info["index"]} - PARTIAL_INDEXES[table]
+
+
+def _plan_problem(plan: str, table: str, others: set[str]) -> str | None:
+    if re.search(rf"\bSCAN {table}\b(?! USING)|Seq Scan on {table}\b", plan):
+        return f"full scan of {table}"
+    used_others = sorted(name for name in others if re.search(rf"\b{re.escape(name)}\b", plan))
+    if used_others:
+        return f"uses non-partial index {', '.join(used_others)}"
+    if not any(re.search(rf"\b{name}\b", plan) for name in PARTIAL_INDEXES[table]):
+        return f"no partial index of {table} in plan"
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the hot occupancy queries and fail if any of them reads the visit "
+        "history instead of the partial indexes over active visits / checked statuses. "
+        "Run it against representative data: on a nearly empty table any plan is cheap "
+        "and the planner may legitimately pick a full index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Refresh planner statistics (ANALYZE) before checking.",
+        )
+        parser.add_argument(
+            "--show-plans",
+            action="store_true",
+            help="Print the full plan of every query.",
+        )
+
+    def handle(self, *args, **options):
+        if options["analyze"]:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        booth_id = Booth.objects.values_list("pk", flat=True).first() or 0
+        leader_id = BoothVisit.objects.values_list("leader_id", flat=True).first() or 0
+
+        others = {table: _other_indexes(table) for table in PARTIAL_INDEXES}
+        failures = 0
+        for label, table, queryset in _hot_queries(booth_id, leader_id):
+            plan = queryset.explain()
+            problem = _plan_problem(plan, table, others[table])
+            if problem:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {label}: {problem}"))
+            else:
+                self.stdout.write(f"ok   {label}")
+            if problem or options["show_plans"]:
+                for line in plan.splitlines():
+                    self.stdout.write(f"       {line}")
+
+        if failures:
+            raise CommandError(
+                f"{failures} hot query plan(s) bypass the partial indexes; "
+                "run with --analyze if planner statistics are stale."
+            )
+        self.stdout.write(self.style.SUCCESS("All hot queries use partial indexes."))
@@ -0,0 +1,72 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exhibition.occupancy import local_cache_warning
+from exhibition.provisioning import import_leaders
+
+
+class Command(BaseCommand):
+    help = (
+        "Create leader accounts in bulk from a CSV file with the columns "
+        "username,password[,first_name,last_name] (header row optional). Passwords are "
+        "hashed across a process pool and users are inserted with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import ('-' for stdin).")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes used to hash passwords (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows per INSERT for users and group memberships (default: 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only validate the file and report per-row errors.",
+        )
+
+    def handle(self, *args, **options):
+        warning = local_cache_warning()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+        path = options["path"]
+        try:
+            if path == "-":
+                text = sys.stdin.read()
+            else:
+                with open(path, encoding="utf-8-sig") as handle:
+                    text = handle.read()
+        except OSError as exc:
+            raise CommandError(f"Could not read {path}: {exc}") from exc
+
+        started = time.perf_counter()
+        result = import_leaders(
+            text,
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for error in result["errors"]:
+            self.stderr.write(f"  line {error['line']} ({error['username'] or '-'}): {error['error']}")
+        if options["dry_run"]:
+            self.stdout.write(
+                f"{result['valid']} row(s) valid, {len(result['errors'])} error(s)."
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(result['created'])} leader(s) in {elapsed:.1f}s, "
+                f"{len(result['errors'])} row(s) rejected."
+            )
+        )
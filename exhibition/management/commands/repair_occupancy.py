@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exhibition.admission import get_admission_backend
+from exhibition.occupancy import find_counter_drift, local_cache_warning, repair_counter_drift
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify Booth.current_visitors against active BoothVisit rows and repair any drift; "
+        "also resyncs the admission backend's own state."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift; exit with an error if any booth is off.",
+        )
+
+    def handle(self, *args, **options):
+        warning = local_cache_warning()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+        if options["check"]:
+            drift = find_counter_drift()
+        else:
+            drift = repair_counter_drift()
+            get_admission_backend().sync()
+
+        for row in drift:
+            self.stdout.write(
+                f"booth {row['id']}: counter={row['counter']} actual={row['actual']}"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All booth counters match active visits."))
+        elif options["check"]:
+            raise CommandError(f"{len(drift)} booth counter(s) drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} booth counter(s)."))
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from exhibition.occupancy import local_cache_warning
+from exhibition.sweeper import find_expired, sweep
+
+
+class Command(BaseCommand):
+    help = (
+        "Close active booth visits that exceeded their booth's max visit duration "
+        "(Booth.max_visit_minutes or EXHIBITION_MAX_VISIT_MINUTES). The ASGI server already "
+        "runs this every EXHIBITION_SWEEP_INTERVAL seconds; broadcasts from a separate "
+        "process only reach sockets through a shared (redis) channel layer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping every --interval seconds until interrupted.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.EXHIBITION_SWEEP_INTERVAL or 60,
+            help="Seconds between sweeps with --loop (default: EXHIBITION_SWEEP_INTERVAL).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=settings.EXHIBITION_SWEEP_LIMIT,
+            help="Maximum visits closed per sweep (default: EXHIBITION_SWEEP_LIMIT).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many visits are past their limit.",
+        )
+
+    def handle(self, *args, **options):
+        warning = local_cache_warning()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+        if options["dry_run"]:
+            expired = find_expired(limit=options["limit"])
+            self.stdout.write(f"{len(expired)} stale visit(s) would be closed.")
+            return
+
+        while True:
+            closed = sweep(limit=options["limit"])
+            self.stdout.write(
+                f"Closed {sum(closed.values())} stale visit(s) in {len(closed)} booth(s)."
+            )
+            if not options["loop"]:
+                break
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                break
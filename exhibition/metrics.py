@@ -0,0 +1,293 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+from typing import Any
+
+# ========== رجیستری حداقلی با قالب متنی Prometheus ==========
+# مقدارها در حافظه‌ی همین پروسه نگه داشته می‌شوند (استقرار فعلی یک پروسه‌ی daphne است).
+# هر متریک یک قفل دارد و برچسب‌ها به صورت tuple موقعیتی داده می‌شوند تا ثبت هر نمونه
+# فقط یک lookup در dict باشد و بتوان آن را زیر بار اوج روشن گذاشت.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _check(self, labels: tuple[str, ...]) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        with self._lock:
+            return [(self.name, self.labelnames, key, value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labelnames, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, *labels: str, value: float) -> None:
+        # برای collector هایی که مجموع را از شمارنده‌ی دیگری کپی می‌کنند
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # شمارش غیرتجمعی هر bucket + یک خانه برای +Inf، سپس sum
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        bucket_labels = (*self.labelnames, "le")
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append(
+                    (f"{self.name}_bucket", bucket_labels, (*key, _format_value(bound)), cumulative)
+                )
+            samples.append((f"{self.name}_sum", self.labelnames, key, total))
+            samples.append((f"{self.name}_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    # collector ها هنگام scrape صدا زده می‌شوند و متریک‌های تازه (مثلا از روی آمار
+    # BroadcastDispatcher یا سند اشغال غرفه‌ها) برمی‌گردانند
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ========== متریک‌های درخواست ==========
+
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram(
+        "exhibition_http_request_duration_seconds",
+        "Latency of exhibition.views endpoints.",
+        ("view", "method", "status"),
+    )
+)
+REQUEST_QUERIES = REGISTRY.register(
+    Histogram(
+        "exhibition_http_request_queries",
+        "SQL queries run per exhibition.views request.",
+        ("view",),
+        buckets=QUERY_BUCKETS,
+    )
+)
+ADMISSION_OUTCOMES = REGISTRY.register(
+    Counter(
+        "exhibition_admission_outcomes_total",
+        "Outcomes of enter/exit/force-exit requests.",
+        ("action", "outcome"),
+    )
+)
+BROADCAST_LATENCY = REGISTRY.register(
+    Histogram(
+        "exhibition_broadcast_latency_seconds",
+        "Time from the first commit marked in a batch until its broadcast was sent.",
+    )
+)
+VISITS_EXPIRED = REGISTRY.register(
+    Counter(
+        "exhibition_visits_expired_total",
+        "Active visits closed by the sweeper after exceeding the booth's max visit duration.",
+        ("booth_id",),
+    )
+)
+SWEEP_DURATION = REGISTRY.register(
+    Histogram(
+        "exhibition_sweep_duration_seconds",
+        "Duration of stale-visit sweeper passes.",
+    )
+)
+
+# ========== شمارش کوئری‌ها ==========
+# execute_wrapper روی هر اتصال جدید نصب می‌شود و فقط وقتی درخواستی در حال اندازه‌گیری
+# است (ContextVar مقدار دارد) شمارنده را زیاد می‌کند؛ thread پس‌زمینه‌ی broadcast شمرده نمی‌شود.
+
+_query_count: ContextVar[list[int] | None] = ContextVar("exhibition_query_count", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def start_request() -> tuple[Any, list[int], float]:
+    counter = [0]
+    return _query_count.set(counter), counter, time.perf_counter()
+
+
+# فقط view های exhibition.views اندازه‌گیری می‌شوند (نه admin و auth)
+def exhibition_view_name(request) -> str | None:
+    match = getattr(request, "resolver_match", None)
+    if match is None or getattr(match.func, "__module__", None) != "exhibition.views":
+        return None
+    return match.url_name or match.view_name
+
+
+def finish_request(request, response, token: Any, counter: list[int], started: float) -> None:
+    _query_count.reset(token)
+    view = exhibition_view_name(request)
+    if view is None:
+        return
+    REQUEST_LATENCY.observe(
+        view, request.method, str(response.status_code), value=time.perf_counter() - started
+    )
+    REQUEST_QUERIES.observe(view, value=counter[0])
+
+
+# ========== collector ها ==========
+
+
+def _collect_broadcast() -> Iterable[_Metric]:
+    from .broadcast import dispatcher
+
+    events = Counter(
+        "exhibition_broadcast_events_total",
+        "BroadcastDispatcher counters (queued, coalesced, batches, sent, failed, dropped).",
+        ("event",),
+    )
+    for event, value in dispatcher.snapshot().items():
+        events.set_total(event, value=value)
+    return [events]
+
+
+def _collect_sockets() -> Iterable[_Metric]:
+    from channels.layers import get_channel_layer
+
+    from .consumers import stats
+
+    connections = Gauge(
+        "exhibition_ws_connections", "Open /ws/capacity/ connections in this process."
+    )
+    events = Counter(
+        "exhibition_ws_events_total",
+        "CapacityConsumer counters (connected, messages_sent, evicted_slow, ...).",
+        ("event",),
+    )
+    send_seconds = Counter(
+        "exhibition_ws_send_seconds_total", "Time spent in CapacityConsumer sends."
+    )
+    snapshot = stats.snapshot(get_channel_layer())
+    connections.set(value=snapshot.pop("active"))
+    send_seconds.set_total(value=snapshot.pop("send_seconds_total"))
+    for key, value in snapshot.items():
+        if not key.startswith("send_seconds"):
+            events.inc(key, amount=value)
+    return [connections, events, send_seconds]
+
+
+def _collect_occupancy() -> Iterable[_Metric]:
+    from .occupancy import get_document
+
+    labels = ("booth_id", "booth")
+    occupied = Gauge("exhibition_booth_occupied", "Groups currently inside a booth.", labels)
+    capacity = Gauge("exhibition_booth_capacity", "max_groups of a booth.", labels)
+    for booth in get_document()["booths"]:
+        occupied.set(str(booth["id"]), booth["name"], value=booth["occupied"])
+        capacity.set(str(booth["id"]), booth["name"], value=booth["max_groups"])
+    return [occupied, capacity]
+
+
+REGISTRY.add_collector(_collect_broadcast)
+REGISTRY.add_collector(_collect_sockets)
+REGISTRY.add_collector(_collect_occupancy)
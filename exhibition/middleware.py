@@ -0,0 +1,106 @@
+import random
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import auser, get_user
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import exhibition_view_name, finish_request, start_request
+from .profiler import report, start_profile, stop_profile
+from .roles import aget_roles, get_roles
+
+
+def _user_with_roles(request):
+    user = get_user(request)
+    get_roles(user)
+    return user
+
+
+async def _auser_with_roles(request):
+    user = await auser(request)
+    await aget_roles(user)
+    return user
+
+
+class RoleMiddleware(MiddlewareMixin):
+    # باید بعد از AuthenticationMiddleware بیاید؛ نقش‌ها از cache روی request.user قرار می‌گیرند
+    def process_request(self, request):
+        request.user = SimpleLazyObject(partial(_user_with_roles, request))
+        request.auser = partial(_auser_with_roles, request)
+
+
+class MetricsMiddleware:
+    # اول لیست MIDDLEWARE می‌آید تا زمان بقیه‌ی middleware ها هم در latency حساب شود.
+    # view های async کوئری‌ها را با sync_to_async اجرا می‌کنند که context (و شمارنده‌ی
+    # ContextVar) را با خود می‌برد.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        token, counter, started = start_request()
+        response = self.get_response(request)
+        finish_request(request, response, token, counter, started)
+        return response
+
+    async def _acall(self, request):
+        token, counter, started = start_request()
+        response = await self.get_response(request)
+        finish_request(request, response, token, counter, started)
+        return response
+
+
+class QueryProfilerMiddleware:
+    # فقط وقتی EXHIBITION_PROFILE_SAMPLE_RATE > 0 باشد در MIDDLEWARE قرار می‌گیرد؛ از هر
+    # درخواست با این احتمال کوئری‌ها (تعداد، زمان، تکراری‌ها، الگوی N+1) ثبت و در گزارش
+    # EXHIBITION_PROFILE_REPORT جمع می‌شود
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.rate = settings.EXHIBITION_PROFILE_SAMPLE_RATE
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if random.random() >= self.rate:
+            return self.get_response(request)
+        token, profile = start_profile()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        self._record(request, time.perf_counter() - started, profile)
+        return response
+
+    async def _acall(self, request):
+        if random.random() >= self.rate:
+            return await self.get_response(request)
+        token, profile = start_profile()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_profile(token)
+        self._record(request, time.perf_counter() - started, profile)
+        return response
+
+    def _record(self, request, elapsed: float, profile) -> None:
+        view = exhibition_view_name(request)
+        if view is not None:
+            report.add(view, request.method, request.path, elapsed, profile)
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def sync_current_visitors(apps, schema_editor):
+    Booth = apps.get_model("exhibition", "Booth")
+    BoothVisit = apps.get_model("exhibition", "BoothVisit")
+
+    active_count = Subquery(
+        BoothVisit.objects.filter(booth=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("booth")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Booth.objects.update(current_visitors=Coalesce(active_count, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0005_delete_boothgroup'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_current_visitors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def close_duplicate_active_visits(apps, schema_editor):
+    Booth = apps.get_model("exhibition", "Booth")
+    BoothVisit = apps.get_model("exhibition", "BoothVisit")
+
+    # فقط آخرین حضور فعال هر لیدر باقی می‌ماند
+    duplicates = (
+        BoothVisit.objects.filter(is_active=True)
+        .values("leader")
+        .annotate(total=Count("pk"), latest=Max("pk"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        BoothVisit.objects.filter(
+            leader_id=row["leader"], is_active=True
+        ).exclude(pk=row["latest"]).update(is_active=False, exited_at=models.F("entered_at"))
+
+    active_count = Subquery(
+        BoothVisit.objects.filter(booth=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("booth")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Booth.objects.update(current_visitors=Coalesce(active_count, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0006_sync_booth_current_visitors'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_active_visits, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='boothvisit',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('leader',), name='unique_active_visit_per_leader'),
+        ),
+    ]
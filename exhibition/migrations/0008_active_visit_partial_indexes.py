@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0007_boothvisit_unique_active_visit_per_leader'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='boothvisit',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['booth', 'entered_at'], name='active_visit_booth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='boothvisit',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['leader', 'booth'], name='active_visit_leader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboothstatus',
+            index=models.Index(condition=models.Q(('is_checked', True)), fields=['leader', 'booth'], name='checked_status_leader_idx'),
+        ),
+        # بدون آمار، SQLite ایندکس کامل booth_id را به ایندکس جزئی ترجیح می‌دهد
+        migrations.RunSQL("ANALYZE", reverse_sql=migrations.RunSQL.noop),
+    ]
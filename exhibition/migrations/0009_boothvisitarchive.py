@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0008_active_visit_partial_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoothVisitArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entered_at', models.DateTimeField()),
+                ('exited_at', models.DateTimeField()),
+                ('booth', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_visits', to='exhibition.booth')),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_booth_visits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Booth Visit',
+                'verbose_name_plural': 'Archived Booth Visits',
+                'indexes': [models.Index(fields=['booth', 'entered_at'], name='archive_booth_entered_idx'), models.Index(fields=['entered_at'], name='archive_entered_idx')],
+            },
+        ),
+    ]
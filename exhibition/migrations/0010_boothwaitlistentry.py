@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0009_boothvisitarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoothWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('booth', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='exhibition.booth')),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Booth Waitlist Entry',
+                'verbose_name_plural': 'Booth Waitlist Entries',
+                'indexes': [models.Index(fields=['booth', 'joined_at', 'id'], name='waitlist_booth_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('leader',), name='unique_waitlist_entry_per_leader')],
+            },
+        ),
+    ]
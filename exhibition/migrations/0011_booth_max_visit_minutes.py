@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0010_boothwaitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booth',
+            name='max_visit_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='حداکثر مدت حضور (دقیقه)'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0011_booth_max_visit_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoothOccupancyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('occupancy', models.BinaryField()),
+                ('entries', models.BinaryField()),
+                ('exits', models.BinaryField()),
+                ('booth', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_rollups', to='exhibition.booth')),
+            ],
+            options={
+                'verbose_name': 'Booth Occupancy Rollup',
+                'verbose_name_plural': 'Booth Occupancy Rollups',
+                'constraints': [models.UniqueConstraint(fields=('booth', 'day'), name='unique_rollup_per_booth_day')],
+            },
+        ),
+    ]
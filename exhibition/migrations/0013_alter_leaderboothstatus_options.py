@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 19:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibition', '0012_boothoccupancyrollup'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='leaderboothstatus',
+            options={'verbose_name': 'Leader Booth Status', 'verbose_name_plural': 'Leader Booth Statuses'},
+        ),
+    ]
@@ -10,6 +10,11 @@ class Booth(models.Model):
     slug = models.SlugField(max_length=50, unique=True)
     max_groups = models.PositiveIntegerField()
     current_visitors = models.PositiveIntegerField(default=0, verbose_name="تعداد بازدیدکنندگان فعلی")
+    # حضور فعال طولانی‌تر از این (دقیقه) را sweeper می‌بندد؛
+    # خالی = EXHIBITION_MAX_VISIT_MINUTES، صفر = بدون سقف
+    max_visit_minutes = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="حداکثر مدت حضور (دقیقه)"
+    )
 
     class Meta:
         verbose_name = "Booth"
@@ -36,12 +41,94 @@ class BoothVisit(models.Model):
                 fields=["booth", "leader"],
                 condition=models.Q(is_active=True),
                 name="unique_active_visit_per_booth_leader",
-            )
+            ),
+            models.UniqueConstraint(
+                fields=["leader"],
+                condition=models.Q(is_active=True),
+                name="unique_active_visit_per_leader",
+            ),
+        ]
+        # ایندکس‌های جزئی فقط حضورهای فعال را نگه می‌دارند؛ با بزرگ شدن تاریخچه‌ی
+        # بازدیدها در طول نمایشگاه، اندازه‌ی آن‌ها به تعداد حضورهای فعال محدود می‌ماند
+        indexes = [
+            models.Index(
+                fields=["booth", "entered_at"],
+                condition=models.Q(is_active=True),
+                name="active_visit_booth_idx",
+            ),
+            models.Index(
+                fields=["leader", "booth"],
+                condition=models.Q(is_active=True),
+                name="active_visit_leader_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.leader.username} @ {self.booth.name}"
+
+
+# بازدیدهای بسته‌شده‌ی قدیمی با دستور archive_visits از BoothVisit به این جدول منتقل می‌شوند
+# تا جدول زنده فقط حضورهای فعال و تاریخچه‌ی اخیر را نگه دارد
+class BoothVisitArchive(models.Model):
+    booth = models.ForeignKey(Booth, on_delete=models.CASCADE, related_name="archived_visits")
+    leader = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="archived_booth_visits"
+    )
+    entered_at = models.DateTimeField()
+    exited_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Archived Booth Visit"
+        verbose_name_plural = "Archived Booth Visits"
+        indexes = [
+            models.Index(fields=["booth", "entered_at"], name="archive_booth_entered_idx"),
+            models.Index(fields=["entered_at"], name="archive_entered_idx"),
         ]
 
     def __str__(self) -> str:
         return f"{self.leader.username} @ {self.booth.name}"
 
+# سری زمانی دقیقه‌ای هر غرفه در یک روز (به وقت محلی)؛ هر فیلد یک array('H') با ۱۴۴۰ خانه
+# (little-endian) است: اشغال در پایان هر دقیقه، تعداد ورودها و تعداد خروج‌های همان دقیقه
+class BoothOccupancyRollup(models.Model):
+    booth = models.ForeignKey(Booth, on_delete=models.CASCADE, related_name="occupancy_rollups")
+    day = models.DateField()
+    occupancy = models.BinaryField()
+    entries = models.BinaryField()
+    exits = models.BinaryField()
+
+    class Meta:
+        verbose_name = "Booth Occupancy Rollup"
+        verbose_name_plural = "Booth Occupancy Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=["booth", "day"], name="unique_rollup_per_booth_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.booth.name} @ {self.day}"
+
+
+# صف FIFO انتظار برای غرفه‌ی پر؛ هر لیدر در هر لحظه فقط در صف یک غرفه است
+class BoothWaitlistEntry(models.Model):
+    booth = models.ForeignKey(Booth, on_delete=models.CASCADE, related_name="waitlist")
+    leader = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Booth Waitlist Entry"
+        verbose_name_plural = "Booth Waitlist Entries"
+        constraints = [
+            models.UniqueConstraint(fields=["leader"], name="unique_waitlist_entry_per_leader"),
+        ]
+        indexes = [
+            models.Index(fields=["booth", "joined_at", "id"], name="waitlist_booth_order_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.leader.username} waiting for {self.booth.name}"
+
 # exhibition/models.py
 class LeaderBoothStatus(models.Model):
     leader = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'groups__name': 'leaders'})
@@ -51,6 +138,13 @@ class LeaderBoothStatus(models.Model):
 
     class Meta:
         unique_together = ('leader', 'booth')  # هر لیدر فقط یک وضعیت برای هر غرفه داشته باشه
+        indexes = [
+            models.Index(
+                fields=["leader", "booth"],
+                condition=models.Q(is_checked=True),
+                name="checked_status_leader_idx",
+            ),
+        ]
         verbose_name = "Leader Booth Status"
         verbose_name_plural = "Leader Booth Statuses"
         
@@ -0,0 +1,240 @@
+import secrets
+from collections.abc import Iterable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Booth, BoothVisit, BoothWaitlistEntry, LeaderBoothStatus
+
+SEQUENCE_CACHE_KEY = "exhibition:capacity:seq"
+VERSION_CACHE_KEY = "exhibition:occupancy:version"
+DOCUMENT_CACHE_KEY = "exhibition:occupancy:doc:{version}"
+DOCUMENT_TIMEOUT = 300
+# هر شمارنده از epoch * EPOCH_SPAN شروع می‌شود؛ عدد تا 2**52 می‌ماند و در JS دقیق است
+EPOCH_SPAN = 2**32
+EPOCH_LIMIT = 2**20
+
+
+def _active_visits_prefetch() -> Prefetch:
+    return Prefetch(
+        "visits",
+        queryset=(
+            BoothVisit.objects.filter(is_active=True)
+            .select_related("leader")
+            .order_by("leader__username")
+        ),
+        to_attr="active_visits",
+    )
+
+
+def _snapshot_queryset(booth_ids: Iterable[int] | None = None):
+    # شمارنده‌ی current_visitors منبع اصلی ظرفیت است؛ فقط لیدرها prefetch می‌شوند
+    booths = (
+        Booth.objects.prefetch_related(_active_visits_prefetch())
+        .annotate(waiting=Count("waitlist"))
+        .order_by("id")
+    )
+    if booth_ids is not None:
+        booths = booths.filter(pk__in=list(booth_ids))
+    return booths
+
+
+def _serialize_booth(booth: Booth) -> dict[str, Any]:
+    return {
+        "id": booth.id,
+        "name": booth.name,
+        "max_groups": booth.max_groups,
+        "occupied": booth.current_visitors,
+        "remaining": max(booth.max_groups - booth.current_visitors, 0),
+        "waiting": booth.waiting,
+        # entered_at (ثانیه‌ی unix) برای تخمین زمان خالی شدن اسلات در exhibition.dwell
+        "leaders": [
+            {
+                "username": v.leader.username,
+                "id": v.leader.id,
+                "entered_at": int(v.entered_at.timestamp()),
+            }
+            for v in booth.active_visits
+        ],
+    }
+
+
+def build_snapshot(booth_ids: Iterable[int] | None = None) -> list[dict[str, Any]]:
+    return [_serialize_booth(booth) for booth in _snapshot_queryset(booth_ids)]
+
+
+async def abuild_snapshot(booth_ids: Iterable[int] | None = None) -> list[dict[str, Any]]:
+    return [_serialize_booth(booth) async for booth in _snapshot_queryset(booth_ids)]
+
+
+def leader_state(user_id: int) -> dict[str, list[int]]:
+    return {
+        "active_booth_ids": list(
+            BoothVisit.objects.filter(leader_id=user_id, is_active=True)
+            .values_list("booth_id", flat=True)
+        ),
+        "checked_booth_ids": list(
+            LeaderBoothStatus.objects.filter(leader_id=user_id, is_checked=True)
+            .values_list("booth_id", flat=True)
+        ),
+        "waiting_booth_ids": list(
+            BoothWaitlistEntry.objects.filter(leader_id=user_id).values_list("booth_id", flat=True)
+        ),
+    }
+
+
+# ========== شمارنده‌های مشترک در cache ==========
+# cache پیش‌فرض (LocMemCache) کلیدها را cull می‌کند و Redis هم ممکن است flush یا restart شود.
+# شمارنده‌ای که از نو ساخته می‌شود از یک epoch تصادفی تازه شروع می‌کند، پس seq/نسخه‌ی قبلی
+# تکرار نمی‌شود و گیرنده با مقایسه‌ی sequence_epoch ریست را از پیام تکراری تشخیص می‌دهد.
+
+
+def _epoch_start() -> int:
+    return (secrets.randbelow(EPOCH_LIMIT - 1) + 1) * EPOCH_SPAN
+
+
+def sequence_epoch(value: int) -> int:
+    return value // EPOCH_SPAN
+
+
+def _incr(key: str) -> int:
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # کلید هنوز ساخته نشده یا cull/flush شده است
+        cache.add(key, _epoch_start(), timeout=None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # بین add و incr دوباره پاک شده است
+            value = _epoch_start() + 1
+            cache.set(key, value, timeout=None)
+            return value
+
+
+def _current(key: str) -> int:
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _epoch_start(), timeout=None)
+        value = cache.get(key, 0)
+    return value
+
+
+def current_sequence() -> int:
+    return _current(SEQUENCE_CACHE_KEY)
+
+
+def next_sequence() -> int:
+    return _incr(SEQUENCE_CACHE_KEY)
+
+
+def current_version() -> int:
+    # نبود کلید به معنای نسخه‌ی 0 نیست؛ نسخه‌ی 0 ثابت بعد از هر cull یک etag تکراری می‌ساخت
+    return _current(VERSION_CACHE_KEY)
+
+
+def bump_version() -> int:
+    return _incr(VERSION_CACHE_KEY)
+
+
+# برای management command هایی که سند اشغال یا دیکشنری نام‌ها را کهنه می‌کنند
+def local_cache_warning() -> str | None:
+    if not settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+        return None
+    return (
+        "The default cache is process-local (LocMemCache), so the running server will not "
+        "see this command's changes until its cached occupancy document expires (up to "
+        f"{DOCUMENT_TIMEOUT}s). Set EXHIBITION_CACHE_URL to a shared Redis cache."
+    )
+
+
+def get_document() -> dict[str, Any]:
+    # سند اشغال برای هر نسخه فقط یک بار از دیتابیس ساخته می‌شود
+    version = current_version()
+    return cache.get_or_set(
+        DOCUMENT_CACHE_KEY.format(version=version),
+        lambda: {"version": version, "booths": build_snapshot()},
+        timeout=DOCUMENT_TIMEOUT,
+    )
+
+
+async def acurrent_version() -> int:
+    version = await cache.aget(VERSION_CACHE_KEY)
+    if version is None:
+        await cache.aadd(VERSION_CACHE_KEY, _epoch_start(), timeout=None)
+        version = await cache.aget(VERSION_CACHE_KEY, 0)
+    return version
+
+
+async def aget_document() -> dict[str, Any]:
+    version = await acurrent_version()
+    key = DOCUMENT_CACHE_KEY.format(version=version)
+    document = await cache.aget(key)
+    if document is None:
+        document = {"version": version, "booths": await abuild_snapshot()}
+        await cache.aadd(key, document, timeout=DOCUMENT_TIMEOUT)
+    return document
+
+
+def active_booth_ids(document: dict[str, Any], user_id: int) -> list[int]:
+    return [
+        booth["id"]
+        for booth in document["booths"]
+        if any(leader["id"] == user_id for leader in booth["leaders"])
+    ]
+
+
+# ========== شمارنده‌ی ظرفیت ==========
+
+
+def claim_slot(booth_id: int) -> bool:
+    # یک UPDATE شرطی؛ فقط وقتی موفق می‌شود که هنوز جای خالی باشد
+    return bool(
+        Booth.objects.filter(
+            pk=booth_id, current_visitors__lt=F("max_groups")
+        ).update(current_visitors=F("current_visitors") + 1)
+    )
+
+
+def release_slots(booth_id: int, count: int = 1) -> None:
+    if count <= 0:
+        return
+    Booth.objects.filter(pk=booth_id, current_visitors__gte=count).update(
+        current_visitors=F("current_visitors") - count
+    )
+
+
+def _active_count_subquery() -> Subquery:
+    return Subquery(
+        BoothVisit.objects.filter(booth=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("booth")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+
+
+def find_counter_drift() -> list[dict[str, int]]:
+    booths = Booth.objects.annotate(
+        actual=Coalesce(_active_count_subquery(), 0)
+    ).order_by("id")
+    return [
+        {"id": b.id, "counter": b.current_visitors, "actual": b.actual}
+        for b in booths
+        if b.current_visitors != b.actual
+    ]
+
+
+def repair_counter_drift() -> list[dict[str, int]]:
+    with transaction.atomic():
+        drift = find_counter_drift()
+        if drift:
+            Booth.objects.filter(pk__in=[d["id"] for d in drift]).update(
+                current_visitors=Coalesce(_active_count_subquery(), 0)
+            )
+            transaction.on_commit(bump_version)
+    return drift
@@ -0,0 +1,319 @@
+import heapq
+import logging
+import math
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# ========== پروفایل کوئری‌های یک درخواست ==========
+# فقط درخواست‌های نمونه‌برداری‌شده (EXHIBITION_PROFILE_SAMPLE_RATE) پروفایل دارند؛ برای بقیه
+# execute_wrapper فقط یک ContextVar.get اضافه می‌کند تا بتوان آن را حین نمایشگاه روشن گذاشت.
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_DIR = os.path.dirname(_PACKAGE_DIR)
+# execute_wrapper های خود پکیج محل صدا زدن نیستند
+_WRAPPER_FILES = {__file__, os.path.join(_PACKAGE_DIR, "metrics.py")}
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("exhibition_query_profile", default=None)
+
+
+# شکل کوئری بدون مقدارها؛ یک شکل که در یک درخواست بارها با پارامتر متفاوت اجرا شود الگوی N+1 است
+def query_shape(sql: str) -> str:
+    return _IN_LISTS.sub("(?, ...)", _LITERALS.sub("?", sql))
+
+
+# اولین frame داخل پکیج exhibition (غیر از execute_wrapper ها) محل صدا زدن کوئری است
+def _call_site() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PACKAGE_DIR) and filename not in _WRAPPER_FILES:
+            return f"{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+class RequestProfile:
+    def __init__(self) -> None:
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.params: dict[str, set[str]] = {}
+        self.statements: Counter = Counter()
+        self.sites: dict[str, str] = {}
+        # ردیف‌های خوانده‌شده به تفکیک شکل کوئری؛ یک کوئری تکی مثل
+        # leader not in group.user_set.all() کل عضویت گروه را می‌خواند و N+1 هم نیست
+        self.rows: Counter = Counter()
+
+    def record(self, sql: str, params: Any, elapsed: float) -> str:
+        shape = query_shape(sql)
+        if shape not in self.sites:
+            self.sites[shape] = _call_site()
+        bound = repr(params)
+        self.count += 1
+        self.db_seconds += elapsed
+        self.shapes[shape] += 1
+        self.params.setdefault(shape, set()).add(bound)
+        self.statements[(sql, bound)] += 1
+        return shape
+
+    def large_results(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, rows) for shape, rows in self.rows.items() if rows >= threshold]
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [
+            (shape, count)
+            for shape, count in self.shapes.items()
+            if count >= threshold and len(self.params[shape]) > 1
+        ]
+
+    def duplicates(self) -> int:
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+# cursor دیتابیس فقط در درخواست‌های نمونه‌برداری‌شده پیچیده می‌شود؛ ردیف‌ها هنگام fetch
+# (بعد از برگشتن execute) به شکل آخرین کوئری همان cursor نسبت داده می‌شوند
+class _RowCountingCursor:
+    def __init__(self, cursor, profile: RequestProfile, shape: str) -> None:
+        self.cursor = cursor
+        self.profile = profile
+        self.shape = shape
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.profile.rows[self.shape] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.cursor.fetchmany(*args, **kwargs)
+        self.profile.rows[self.shape] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.profile.rows[self.shape] += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.profile.rows[self.shape] += 1
+            yield row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cursor, name)
+
+
+def _count_rows(wrapper, profile: RequestProfile, shape: str) -> None:
+    if isinstance(wrapper.cursor, _RowCountingCursor):
+        wrapper.cursor.shape = shape
+    else:
+        wrapper.cursor = _RowCountingCursor(wrapper.cursor, profile, shape)
+
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        shape = profile.record(sql, params, time.perf_counter() - started)
+        if not many:
+            _count_rows(context["cursor"], profile, shape)
+
+
+def install_query_profiler(sender, connection, **kwargs) -> None:
+    if _profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_query)
+
+
+def start_profile() -> tuple[Any, RequestProfile]:
+    profile = RequestProfile()
+    return _current.set(profile), profile
+
+
+def stop_profile(token: Any) -> None:
+    _current.reset(token)
+
+
+# ========== گزارش چرخشی ==========
+
+
+class _EndpointStats:
+    def __init__(self, window: int) -> None:
+        self.samples = 0
+        self.durations: deque[float] = deque(maxlen=window)
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.duplicates = 0
+        # شکل کوئری ← (تعداد درخواست‌هایی که در آن‌ها تکرار شده، بیشترین تکرار، محل)
+        self.repeated: dict[str, list[Any]] = {}
+        # شکل کوئری ← (تعداد درخواست‌ها، بیشترین ردیف خوانده‌شده، محل)
+        self.large: dict[str, list[Any]] = {}
+
+
+class ProfileReport:
+    def __init__(
+        self, path: str, interval: float, threshold: int, rows_threshold: int, top: int = 20
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self.threshold = threshold
+        self.rows_threshold = rows_threshold
+        self.top = top
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, _EndpointStats] = {}
+        self._slowest: list[tuple[float, str, str, int, float]] = []
+        self._last_write = time.monotonic()
+
+    def add(self, view: str, method: str, path: str, elapsed: float, profile: RequestProfile) -> None:
+        repeated = profile.repeated_shapes(self.threshold)
+        large = profile.large_results(self.rows_threshold)
+        with self._lock:
+            stats = self._endpoints.get(view)
+            if stats is None:
+                stats = self._endpoints[view] = _EndpointStats(window=500)
+            stats.samples += 1
+            stats.durations.append(elapsed)
+            stats.queries += profile.count
+            stats.rows += sum(profile.rows.values())
+            stats.db_seconds += profile.db_seconds
+            stats.duplicates += profile.duplicates()
+            for shape, count in repeated:
+                entry = stats.repeated.get(shape)
+                if entry is None:
+                    stats.repeated[shape] = [1, count, profile.sites[shape]]
+                    logger.warning(
+                        "Possible N+1 in %s: query repeated %d times at %s: %s",
+                        view,
+                        count,
+                        profile.sites[shape],
+                        shape[:200],
+                    )
+                else:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], count)
+            for shape, rows in large:
+                entry = stats.large.get(shape)
+                if entry is None:
+                    stats.large[shape] = [1, rows, profile.sites[shape]]
+                    logger.warning(
+                        "Large result in %s: %d rows from one query shape at %s: %s",
+                        view,
+                        rows,
+                        profile.sites[shape],
+                        shape[:200],
+                    )
+                else:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], rows)
+
+            item = (elapsed, f"{method} {path}", view, profile.count, profile.db_seconds)
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, item)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+            due = time.monotonic() - self._last_write >= self.interval
+            if due:
+                self._last_write = time.monotonic()
+                text = self._render()
+        if due:
+            self._write(text)
+
+    def _render(self) -> str:
+        total = sum(stats.samples for stats in self._endpoints.values())
+        lines = [
+            f"query profile {datetime.now():%Y-%m-%d %H:%M:%S}, {total} sampled requests "
+            f"(rate {settings.EXHIBITION_PROFILE_SAMPLE_RATE})",
+            "",
+            "slowest endpoints (by p95 of the last 500 samples)",
+            f"{'endpoint':<28}{'samples':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"
+            f"{'queries':>9}{'rows':>8}{'db ms':>8}{'dups':>7}",
+        ]
+
+        def p95(stats: _EndpointStats) -> float:
+            # nearest-rank: کوچک‌ترین نمونه‌ای که دست‌کم ۹۵٪ نمونه‌ها از آن کمترند یا برابرند
+            ordered = sorted(stats.durations)
+            return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+        ranked = sorted(self._endpoints.items(), key=lambda item: p95(item[1]), reverse=True)
+        for view, stats in ranked:
+            lines.append(
+                f"{view:<28}{stats.samples:>8}"
+                f"{statistics.median(stats.durations) * 1000:>9.1f}"
+                f"{p95(stats) * 1000:>9.1f}{max(stats.durations) * 1000:>9.1f}"
+                f"{stats.queries / stats.samples:>9.1f}"
+                f"{stats.rows / stats.samples:>8.0f}"
+                f"{stats.db_seconds / stats.samples * 1000:>8.1f}"
+                f"{stats.duplicates / stats.samples:>7.1f}"
+            )
+
+        lines += ["", f"repeated query shapes (possible N+1, >= {self.threshold} per request)"]
+        for view, stats in ranked:
+            for shape, (requests, most, site) in sorted(
+                stats.repeated.items(), key=lambda item: item[1][0], reverse=True
+            ):
+                lines.append(
+                    f"  {view}: up to {most}x in {requests}/{stats.samples} samples at {site}"
+                )
+                lines.append(f"      {shape[:300]}")
+
+        lines += [
+            "",
+            f"large results (>= {self.rows_threshold} rows from one query shape per request)",
+        ]
+        for view, stats in ranked:
+            for shape, (requests, most, site) in sorted(
+                stats.large.items(), key=lambda item: item[1][1], reverse=True
+            ):
+                lines.append(
+                    f"  {view}: up to {most} rows in {requests}/{stats.samples} samples at {site}"
+                )
+                lines.append(f"      {shape[:300]}")
+
+        lines += ["", "slowest requests"]
+        for elapsed, request, view, queries, db_seconds in sorted(self._slowest, reverse=True):
+            lines.append(
+                f"  {elapsed * 1000:>8.1f} ms  {request}  ({view}, {queries} queries, "
+                f"{db_seconds * 1000:.1f} ms db)"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _write(self, text: str) -> None:
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.replace(temporary, self.path)
+        except OSError:
+            logger.exception("Could not write query profile report to %s.", self.path)
+
+    def flush(self) -> None:
+        with self._lock:
+            text = self._render()
+        self._write(text)
+
+
+report = ProfileReport(
+    path=settings.EXHIBITION_PROFILE_REPORT,
+    interval=settings.EXHIBITION_PROFILE_REPORT_INTERVAL,
+    threshold=settings.EXHIBITION_PROFILE_REPEAT_THRESHOLD,
+    rows_threshold=settings.EXHIBITION_PROFILE_ROWS_THRESHOLD,
+)
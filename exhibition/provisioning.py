@@ -0,0 +1,249 @@
+import atexit
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .roles import LEADERS, invalidate_roles
+from .wire import invalidate_names
+
+# ========== ورود گروهی لیدرها از CSV ==========
+# ستون‌ها: username,password[,first_name,last_name]؛ سطر عنوان اختیاری است.
+# هش رمزها (PBKDF2، حدود ۰.۴ ثانیه برای هر کدام) بین پروسه‌ها پخش می‌شود، کاربرها با
+# bulk_create و عضویت در گروه leaders با یک bulk_create روی جدول واسط ثبت می‌شوند.
+
+CSV_FIELDS = ("username", "password", "first_name", "last_name")
+
+# سقف حجم فایلی که از صفحه‌ی مدیریت لیدرها آپلود می‌شود
+MAX_UPLOAD_BYTES = 2 * 1024 * 1024
+
+# کمتر از این تعداد رمز، فرستادن به pool از خود هش گران‌تر است
+POOL_THRESHOLD = 8
+
+# تعداد دفعاتی که ثبت بعد از تداخل با کاربر هم‌زمان (بدون سطرهای تداخل‌دار) تکرار می‌شود
+INSERT_ATTEMPTS = 3
+
+USERNAME_TAKEN = "این نام کاربری قبلاً استفاده شده است."
+
+_username_validator = UnicodeUsernameValidator()
+_USERNAME_MAX_LENGTH = User._meta.get_field("username").max_length
+
+
+def _row_error(line: int, username: str, message: str) -> dict[str, Any]:
+    return {"line": line, "username": username, "error": message}
+
+
+def parse_leader_csv(text: str) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    rows: list[dict[str, Any]] = []
+    errors: list[dict[str, Any]] = []
+    seen: dict[str, int] = {}
+
+    reader = csv.reader(io.StringIO(text))
+    for record in reader:
+        # شماره‌ی سطر فایل (نه رکورد) تا با ویرایشگر CSV یکی باشد
+        line = reader.line_num
+        if not any(cell.strip() for cell in record):
+            continue
+        if line == 1 and record[0].strip().lower() == "username":
+            continue
+
+        values = [cell.strip() for cell in record] + [""] * len(CSV_FIELDS)
+        username, password, first_name, last_name = values[: len(CSV_FIELDS)]
+
+        if not username or not password:
+            errors.append(_row_error(line, username, "نام کاربری و رمز عبور الزامی است."))
+            continue
+        if len(username) > _USERNAME_MAX_LENGTH:
+            errors.append(_row_error(line, username, "نام کاربری بیش از حد طولانی است."))
+            continue
+        try:
+            _username_validator(username)
+        except ValidationError:
+            errors.append(_row_error(line, username, "نام کاربری نامعتبر است."))
+            continue
+        if username in seen:
+            errors.append(
+                _row_error(line, username, f"این نام کاربری در سطر {seen[username]} تکرار شده است.")
+            )
+            continue
+
+        seen[username] = line
+        rows.append(
+            {
+                "line": line,
+                "username": username,
+                "password": password,
+                "first_name": first_name[:150],
+                "last_name": last_name[:150],
+            }
+        )
+    return rows, errors
+
+
+# ========== هش موازی رمزها ==========
+# یک pool برای کل پروسه: اولین import آن را می‌سازد و آپلودهای بعدی دوباره interpreter راه
+# نمی‌اندازند. اندازه‌ی pool را اولین فراخوانی تعیین می‌کند (workers یا تعداد CPU ها).
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn به جای fork: view ها در thread های سرور اجرا می‌شوند و fork یک پروسه‌ی
+            # چندنخی امن نیست. پروسه‌های جدید فقط django.setup و make_password را import می‌کنند
+            # (نه این ماژول که مدل دارد) و PASSWORD_HASHERS را از DJANGO_SETTINGS_MODULE می‌خوانند.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _discard_pool(_pool)
+
+
+def hash_passwords(passwords: list[str], workers: int | None = None) -> list[str]:
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    pool = _get_pool(workers)
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # پروسه‌ای از pool مرده است؛ import بعدی pool تازه می‌سازد
+        _discard_pool(pool)
+        raise
+
+
+# ========== ثبت ==========
+
+
+def _existing_usernames(usernames: Iterable[str], chunk: int = 500) -> set[str]:
+    usernames = list(usernames)
+    existing: set[str] = set()
+    for start in range(0, len(usernames), chunk):
+        existing.update(
+            User.objects.filter(username__in=usernames[start : start + chunk]).values_list(
+                "username", flat=True
+            )
+        )
+    return existing
+
+
+def import_leaders(
+    text: str, workers: int | None = None, batch_size: int = 500, dry_run: bool = False
+) -> dict[str, Any]:
+    rows, errors = parse_leader_csv(text)
+
+    existing = _existing_usernames(row["username"] for row in rows)
+    for row in rows:
+        if row["username"] in existing:
+            errors.append(_row_error(row["line"], row["username"], USERNAME_TAKEN))
+    rows = [row for row in rows if row["username"] not in existing]
+
+    errors.sort(key=lambda error: error["line"])
+    result: dict[str, Any] = {"valid": len(rows), "created": [], "errors": errors}
+    if dry_run or not rows:
+        return result
+
+    hashes = hash_passwords([row["password"] for row in rows], workers=workers)
+    users = [
+        User(
+            username=row["username"],
+            password=hashed,
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+        )
+        for row, hashed in zip(rows, hashes)
+    ]
+
+    lines = {row["username"]: row["line"] for row in rows}
+    conflicts = 0
+    for _ in range(INSERT_ATTEMPTS):
+        if not users:
+            break
+        try:
+            _insert_leaders(users, batch_size)
+        except IntegrityError:
+            # نام کاربری‌ای که هم‌زمان ساخته شده؛ کل تراکنش برگشته است. سطرهای تداخل‌دار خطا
+            # می‌شوند و بقیه دوباره ثبت می‌شوند
+            for user in users:
+                user.pk = None
+            taken = _existing_usernames(user.username for user in users)
+            for username in taken:
+                errors.append(_row_error(lines[username], username, USERNAME_TAKEN))
+            conflicts += len(taken)
+            users = [user for user in users if user.username not in taken]
+            continue
+        result["created"] = [{"id": user.pk, "username": user.username} for user in users]
+        break
+    else:
+        for user in users:
+            errors.append(
+                _row_error(
+                    lines[user.username],
+                    user.username,
+                    "ثبت گروهی به خاطر تداخل با کاربر جدید انجام نشد؛ دوباره تلاش کنید.",
+                )
+            )
+
+    result["valid"] = len(rows) - conflicts
+    errors.sort(key=lambda error: error["line"])
+    return result
+
+
+def _insert_leaders(users: list[User], batch_size: int) -> None:
+    Membership = User.groups.through
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        if any(user.pk is None for user in users):
+            # backend هایی که id سطرهای bulk insert را برنمی‌گردانند
+            ids = dict(
+                User.objects.filter(username__in=[user.username for user in users]).values_list(
+                    "username", "pk"
+                )
+            )
+            for user in users:
+                user.pk = ids[user.username]
+        # روی دیتابیس تازه (قبل از create_users) گروه هنوز ساخته نشده است
+        leaders_group = Group.objects.get_or_create(name=LEADERS)[0].pk
+        Membership.objects.bulk_create(
+            [Membership(user_id=user.pk, group_id=leaders_group) for user in users],
+            batch_size=batch_size,
+        )
+        # bulk_create سیگنال post_save/m2m_changed نمی‌فرستد
+        user_ids = [user.pk for user in users]
+
+        def invalidate() -> None:
+            invalidate_roles(user_ids)
+            invalidate_names()
+
+        transaction.on_commit(invalidate)
@@ -0,0 +1,80 @@
+import heapq
+import math
+import time
+from typing import Any
+
+from asgiref.sync import sync_to_async
+
+from .dwell import estimator
+from .occupancy import acurrent_version, aget_document
+
+# ========== پیشنهاد غرفه‌ی بعدی ==========
+# غرفه‌های تیک‌نخورده‌ی لیدر بر اساس سند اشغال (ردیف‌های annotate شده با wait_seconds) رتبه
+# می‌گیرند: زمان انتظار تا ورود (غرفه‌ی با اسلات آزاد = صفر)، سپس نسبت اشغال (غرفه‌های
+# خلوت‌تر تا لیدرها پخش شوند)، سپس طول صف. غرفه‌های هم‌امتیاز برای هر لیدر ترتیب متفاوتی
+# دارند تا همه‌ی لیدرها هم‌زمان به یک غرفه فرستاده نشوند.
+# امتیاز همه‌ی غرفه‌ها برای هر (نسخه‌ی سند، بازه‌ی REFRESH_SECONDS) یک بار در هر پروسه در یک
+# گذر حساب می‌شود؛ هر درخواست فقط لیست تیک‌ها را می‌خواند و با heapq.nsmallest limit تای اول را برمی‌دارد.
+
+# زمان انتظار با گذشت زمان هم تغییر می‌کند (مثل etag در all_booths_status_api)
+REFRESH_SECONDS = 30
+
+# غرفه‌ی پر بدون تخمین انتظار (داده‌ی کافی نیست) بعد از همه‌ی غرفه‌های با تخمین می‌آید
+UNKNOWN_WAIT = math.inf
+
+_scored: tuple[tuple[int, int], list[tuple[tuple[float, float, int], dict[str, Any]]]] | None = None
+
+
+def _score(booth: dict[str, Any]) -> tuple[float, float, int]:
+    if booth["remaining"] > booth["waiting"]:
+        wait = 0.0
+    elif booth["wait_seconds"] is None:
+        wait = UNKNOWN_WAIT
+    else:
+        wait = float(booth["wait_seconds"])
+    return wait, booth["occupied"] / booth["max_groups"], booth["waiting"]
+
+
+async def ascored_booths() -> list[tuple[tuple[float, float, int], dict[str, Any]]]:
+    global _scored
+    key = (await acurrent_version(), int(time.time() // REFRESH_SECONDS))
+    scored = _scored
+    if scored is None or scored[0] != key:
+        if not estimator.warmed:
+            await sync_to_async(estimator.warm)()
+        booths = estimator.annotate((await aget_document())["booths"])
+        scored = _scored = (
+            key,
+            [(_score(booth), booth) for booth in booths if booth["max_groups"] > 0],
+        )
+    return scored[1]
+
+
+def recommend(
+    scored: list[tuple[tuple[float, float, int], dict[str, Any]]],
+    user_id: int,
+    checked: set[int],
+    limit: int,
+) -> list[dict[str, Any]]:
+    candidates = (
+        item
+        for item in scored
+        if item[1]["id"] not in checked
+        # غرفه‌ای که لیدر همین حالا داخل آن است
+        and not any(leader["id"] == user_id for leader in item[1]["leaders"])
+    )
+    best = heapq.nsmallest(
+        limit, candidates, key=lambda item: (*item[0], hash((user_id, item[1]["id"])))
+    )
+    return [
+        {
+            "id": booth["id"],
+            "name": booth["name"],
+            "occupied": booth["occupied"],
+            "remaining": booth["remaining"],
+            "max": booth["max_groups"],
+            "waiting": booth["waiting"],
+            "wait_seconds": 0 if score[0] == 0 else booth["wait_seconds"],
+        }
+        for score, booth in best
+    ]
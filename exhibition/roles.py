@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+LEADERS = "leaders"
+EXHIBITION_ADMINS = "exhibition_admins"
+
+ROLES_CACHE_KEY = "exhibition:roles:{user_id}"
+GROUP_ID_CACHE_KEY = "exhibition:group-id:{name}"
+ROLES_CACHE_TIMEOUT = 60 * 60
+# سیگنال‌های signals.py کلیدها را فقط در cache همین پروسه پاک می‌کنند؛ با LocMemCache و چند
+# worker، کاربری که از گروه حذف شده در worker های دیگر تا انقضای کلید دسترسی دارد
+LOCAL_ROLES_CACHE_TIMEOUT = 30
+
+
+def _cache_timeout() -> int:
+    if settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+        return LOCAL_ROLES_CACHE_TIMEOUT
+    return ROLES_CACHE_TIMEOUT
+
+
+def _load_roles(user_id: int) -> frozenset[str]:
+    key = ROLES_CACHE_KEY.format(user_id=user_id)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(
+            Group.objects.filter(user__id=user_id).values_list("name", flat=True)
+        )
+        cache.set(key, roles, _cache_timeout())
+    return roles
+
+
+def get_roles(user) -> frozenset[str]:
+    if not user.is_authenticated:
+        return frozenset()
+    # نتیجه روی خود شیء user هم نگه داشته می‌شود تا در یک درخواست فقط یک بار خوانده شود
+    roles = getattr(user, "exhibition_roles", None)
+    if roles is None:
+        roles = _load_roles(user.pk)
+        user.exhibition_roles = roles
+    return roles
+
+
+async def aget_roles(user) -> frozenset[str]:
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "exhibition_roles", None)
+    if roles is None:
+        roles = await cache.aget(ROLES_CACHE_KEY.format(user_id=user.pk))
+        if roles is None:
+            roles = await sync_to_async(_load_roles)(user.pk)
+        user.exhibition_roles = roles
+    return roles
+
+
+def has_role(user, role: str) -> bool:
+    return role in get_roles(user)
+
+
+def invalidate_roles(user_ids) -> None:
+    cache.delete_many([ROLES_CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+def group_id(name: str) -> int:
+    key = GROUP_ID_CACHE_KEY.format(name=name)
+    pk = cache.get(key)
+    if pk is None:
+        pk = Group.objects.values_list("pk", flat=True).get(name=name)
+        cache.set(key, pk, _cache_timeout())
+    return pk
+
+
+def invalidate_group(name: str) -> None:
+    cache.delete(GROUP_ID_CACHE_KEY.format(name=name))
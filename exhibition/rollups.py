@@ -0,0 +1,327 @@
+import atexit
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Callable, Iterator
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Any
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Booth, BoothOccupancyRollup, BoothVisit, BoothVisitArchive
+
+logger = logging.getLogger(__name__)
+
+# ========== سری زمانی دقیقه‌ای اشغال غرفه‌ها ==========
+# هر ردیف BoothOccupancyRollup یک غرفه در یک روز است و سه array('H') با ۱۴۴۰ خانه دارد
+# (حدود ۸.۵ کیلوبایت برای هر غرفه در روز)، پس نمودار یک روز بدون پیمایش BoothVisit
+# فقط با خواندن همین ردیف‌ها ساخته می‌شود.
+
+MINUTES_PER_DAY = 24 * 60
+_MAX_VALUE = 0xFFFF
+
+
+def _unpack(data: bytes | memoryview) -> array:
+    values = array("H")
+    values.frombytes(bytes(data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("H", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _clamp(value: int) -> int:
+    return min(max(value, 0), _MAX_VALUE)
+
+
+def _filled(value: int, length: int = MINUTES_PER_DAY) -> array:
+    return array("H", [_clamp(value)]) * length
+
+
+def minute_of(moment: datetime) -> tuple[date, int]:
+    local = timezone.localtime(moment)
+    return local.date(), local.hour * 60 + local.minute
+
+
+# ========== به‌روزرسانی تدریجی ==========
+
+
+def _apply(row: BoothOccupancyRollup, minutes: dict[int, list[int]]) -> None:
+    occupancy, entries, exits = _unpack(row.occupancy), _unpack(row.entries), _unpack(row.exits)
+    for minute in sorted(minutes):
+        entered, exited = minutes[minute]
+        entries[minute] = _clamp(entries[minute] + entered)
+        exits[minute] = _clamp(exits[minute] + exited)
+        net = entered - exited
+        if net:
+            # اشغال پایان هر دقیقه تا آخر روز جابه‌جا می‌شود؛ دقیقه‌های آینده همان اشغال فعلی‌اند
+            for index in range(minute, MINUTES_PER_DAY):
+                occupancy[index] = _clamp(occupancy[index] + net)
+    row.occupancy, row.entries, row.exits = _pack(occupancy), _pack(entries), _pack(exits)
+
+
+def _opening(booth_id: int, day: date, minutes: dict[int, list[int]]) -> int:
+    # اشغال ابتدای روز: پایان آخرین روز ثبت‌شده، وگرنه شمارنده‌ی فعلی منهای تغییرات همین flush
+    previous = (
+        BoothOccupancyRollup.objects.filter(booth_id=booth_id, day__lt=day)
+        .order_by("-day")
+        .values_list("occupancy", flat=True)
+        .first()
+    )
+    if previous is not None:
+        return _unpack(previous)[-1]
+    current = Booth.objects.filter(pk=booth_id).values_list("current_visitors", flat=True).first()
+    return max((current or 0) - sum(entered - exited for entered, exited in minutes.values()), 0)
+
+
+def write_pending(pending: dict[tuple[int, date], dict[int, list[int]]]) -> None:
+    with transaction.atomic():
+        booth_ids = {booth_id for booth_id, _ in pending}
+        days = {day for _, day in pending}
+        rows = {
+            (row.booth_id, row.day): row
+            for row in BoothOccupancyRollup.objects.select_for_update().filter(
+                booth_id__in=booth_ids, day__in=days
+            )
+        }
+        created: list[BoothOccupancyRollup] = []
+        for key in sorted(pending):
+            booth_id, day = key
+            row = rows.get(key)
+            if row is None:
+                empty = _pack(_filled(0))
+                row = BoothOccupancyRollup(
+                    booth_id=booth_id,
+                    day=day,
+                    occupancy=_pack(_filled(_opening(booth_id, day, pending[key]))),
+                    entries=empty,
+                    exits=empty,
+                )
+                created.append(row)
+            _apply(row, pending[key])
+        if created:
+            BoothOccupancyRollup.objects.bulk_create(created)
+        updated = [row for key, row in rows.items() if key in pending]
+        if updated:
+            BoothOccupancyRollup.objects.bulk_update(updated, ["occupancy", "entries", "exits"])
+
+
+# ورود/خروج‌ها بعد از commit در حافظه جمع می‌شوند و thread پس‌زمینه هر interval ثانیه
+# همه را در یک تراکنش می‌نویسد؛ مسیر درخواست فقط یک dict را زیر قفل به‌روز می‌کند.
+class RollupBuffer:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        # (booth_id, day) ← {minute: [entries, exits]}
+        self._pending: dict[tuple[int, date], dict[int, list[int]]] = {}
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def record(
+        self, booth_id: int, entries: int = 0, exits: int = 0, at: datetime | None = None
+    ) -> None:
+        if not entries and not exits:
+            return
+        day, minute = minute_of(at or timezone.now())
+        with self._lock:
+            counts = self._pending.setdefault((booth_id, day), {}).setdefault(minute, [0, 0])
+            counts[0] += entries
+            counts[1] += exits
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        # بعد از fork شدن پروسه، thread قبلی وجود ندارد
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="exhibition-rollups", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        close_old_connections()
+        try:
+            write_pending(pending)
+        except Exception:
+            logger.exception("Failed to write occupancy rollups; will retry.")
+            # تغییرها در دور بعد دوباره نوشته می‌شوند
+            with self._lock:
+                for key, minutes in pending.items():
+                    target = self._pending.setdefault(key, {})
+                    for minute, (entered, exited) in minutes.items():
+                        counts = target.setdefault(minute, [0, 0])
+                        counts[0] += entered
+                        counts[1] += exited
+        finally:
+            close_old_connections()
+
+
+buffer = RollupBuffer(interval=settings.EXHIBITION_ROLLUP_FLUSH_INTERVAL)
+atexit.register(buffer.flush)
+
+
+# ========== خواندن برای نمودار ==========
+
+
+def occupancy_series(
+    day: date, booth_ids: list[int] | None = None, resolution: int = 1
+) -> dict[str, Any]:
+    rows = BoothOccupancyRollup.objects.filter(day=day).select_related("booth").order_by("booth_id")
+    if booth_ids:
+        rows = rows.filter(booth_id__in=booth_ids)
+
+    # دقیقه‌های آینده‌ی امروز هنوز اتفاق نیفتاده‌اند
+    length = MINUTES_PER_DAY
+    today, now_minute = minute_of(timezone.now())
+    if day == today:
+        length = now_minute + 1
+    elif day > today:
+        length = 0
+
+    starts = range(0, length, resolution)
+    booths = []
+    for row in rows:
+        occupancy, entries, exits = (
+            _unpack(row.occupancy)[:length],
+            _unpack(row.entries)[:length],
+            _unpack(row.exits)[:length],
+        )
+        if resolution == 1:
+            points = {
+                "occupancy": occupancy.tolist(),
+                "entries": entries.tolist(),
+                "exits": exits.tolist(),
+            }
+        else:
+            # هر نقطه: بیشترین اشغال و مجموع ورود/خروج در resolution دقیقه
+            points = {
+                "occupancy": [max(occupancy[start : start + resolution]) for start in starts],
+                "entries": [sum(entries[start : start + resolution]) for start in starts],
+                "exits": [sum(exits[start : start + resolution]) for start in starts],
+            }
+        booths.append({"id": row.booth_id, "name": row.booth.name, **points})
+    return {
+        "day": day.isoformat(),
+        "resolution": resolution,
+        "minutes": list(starts),
+        "booths": booths,
+    }
+
+
+# ========== بازسازی از تاریخچه ==========
+
+
+def _events(model, field: str, delta: int, chunk_size: int) -> Iterator[tuple[datetime, int, int]]:
+    visits = (
+        model.objects.filter(**{f"{field}__isnull": False})
+        .order_by(field)
+        .values_list(field, "booth_id")
+    )
+    for moment, booth_id in visits.iterator(chunk_size=chunk_size):
+        yield moment, delta, booth_id
+
+
+class _DaySeries:
+    def __init__(self, booth_id: int, day: date, opening: int) -> None:
+        self.booth_id = booth_id
+        self.day = day
+        self.occupancy = _filled(opening)
+        self.entries = _filled(0)
+        self.exits = _filled(0)
+        self.last_minute = -1
+        self.value = opening
+
+    def add(self, minute: int, delta: int) -> None:
+        if minute > self.last_minute + 1:
+            # دقیقه‌های بدون رویداد اشغال دقیقه‌ی قبل را دارند
+            gap = minute - self.last_minute - 1
+            self.occupancy[self.last_minute + 1 : minute] = _filled(self.value, gap)
+        if delta > 0:
+            self.entries[minute] = _clamp(self.entries[minute] + 1)
+        else:
+            self.exits[minute] = _clamp(self.exits[minute] + 1)
+        self.value = max(self.value + delta, 0)
+        self.occupancy[minute] = _clamp(self.value)
+        self.last_minute = max(self.last_minute, minute)
+
+    def finish(self) -> BoothOccupancyRollup:
+        tail = MINUTES_PER_DAY - self.last_minute - 1
+        if tail > 0:
+            self.occupancy[self.last_minute + 1 :] = _filled(self.value, tail)
+        return BoothOccupancyRollup(
+            booth_id=self.booth_id,
+            day=self.day,
+            occupancy=_pack(self.occupancy),
+            entries=_pack(self.entries),
+            exits=_pack(self.exits),
+        )
+
+
+def rebuild_rollups(
+    batch_size: int = 500,
+    chunk_size: int = 5000,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    # ورودها و خروج‌های BoothVisit و BoothVisitArchive هر کدام به ترتیب زمان خوانده و با
+    # heapq.merge در یک جریان مرتب ادغام می‌شوند؛ فقط روز جاری هر غرفه در حافظه است
+    streams = [
+        _events(model, field, delta, chunk_size)
+        for model in (BoothVisitArchive, BoothVisit)
+        for field, delta in (("entered_at", 1), ("exited_at", -1))
+    ]
+    open_days: dict[int, _DaySeries] = {}
+    closing: dict[int, int] = {}
+    finished: list[BoothOccupancyRollup] = []
+    written = 0
+
+    def write(rows: list[BoothOccupancyRollup]) -> None:
+        nonlocal written
+        BoothOccupancyRollup.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+        if progress is not None:
+            progress(written)
+
+    with transaction.atomic():
+        BoothOccupancyRollup.objects.all().delete()
+        for moment, delta, booth_id in heapq.merge(*streams, key=itemgetter(0)):
+            day, minute = minute_of(moment)
+            series = open_days.get(booth_id)
+            if series is None or series.day != day:
+                if series is not None:
+                    finished.append(series.finish())
+                    closing[booth_id] = series.value
+                series = open_days[booth_id] = _DaySeries(booth_id, day, closing.get(booth_id, 0))
+            series.add(minute, delta)
+            if len(finished) >= batch_size:
+                write(finished)
+                finished = []
+        finished.extend(series.finish() for series in open_days.values())
+        if finished:
+            write(finished)
+    return written
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Booth
+from .occupancy import bump_version
+from .roles import invalidate_group, invalidate_roles
+from .wire import invalidate_names
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    if action == "pre_clear" and reverse:
+        # بعد از clear دیگر نمی‌دانیم چه کاربرانی عضو گروه بودند
+        invalidate_roles(list(instance.user_set.values_list("pk", flat=True)))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    invalidate_names()
+    if reverse:
+        invalidate_roles(pk_set or ())
+    else:
+        invalidate_roles([instance.pk])
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs) -> None:
+    invalidate_roles(list(instance.user_set.values_list("pk", flat=True)))
+    invalidate_group(instance.name)
+    invalidate_names()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs) -> None:
+    if created:
+        return
+    # ممکن است نام گروه عوض شده باشد
+    invalidate_roles(list(instance.user_set.values_list("pk", flat=True)))
+    invalidate_group(instance.name)
+    invalidate_names()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs) -> None:
+    invalidate_roles([instance.pk])
+    invalidate_names()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields, **kwargs) -> None:
+    # ذخیره‌ی last_login در هر ورود نام کاربر را عوض نمی‌کند
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_names()
+
+
+@receiver(post_save, sender=Booth)
+@receiver(post_delete, sender=Booth)
+def booth_changed(sender, instance, **kwargs) -> None:
+    invalidate_names()
+    # نام، ظرفیت یا وجود غرفه عوض شده؛ سند اشغال (و etag های API وضعیت) باید نو شوند
+    transaction.on_commit(bump_version)
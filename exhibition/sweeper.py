@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .admission import Outcome, get_admission_backend
+from .broadcast import dispatcher
+from .metrics import ADMISSION_OUTCOMES, SWEEP_DURATION, VISITS_EXPIRED
+from .models import Booth, BoothVisit
+from .occupancy import bump_version
+from .rollups import buffer as rollup_buffer
+from .waitlist import admit_waiting
+
+logger = logging.getLogger(__name__)
+
+# ========== بستن حضورهای فراموش‌شده ==========
+# لیدری که دکمه‌ی خروج را نزده اسلات غرفه را نگه می‌دارد. هر دور sweeper حضورهای فعالِ
+# طولانی‌تر از سقف غرفه را با close_visits (یک UPDATE برای هر غرفه) می‌بندد، اسلات‌ها را به
+# صف انتظار می‌دهد و همه‌ی غرفه‌ها و لیدرهای تغییرکرده را در یک broadcast می‌فرستد.
+
+
+def _expiry_filter(now: datetime) -> Q:
+    # غرفه‌های هم‌سقف در یک شرط booth_id IN (...) روی ایندکس active_visit_booth_idx
+    booths_by_minutes: dict[int, list[int]] = defaultdict(list)
+    for booth_id, minutes in Booth.objects.values_list("id", "max_visit_minutes"):
+        minutes = settings.EXHIBITION_MAX_VISIT_MINUTES if minutes is None else minutes
+        if minutes > 0:
+            booths_by_minutes[minutes].append(booth_id)
+
+    condition = Q()
+    for minutes, booth_ids in booths_by_minutes.items():
+        condition |= Q(booth_id__in=booth_ids, entered_at__lt=now - timedelta(minutes=minutes))
+    return condition
+
+
+def find_expired(
+    now: datetime | None = None, limit: int | None = None
+) -> list[tuple[int, int, int]]:
+    condition = _expiry_filter(now or timezone.now())
+    if not condition:
+        return []
+    return list(
+        BoothVisit.objects.filter(condition, is_active=True)
+        .order_by("entered_at")
+        .values_list("id", "booth_id", "leader_id")[: limit or settings.EXHIBITION_SWEEP_LIMIT]
+    )
+
+
+# بستن دسته‌ای حضورها از مسیر admission backend (برای sweeper و action پنل ادمین)؛
+# تعداد حضورهای بسته‌شده را به تفکیک غرفه برمی‌گرداند
+def close_visits(visit_ids: list[int]) -> dict[int, int]:
+    visits = BoothVisit.objects.filter(pk__in=visit_ids, is_active=True)
+    with transaction.atomic():
+        pairs = list(visits.values_list("booth_id", "leader_id"))
+        closed_visits = get_admission_backend().close_visits(visits)
+        closed = {booth_id: len(started) for booth_id, started in closed_visits.items()}
+        leader_ids = {leader_id for booth_id, leader_id in pairs if booth_id in closed}
+        for booth in Booth.objects.filter(pk__in=list(closed)):
+            admitted = admit_waiting(booth)
+            if admitted:
+                ADMISSION_OUTCOMES.inc(
+                    "waitlist_admit", Outcome.ADMITTED.value, amount=len(admitted)
+                )
+            leader_ids.update(admitted)
+            transaction.on_commit(
+                partial(rollup_buffer.record, booth.id, len(admitted), closed[booth.id])
+            )
+        if closed:
+            transaction.on_commit(bump_version)
+            transaction.on_commit(
+                partial(dispatcher.changed, sorted(closed), sorted(leader_ids))
+            )
+    return closed
+
+
+def sweep(now: datetime | None = None, limit: int | None = None) -> dict[int, int]:
+    started = time.perf_counter()
+    expired = find_expired(now, limit)
+    closed = close_visits([visit_id for visit_id, _, _ in expired]) if expired else {}
+
+    for booth_id, count in closed.items():
+        VISITS_EXPIRED.inc(str(booth_id), amount=count)
+    SWEEP_DURATION.observe(value=time.perf_counter() - started)
+    if closed:
+        logger.info(
+            "Closed %d stale visit(s) in %d booth(s).", sum(closed.values()), len(closed)
+        )
+    return closed
+
+
+# ========== اجرای دوره‌ای داخل پروسه‌ی سرور ==========
+# با channel layer درون‌پروسه‌ای (local) فقط dispatcher همین پروسه به سوکت‌ها دسترسی دارد،
+# برای همین sweeper به صورت thread در کنار سرور اجرا می‌شود (config/asgi.py).
+
+
+class VisitSweeper:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            # بعد از fork شدن پروسه، thread قبلی وجود ندارد
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="exhibition-sweeper", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            close_old_connections()
+            try:
+                sweep()
+            except Exception:
+                logger.exception("Stale-visit sweep failed.")
+            finally:
+                close_old_connections()
+
+
+sweeper = VisitSweeper(interval=settings.EXHIBITION_SWEEP_INTERVAL)
@@ -0,0 +1,145 @@
+import os
+import threading
+import unittest
+from collections import Counter
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from exhibition import rollups
+from exhibition.admission import get_admission_backend
+from exhibition.broadcast import dispatcher
+from exhibition.models import Booth, BoothVisit
+from exhibition.roles import LEADERS
+
+BOOTHS = 3
+CAPACITY = 2
+LEADERS_COUNT = 12
+THREADS_PER_LEADER = 2
+ROUNDS = 3
+
+TEST_REDIS_URL = os.environ.get("EXHIBITION_TEST_REDIS_URL", "redis://127.0.0.1:6379/15")
+
+
+# همه‌ی درخواست‌های هر دور با یک barrier هم‌زمان رها می‌شوند: هر لیدر با چند درخواست روی
+# غرفه‌های مختلف با خودش و همه‌ی لیدرها سر چند اسلات محدود مسابقه می‌دهند
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class DatabaseBackendConcurrencyTests(TransactionTestCase):
+    admission = {"BACKEND": "exhibition.admission.DatabaseAdmissionBackend", "OPTIONS": {}}
+
+    def setUp(self) -> None:
+        cache.clear()
+        override = override_settings(EXHIBITION_ADMISSION=self.admission)
+        override.enable()
+        self.addCleanup(override.disable)
+        # broadcast و rollup های در صف قبل از پاک شدن دیتابیس و تنظیمات تست فرستاده می‌شوند
+        self.addCleanup(rollups.buffer.flush)
+        self.addCleanup(dispatcher.flush)
+        get_admission_backend.cache_clear()
+        self.addCleanup(get_admission_backend.cache_clear)
+
+        leaders = Group.objects.create(name=LEADERS)
+        self.booths = [
+            Booth.objects.create(name=f"booth-{i}", slug=f"booth-{i}", max_groups=CAPACITY)
+            for i in range(BOOTHS)
+        ]
+        self.leaders = []
+        for i in range(LEADERS_COUNT):
+            user = User.objects.create(username=f"leader-{i}")
+            user.groups.add(leaders)
+            self.leaders.append(user)
+
+    def _client(self, user: User) -> Client:
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def _enter_concurrently(self) -> Counter:
+        workers = [
+            (self._client(leader), i * THREADS_PER_LEADER + index)
+            for i, leader in enumerate(self.leaders)
+            for index in range(THREADS_PER_LEADER)
+        ]
+        barrier = threading.Barrier(len(workers))
+        statuses: Counter = Counter()
+        lock = threading.Lock()
+
+        def run(client: Client, index: int) -> None:
+            try:
+                barrier.wait()
+                booth = self.booths[index % len(self.booths)]
+                response = client.post(reverse("enter_booth", args=[booth.id]))
+                with lock:
+                    statuses[response.status_code] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=worker) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # استثنای هر thread (پاسخ 500) در شمارش جا می‌ماند
+        self.assertEqual(sum(statuses.values()), len(workers))
+        return statuses
+
+    def _assert_invariants(self) -> None:
+        booths = Booth.objects.annotate(
+            active=Count("visits", filter=Q(visits__is_active=True))
+        )
+        for booth in booths:
+            self.assertLessEqual(booth.active, booth.max_groups, booth.name)
+            self.assertEqual(booth.current_visitors, booth.active, booth.name)
+        doubled = (
+            BoothVisit.objects.filter(is_active=True)
+            .values("leader")
+            .annotate(total=Count("pk"))
+            .filter(total__gt=1)
+        )
+        self.assertFalse(doubled.exists())
+
+    def test_concurrent_enter_never_over_admits(self) -> None:
+        for _ in range(ROUNDS):
+            statuses = self._enter_concurrently()
+            self.assertLessEqual(set(statuses), {200, 400, 503})
+            self._assert_invariants()
+            self.assertEqual(
+                BoothVisit.objects.filter(is_active=True).count(), BOOTHS * CAPACITY
+            )
+            # نیمی از اسلات‌ها برای دور بعد آزاد می‌شوند
+            for visit in BoothVisit.objects.filter(is_active=True)[::2]:
+                response = self._client(visit.leader).post(
+                    reverse("exit_booth", args=[visit.booth_id])
+                )
+                self.assertEqual(response.status_code, 200)
+            self._assert_invariants()
+
+
+class RedisBackendConcurrencyTests(DatabaseBackendConcurrencyTests):
+    admission = {
+        "BACKEND": "exhibition.admission.RedisAdmissionBackend",
+        "OPTIONS": {"url": TEST_REDIS_URL},
+    }
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        try:
+            import redis
+
+            cls.redis = redis.Redis.from_url(TEST_REDIS_URL)
+            cls.redis.ping()
+        except Exception as exc:
+            raise unittest.SkipTest(f"Redis is not available at {TEST_REDIS_URL}: {exc}")
+        super().setUpClass()
+
+    def setUp(self) -> None:
+        keys = list(self.redis.scan_iter("exhibition:admission:*"))
+        if keys:
+            self.redis.delete(*keys)
+        super().setUp()
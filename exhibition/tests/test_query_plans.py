@@ -0,0 +1,76 @@
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from exhibition.management.commands.check_query_plans import (
+    PARTIAL_INDEXES,
+    _hot_queries,
+    _other_indexes,
+    _plan_problem,
+)
+from exhibition.models import Booth, BoothVisit, LeaderBoothStatus
+
+BOOTHS = 10
+LEADERS = 100
+HISTORY = 20_000
+
+# ایندکس جزئی‌ای که هر کوئری داغ باید رویش بماند (migration 0008؛ وضعیت فعال لیدر از
+# قید یکتای جزئی 0007 هم می‌تواند بخواند)
+EXPECTED_INDEXES = {
+    "snapshot: active visits per booth": {"active_visit_booth_idx"},
+    "drift check: active count per booth": {"active_visit_booth_idx"},
+    "leader state: active booths": {"active_visit_leader_idx", "unique_active_visit_per_leader"},
+    "exit: active visit of leader in booth": {"active_visit_leader_idx"},
+    "leader state: checked booths": {"checked_status_leader_idx"},
+}
+
+
+# کوئری‌های endpoint های وضعیت با تاریخچه‌ی بزرگ بازدیدهای بسته‌شده هم باید فقط روی
+# ایندکس‌های جزئی migration 0008 بمانند
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        booths = Booth.objects.bulk_create(
+            Booth(name=f"booth-{i}", slug=f"booth-{i}", max_groups=LEADERS)
+            for i in range(BOOTHS)
+        )
+        leaders = User.objects.bulk_create(User(username=f"leader-{i}") for i in range(LEADERS))
+        now = timezone.now()
+        BoothVisit.objects.bulk_create(
+            BoothVisit(
+                booth=booths[i % BOOTHS],
+                leader=leaders[i % LEADERS],
+                is_active=False,
+                exited_at=now,
+            )
+            for i in range(HISTORY)
+        )
+        BoothVisit.objects.bulk_create(
+            BoothVisit(booth=booths[i % BOOTHS], leader=leader, is_active=True)
+            for i, leader in enumerate(leaders[: LEADERS // 2])
+        )
+        LeaderBoothStatus.objects.bulk_create(
+            LeaderBoothStatus(leader=leader, booth=booth, is_checked=(i + j) % 4 == 0)
+            for i, leader in enumerate(leaders)
+            for j, booth in enumerate(booths)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.booth_id = booths[0].id
+        cls.leader_id = leaders[0].id
+
+    def test_status_queries_use_partial_indexes(self) -> None:
+        others = {table: _other_indexes(table) for table in PARTIAL_INDEXES}
+        visits = BoothVisit._meta.db_table
+        for label, table, queryset in _hot_queries(self.booth_id, self.leader_id):
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertIsNone(_plan_problem(plan, table, others[table]), plan)
+                self.assertNotRegex(plan, rf"\bSCAN {visits}\b(?! USING)")
+                self.assertTrue(
+                    any(re.search(rf"\b{name}\b", plan) for name in EXPECTED_INDEXES[label]),
+                    plan,
+                )
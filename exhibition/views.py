@@ -1,29 +1,156 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+import math
+import time
+from datetime import date, datetime
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.contrib.auth.models import Group, User
-from django.db import transaction
+from django.contrib.auth.models import User
+from django.core.paginator import Page, Paginator
+from django.db import OperationalError, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.cache import cache_control
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_POST
 
-from .models import Booth, BoothVisit, LeaderBoothStatus
+from . import dwell, recommend, rollups, waitlist
+from .admission import Outcome, get_admission_backend, is_lock_error
+from .broadcast import dispatcher
+from .metrics import ADMISSION_OUTCOMES, CONTENT_TYPE, REGISTRY
+from .models import Booth, BoothVisit, BoothWaitlistEntry, LeaderBoothStatus
+from .occupancy import acurrent_version, active_booth_ids, aget_document, bump_version, get_document
+from .provisioning import MAX_UPLOAD_BYTES, import_leaders
+from .roles import EXHIBITION_ADMINS, LEADERS, aget_roles, group_id, has_role
 
 
-def _safe_broadcast_capacity_update(booth_id: int) -> None:
-    try:
-        _broadcast_capacity_update(booth_id=booth_id)
-    except Exception:
-        return
+def _broadcast_capacity_update(booth_id: int) -> None:
+    # ارسال واقعی بعد از commit و خارج از مسیر درخواست انجام می‌شود
+    transaction.on_commit(partial(dispatcher.booth_changed, booth_id))
+
+
+def _broadcast_leader_state(user_id: int) -> None:
+    transaction.on_commit(partial(dispatcher.leader_changed, user_id))
+
+
+def _record_rollup(booth_id: int, entries: int = 0, exits: int = 0) -> None:
+    transaction.on_commit(partial(rollups.buffer.record, booth_id, entries, exits))
+
+
+# entered_at حضورهای بسته‌شده را backend در همان کوئری بستن برمی‌گرداند؛
+# مدت حضور بعد از commit به آمار غرفه اضافه می‌شود. estimator.warm() باید قبل از بستن حضور
+# صدا زده شود، وگرنه اولین خروج هر پروسه یک بار در تاریخچه‌ی warm و یک بار در observe شمرده می‌شود
+def _record_dwell(closed: dict[int, list[datetime]]) -> None:
+    def observe() -> None:
+        now = timezone.now()
+        for booth_id, started in closed.items():
+            for entered_at in started:
+                dwell.estimator.observe(booth_id, (now - entered_at).total_seconds())
+
+    if closed:
+        transaction.on_commit(observe)
+
+
+# اسلات آزادشده در همان تراکنش به نفر اول صف انتظار غرفه می‌رسد
+def _admit_waiting(booth: Booth) -> list[int]:
+    admitted = waitlist.admit_waiting(booth)
+    if admitted:
+        ADMISSION_OUTCOMES.inc("waitlist_admit", Outcome.ADMITTED.value, amount=len(admitted))
+    for user_id in admitted:
+        _broadcast_leader_state(user_id=user_id)
+    _record_rollup(booth.id, entries=len(admitted))
+    return admitted
+
+
+_ADMISSION_ERRORS = {
+    Outcome.ALREADY_INSIDE: ("شما هم‌اکنون در یک غرفه‌ی دیگر حضور دارید.", 400),
+    Outcome.FULL: ("این غرفه پر است.", 400),
+    Outcome.NOT_INSIDE: ("شما در حال حاضر داخل این غرفه ثبت نشده‌اید.", 400),
+    Outcome.LOCK_TIMEOUT: ("سرور در حال حاضر شلوغ است؛ لطفاً دوباره تلاش کنید.", 503),
+    Outcome.ALREADY_WAITING: ("شما هم‌اکنون در صف غرفه‌ی دیگری هستید.", 409),
+}
+
+
+def _admission_error(outcome: Outcome) -> JsonResponse:
+    message, status = _ADMISSION_ERRORS[outcome]
+    return JsonResponse({"error": message, "reason": outcome.value}, status=status)
+
+
+# با transaction_mode=IMMEDIATE قفل نوشتن SQLite در BEGIN همان transaction.atomic() بیرونی view
+# گرفته می‌شود، قبل از try/except های backend پذیرش؛ busy timeout آن هم همان پاسخ 503 را می‌گیرد
+def _lock_timeout_as_busy(action: str):
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            try:
+                return view_func(request, *args, **kwargs)
+            except OperationalError as exc:
+                if not is_lock_error(exc):
+                    raise
+                ADMISSION_OUTCOMES.inc(action, Outcome.LOCK_TIMEOUT.value)
+                return _admission_error(Outcome.LOCK_TIMEOUT)
+
+        return inner
+
+    return decorator
+
+
+def _async_etag(etag_func):
+    # معادل async دکوراتور condition(etag_func=...) که etag را بدون دسترسی sync می‌سازد
+    def decorator(view_func):
+        @wraps(view_func)
+        async def inner(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            etag = quote_etag(await etag_func(request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+# نسخه epoch دارد (occupancy._epoch_start)، پس بعد از cull یا restart شدن cache هم etag یک
+# وضعیت قدیمی تکرار نمی‌شود و 304 اشتباه برنمی‌گردد
+async def _occupancy_etag(request: HttpRequest, *args, **kwargs) -> str:
+    return f"occupancy-{await acurrent_version()}"
+
+
+# زمان انتظار با گذشت زمان هم تغییر می‌کند، پس etag هر WAIT_ETAG_SECONDS عوض می‌شود
+WAIT_ETAG_SECONDS = 30
+
+
+async def _wait_etag(request: HttpRequest, *args, **kwargs) -> str:
+    return f"occupancy-{await acurrent_version()}-{int(time.time() // WAIT_ETAG_SECONDS)}"
+
+
+async def _leader_occupancy_etag(request: HttpRequest, *args, **kwargs) -> str:
+    user = await request.auser()
+    return f"occupancy-{await acurrent_version()}-{user.id}"
 
 
 def is_leader(user) -> bool:
-    return user.groups.filter(name="leaders").exists()
+    return has_role(user, LEADERS)
 
 
 def is_exhibition_admin(user) -> bool:
-    return user.groups.filter(name="exhibition_admins").exists()
+    return has_role(user, EXHIBITION_ADMINS)
+
+
+async def ais_leader(user) -> bool:
+    return LEADERS in await aget_roles(user)
+
+
+async def ais_exhibition_admin(user) -> bool:
+    return EXHIBITION_ADMINS in await aget_roles(user)
 
 
 @login_required
@@ -45,89 +172,96 @@ def redirect_after_login(request: HttpRequest) -> HttpResponse:
 @login_required
 @user_passes_test(is_leader)
 def leader_dashboard(request: HttpRequest) -> HttpResponse:
-    booths = Booth.objects.all().order_by("id")
-    active_visits = {
-        v.booth_id
-        for v in BoothVisit.objects.filter(leader=request.user, is_active=True)
-    }
+    document = get_document()
+    dwell.estimator.warm()
+    active_visits = set(active_booth_ids(document, request.user.id))
+    waiting = set(
+        BoothWaitlistEntry.objects.filter(leader=request.user).values_list("booth_id", flat=True)
+    )
 
-    booth_data: list[dict] = []
-    for booth in booths:
-        occupied = BoothVisit.objects.filter(booth=booth, is_active=True).count()
-        remaining = max(booth.max_groups - occupied, 0)
-        booth_data.append(
-            {
-                "id": booth.id,
-                "name": booth.name,
-                "max": booth.max_groups,
-                "occupied": occupied,
-                "remaining": remaining,
-                "is_user_inside": booth.id in active_visits,
-            }
-        )
+    booth_data: list[dict] = [
+        {
+            "id": booth["id"],
+            "name": booth["name"],
+            "max": booth["max_groups"],
+            "max_groups": booth["max_groups"],
+            "occupied": booth["occupied"],
+            "remaining": booth["remaining"],
+            "is_user_inside": booth["id"] in active_visits,
+            "is_user_waiting": booth["id"] in waiting,
+            "waiting": booth["waiting"],
+            "wait_minutes": (
+                None if booth["wait_seconds"] is None else math.ceil(booth["wait_seconds"] / 60)
+            ),
+        }
+        for booth in dwell.estimator.annotate(document["booths"])
+    ]
 
     context = {"booths": booth_data}
     return render(request, "exhibition/leader_dashboard.html", context)
 
 
 @login_required
-@user_passes_test(is_leader)
-def leader_status_api(request: HttpRequest) -> JsonResponse:
-    active_visits = BoothVisit.objects.filter(
-        leader=request.user, is_active=True
-    ).values_list("booth_id", flat=True)
-    
-    return JsonResponse({"active_booth_ids": list(active_visits)})
+@user_passes_test(ais_leader)
+@cache_control(private=True, no_cache=True)
+@_async_etag(_leader_occupancy_etag)
+async def leader_status_api(request: HttpRequest) -> JsonResponse:
+    user = await request.auser()
+    active_visits = active_booth_ids(await aget_document(), user.id)
+    return JsonResponse({"active_booth_ids": active_visits})
 
 
 @login_required
-@user_passes_test(is_leader)
-def all_booths_status_api(request: HttpRequest) -> JsonResponse:
-    booths = Booth.objects.all().order_by("id")
-    result = []
-    for booth in booths:
-        occupied = BoothVisit.objects.filter(booth=booth, is_active=True).count()
-        remaining = max(booth.max_groups - occupied, 0)
-        result.append({
-            "id": booth.id,
-            "occupied": occupied,
-            "remaining": remaining,
-            "max": booth.max_groups,
-        })
+@user_passes_test(ais_leader)
+@cache_control(private=True, no_cache=True)
+@_async_etag(_wait_etag)
+async def all_booths_status_api(request: HttpRequest) -> JsonResponse:
+    if not dwell.estimator.warmed:
+        await sync_to_async(dwell.estimator.warm)()
+    result = [
+        {
+            "id": booth["id"],
+            "occupied": booth["occupied"],
+            "remaining": booth["remaining"],
+            "max": booth["max_groups"],
+            "waiting": booth["waiting"],
+            "wait_seconds": booth["wait_seconds"],
+        }
+        for booth in dwell.estimator.annotate((await aget_document())["booths"])
+    ]
     return JsonResponse({"booths": result})
 
 
-def _broadcast_capacity_update(booth_id: int) -> None:
-    channel_layer = get_channel_layer()
-    booth = Booth.objects.get(pk=booth_id)
-    occupied = BoothVisit.objects.filter(booth=booth, is_active=True).count()
-    remaining = max(booth.max_groups - occupied, 0)
-
-    active_visits = (
-        BoothVisit.objects.filter(booth=booth, is_active=True)
-        .select_related("leader")
-    )
-    
-    leaders = [
-        {"username": v.leader.username, "id": v.leader.id}
-        for v in active_visits
-    ]
+RECOMMENDATIONS_LIMIT = 5
 
-    async_to_sync(channel_layer.group_send)(
-        "capacity_updates",
-        {
-            "type": "capacity.update",
-            "booth_id": booth.id,
-            "booth_name": booth.name,
-            "occupied": occupied,
-            "remaining": remaining,
-            "leaders": leaders,
-        },
-    )
+
+@login_required
+@user_passes_test(ais_leader)
+@cache_control(private=True, no_cache=True)
+async def recommended_booths_api(request: HttpRequest) -> JsonResponse:
+    try:
+        limit = int(request.GET.get("limit", RECOMMENDATIONS_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "limit نامعتبر است."}, status=400)
+    if not 1 <= limit <= 50:
+        return JsonResponse({"error": "limit باید بین ۱ تا ۵۰ باشد."}, status=400)
+
+    user = await request.auser()
+    checked = {
+        booth_id
+        async for booth_id in LeaderBoothStatus.objects.filter(
+            leader=user, is_checked=True
+        ).values_list("booth_id", flat=True)
+    }
+    scored = await recommend.ascored_booths()
+    booths = recommend.recommend(scored, user.id, checked, limit)
+    unchecked = sum(1 for _, booth in scored if booth["id"] not in checked)
+    return JsonResponse({"booths": booths, "unchecked": unchecked})
 
 
 @login_required
 @user_passes_test(is_leader)
+@_lock_timeout_as_busy("enter")
 def enter_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
     booth = get_object_or_404(Booth, pk=booth_id)
 
@@ -137,36 +271,50 @@ def enter_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
     user = request.user
 
     with transaction.atomic():
-        active_visits_for_user = (
-            BoothVisit.objects.select_for_update()
-            .filter(leader=user, is_active=True)
-        )
+        outcome = get_admission_backend().enter(booth, user.id)
+        ADMISSION_OUTCOMES.inc("enter", outcome.value)
+        if outcome is not Outcome.ADMITTED:
+            return _admission_error(outcome)
+        left = waitlist.forget(user.id)
+        _record_rollup(booth.id, entries=1)
+        transaction.on_commit(bump_version)
+
+    _broadcast_capacity_update(booth_id=booth.id)
+    # طول صف غرفه‌هایی که لیدر از صفشان خارج شد
+    for left_booth_id in left:
+        _broadcast_capacity_update(booth_id=left_booth_id)
+    _broadcast_leader_state(user_id=user.id)
 
-        if active_visits_for_user.exists():
-            return JsonResponse(
-                {"error": "شما هم‌اکنون در یک غرفه‌ی دیگر حضور دارید."},
-                status=400,
-            )
+    return JsonResponse(
+        {"success": True, "booth_id": booth.id},
+        status=200,
+    )
 
-        active_visits_for_booth = (
-            BoothVisit.objects.select_for_update()
-            .filter(booth=booth, is_active=True)
-        )
-        current_occupied = active_visits_for_booth.count()
 
-        if current_occupied >= booth.max_groups:
-            return JsonResponse(
-                {"error": "این غرفه پر است."},
-                status=400,
-            )
+@login_required
+@user_passes_test(is_leader)
+@_lock_timeout_as_busy("exit")
+def exit_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
+    booth = get_object_or_404(Booth, pk=booth_id)
 
-        BoothVisit.objects.create(
-            booth=booth,
-            leader=user,
-            is_active=True,
-        )
+    if request.method != "POST":
+        return JsonResponse({"error": "درخواست نامعتبر است."}, status=400)
 
-    _safe_broadcast_capacity_update(booth_id=booth.id)
+    user = request.user
+
+    dwell.estimator.warm()
+    with transaction.atomic():
+        outcome, entered_at = get_admission_backend().exit(booth.id, user.id)
+        ADMISSION_OUTCOMES.inc("exit", outcome.value)
+        if outcome is not Outcome.EXITED:
+            return _admission_error(outcome)
+        _record_dwell({booth.id: [entered_at]})
+        _record_rollup(booth.id, exits=1)
+        _admit_waiting(booth)
+        transaction.on_commit(bump_version)
+
+    _broadcast_capacity_update(booth_id=booth.id)
+    _broadcast_leader_state(user_id=user.id)
 
     return JsonResponse(
         {"success": True, "booth_id": booth.id},
@@ -176,7 +324,8 @@ def enter_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
 
 @login_required
 @user_passes_test(is_leader)
-def exit_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
+@_lock_timeout_as_busy("waitlist_join")
+def join_waitlist(request: HttpRequest, booth_id: int) -> JsonResponse:
     booth = get_object_or_404(Booth, pk=booth_id)
 
     if request.method != "POST":
@@ -185,89 +334,107 @@ def exit_booth(request: HttpRequest, booth_id: int) -> JsonResponse:
     user = request.user
 
     with transaction.atomic():
-        try:
-            visit = (
-                BoothVisit.objects.select_for_update()
-                .get(booth=booth, leader=user, is_active=True)
-            )
-        except BoothVisit.DoesNotExist:
-            return JsonResponse(
-                {"error": "شما در حال حاضر داخل این غرفه ثبت نشده‌اید."},
-                status=400,
-            )
-
-        visit.is_active = False
-        visit.exited_at = timezone.now()
-        visit.save()
-
-    _safe_broadcast_capacity_update(booth_id=booth.id)
+        outcome, left = waitlist.join(booth, user.id)
+        if outcome is not Outcome.QUEUED:
+            ADMISSION_OUTCOMES.inc("waitlist_join", outcome.value)
+            if left:
+                # خروج از صف‌های قبلی با همین پاسخ commit می‌شود
+                transaction.on_commit(bump_version)
+                for left_booth_id in left:
+                    _broadcast_capacity_update(booth_id=left_booth_id)
+                _broadcast_leader_state(user_id=user.id)
+            return _admission_error(outcome)
+        # اگر جای خالی باشد (صف خالی بود یا ظرفیت بیشتر شده) نفرهای اول صف همین حالا وارد می‌شوند
+        admitted = _admit_waiting(booth)
+        if user.id in admitted:
+            outcome = Outcome.ADMITTED
+        ADMISSION_OUTCOMES.inc("waitlist_join", outcome.value)
+        position = waitlist.position(booth.id, user.id)
+        # طول صف جزو سند اشغال است
+        transaction.on_commit(bump_version)
+
+    for changed_booth_id in (booth.id, *left):
+        _broadcast_capacity_update(booth_id=changed_booth_id)
+    _broadcast_leader_state(user_id=user.id)
 
     return JsonResponse(
-        {"success": True, "booth_id": booth.id},
+        {
+            "success": True,
+            "booth_id": booth.id,
+            "admitted": outcome is Outcome.ADMITTED,
+            "position": position,
+        },
         status=200,
     )
 
 
+@login_required
+@user_passes_test(is_leader)
+@_lock_timeout_as_busy("waitlist_leave")
+def leave_waitlist(request: HttpRequest, booth_id: int) -> JsonResponse:
+    booth = get_object_or_404(Booth, pk=booth_id)
+
+    if request.method != "POST":
+        return JsonResponse({"error": "درخواست نامعتبر است."}, status=400)
+
+    user = request.user
+
+    with transaction.atomic():
+        if not waitlist.leave(booth.id, user.id):
+            return JsonResponse({"error": "شما در صف این غرفه نیستید."}, status=400)
+        transaction.on_commit(bump_version)
+
+    _broadcast_capacity_update(booth_id=booth.id)
+    _broadcast_leader_state(user_id=user.id)
+
+    return JsonResponse({"success": True, "booth_id": booth.id}, status=200)
+
+
 @login_required
 @user_passes_test(is_exhibition_admin)
 def admin_dashboard(request: HttpRequest) -> HttpResponse:
-    booths = Booth.objects.all().order_by("id")
-    data: list[dict] = []
-    for booth in booths:
-        active_visits = (
-            BoothVisit.objects.filter(booth=booth, is_active=True)
-            .select_related("leader")
-            .order_by("leader__username")
-        )
-        occupied = active_visits.count()
-        remaining = max(booth.max_groups - occupied, 0)
-        leaders = [v.leader for v in active_visits]
-        data.append(
-            {
-                "booth": booth,
-                "occupied": occupied,
-                "remaining": remaining,
-                "leaders": leaders,
-            }
-        )
+    data: list[dict] = [
+        {
+            "booth": booth,
+            "occupied": booth["occupied"],
+            "remaining": booth["remaining"],
+            "leaders": booth["leaders"],
+        }
+        for booth in get_document()["booths"]
+    ]
 
     context = {"booth_status": data}
     return render(request, "exhibition/admin_dashboard.html", context)
 
 
 @login_required
-@user_passes_test(is_exhibition_admin)
-def admin_booth_status_api(request: HttpRequest) -> JsonResponse:
-    booths = Booth.objects.all().order_by("id")
-    result: list[dict] = []
-    for booth in booths:
-        active_visits = (
-            BoothVisit.objects.filter(booth=booth, is_active=True)
-            .select_related("leader")
-            .order_by("leader__username")
-        )
-        occupied = active_visits.count()
-        remaining = max(booth.max_groups - occupied, 0)
-        leaders = [
-            {"username": v.leader.username, "id": v.leader.id}
-            for v in active_visits
-        ]
-        result.append(
-            {
-                "id": booth.id,
-                "name": booth.name,
-                "max_groups": booth.max_groups,
-                "occupied": occupied,
-                "remaining": remaining,
-                "leaders": leaders,
-            }
-        )
+@user_passes_test(ais_exhibition_admin)
+@cache_control(private=True, no_cache=True)
+@_async_etag(_occupancy_etag)
+async def admin_booth_status_api(request: HttpRequest) -> JsonResponse:
+    return JsonResponse({"booths": (await aget_document())["booths"]})
 
-    return JsonResponse({"booths": result})
+
+# نمودار اشغال یک روز: ?day=YYYY-MM-DD (پیش‌فرض امروز)، ?booth=<id> (تکرارپذیر)،
+# ?resolution=<دقیقه> (۱ تا ۶۰، پیش‌فرض ۵)
+@login_required
+@user_passes_test(is_exhibition_admin)
+def occupancy_history_api(request: HttpRequest) -> JsonResponse:
+    try:
+        day_param = request.GET.get("day")
+        day = date.fromisoformat(day_param) if day_param else timezone.localdate()
+        booth_ids = [int(booth_id) for booth_id in request.GET.getlist("booth")]
+        resolution = int(request.GET.get("resolution", 5))
+    except ValueError:
+        return JsonResponse({"error": "پارامترهای درخواست نامعتبر است."}, status=400)
+    if not 1 <= resolution <= 60:
+        return JsonResponse({"error": "resolution باید بین ۱ تا ۶۰ دقیقه باشد."}, status=400)
+    return JsonResponse(rollups.occupancy_series(day, booth_ids or None, resolution))
 
 
 @login_required
 @user_passes_test(is_exhibition_admin)
+@_lock_timeout_as_busy("force_exit")
 def admin_force_exit(
     request: HttpRequest, booth_id: int, user_id: int
 ) -> HttpResponse:
@@ -275,26 +442,28 @@ def admin_force_exit(
         return JsonResponse({"error": "درخواست نامعتبر است."}, status=400)
 
     booth = get_object_or_404(Booth, pk=booth_id)
-    leader = get_object_or_404(Group.objects.get(name="leaders").user_set, pk=user_id)
+    leader = get_object_or_404(User.objects.filter(groups__id=group_id(LEADERS)), pk=user_id)
 
+    dwell.estimator.warm()
     with transaction.atomic():
-        visits = (
-            BoothVisit.objects.select_for_update()
-            .filter(booth=booth, leader=leader, is_active=True)
+        closed = get_admission_backend().close_visits(
+            BoothVisit.objects.filter(booth=booth, leader=leader, is_active=True)
         )
-        if not visits.exists():
+        ADMISSION_OUTCOMES.inc(
+            "force_exit", (Outcome.EXITED if closed else Outcome.NOT_INSIDE).value
+        )
+        if not closed:
             return JsonResponse(
                 {"error": "این لیدر در حال حاضر داخل این غرفه ثبت نشده است."},
                 status=400,
             )
+        _record_dwell(closed)
+        _record_rollup(booth.id, exits=len(closed[booth.id]))
+        _admit_waiting(booth)
+        transaction.on_commit(bump_version)
 
-        now = timezone.now()
-        for v in visits:
-            v.is_active = False
-            v.exited_at = now
-            v.save()
-
-    _safe_broadcast_capacity_update(booth_id=booth.id)
+    _broadcast_capacity_update(booth_id=booth.id)
+    _broadcast_leader_state(user_id=leader.id)
 
     return JsonResponse({"success": True}, status=200)
 
@@ -302,26 +471,58 @@ def admin_force_exit(
 # ========== CRUD برای لیدرها ==========
 
 
+LEADERS_PAGE_SIZE = 50
+
+
+# تعداد حضور فعال هر لیدر در همان کوئری لیست (از index جزئی active_visit_leader_idx)
+def _active_visits_subquery() -> Subquery:
+    return Subquery(
+        BoothVisit.objects.filter(leader=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("leader")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+
+
+# یک کوئری count برای صفحه‌بندی + یک کوئری برای ردیف‌های همان صفحه، مستقل از تعداد لیدرها
+def _leader_page(request: HttpRequest) -> tuple[Page, str]:
+    search = request.GET.get("q", "").strip()
+    leaders = User.objects.filter(groups__id=group_id(LEADERS))
+    if search:
+        leaders = leaders.filter(username__icontains=search)
+    leaders = (
+        leaders.annotate(active_visits=Coalesce(_active_visits_subquery(), 0))
+        .order_by("username")
+        .values("id", "username", "is_active", "active_visits")
+    )
+    page = Paginator(leaders, LEADERS_PAGE_SIZE).get_page(request.GET.get("page"))
+    return page, search
+
+
 @login_required
 @user_passes_test(is_exhibition_admin)
 def leader_list(request: HttpRequest) -> HttpResponse:
-    leaders_group = Group.objects.get(name="leaders")
-    leaders = leaders_group.user_set.all().order_by("username")
-    
-    leader_data = []
-    for leader in leaders:
-        active_visits = BoothVisit.objects.filter(leader=leader, is_active=True).count()
-        leader_data.append({
-            "id": leader.id,
-            "username": leader.username,
-            "is_active": leader.is_active,
-            "active_visits": active_visits,
-        })
-    
-    context = {"leaders": leader_data}
+    page, search = _leader_page(request)
+    context = {"leaders": page.object_list, "page": page, "search": search}
     return render(request, "exhibition/leader_list.html", context)
 
 
+@login_required
+@user_passes_test(is_exhibition_admin)
+def leader_list_api(request: HttpRequest) -> JsonResponse:
+    page, search = _leader_page(request)
+    return JsonResponse(
+        {
+            "leaders": list(page.object_list),
+            "page": page.number,
+            "num_pages": page.paginator.num_pages,
+            "count": page.paginator.count,
+            "search": search,
+        }
+    )
+
+
 @login_required
 @user_passes_test(is_exhibition_admin)
 def leader_create(request: HttpRequest) -> HttpResponse | JsonResponse:
@@ -341,22 +542,43 @@ def leader_create(request: HttpRequest) -> HttpResponse | JsonResponse:
                 status=400,
             )
         
-        leaders_group = Group.objects.get(name="leaders")
         user = User.objects.create_user(username=username, password=password)
-        user.groups.add(leaders_group)
+        user.groups.add(group_id(LEADERS))
         
         return JsonResponse({"success": True, "leader_id": user.id}, status=200)
     
     return render(request, "exhibition/leader_form.html", {"leader": None})
 
 
+@login_required
+@user_passes_test(ais_exhibition_admin)
+@require_POST
+async def leader_import(request: HttpRequest) -> JsonResponse:
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "فایل CSV انتخاب نشده است."}, status=400)
+    if upload.size > MAX_UPLOAD_BYTES:
+        return JsonResponse({"error": "حجم فایل بیش از حد مجاز است."}, status=400)
+    try:
+        text = upload.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return JsonResponse({"error": "فایل باید با کدگذاری UTF-8 ذخیره شده باشد."}, status=400)
+
+    # هش رمزها در pool پروسه‌ها و ثبت در یک thread جدا؛ thread مشترک view های sync
+    # (thread_sensitive) در طول import آزاد می‌ماند
+    result = await sync_to_async(import_leaders, thread_sensitive=False)(text)
+    return JsonResponse(
+        {"success": True, "created": len(result["created"]), "errors": result["errors"]},
+        status=200,
+    )
+
+
 @login_required
 @user_passes_test(is_exhibition_admin)
 def leader_edit(request: HttpRequest, user_id: int) -> HttpResponse | JsonResponse:
     leader = get_object_or_404(User, pk=user_id)
-    leaders_group = Group.objects.get(name="leaders")
     
-    if leader not in leaders_group.user_set.all():
+    if not is_leader(leader):
         return JsonResponse(
             {"error": "این کاربر یک لیدر نیست."},
             status=400,
@@ -382,6 +604,8 @@ def leader_edit(request: HttpRequest, user_id: int) -> HttpResponse | JsonRespon
         if password:
             leader.set_password(password)
         leader.save()
+        # نام لیدر در سند اشغال هم نمایش داده می‌شود
+        bump_version()
         
         return JsonResponse({"success": True}, status=200)
     
@@ -396,26 +620,28 @@ def leader_delete(request: HttpRequest, user_id: int) -> JsonResponse:
         return JsonResponse({"error": "درخواست نامعتبر است."}, status=400)
     
     leader = get_object_or_404(User, pk=user_id)
-    leaders_group = Group.objects.get(name="leaders")
     
-    if leader not in leaders_group.user_set.all():
+    if not is_leader(leader):
         return JsonResponse(
             {"error": "این کاربر یک لیدر نیست."},
             status=400,
         )
     
-    active_visits = BoothVisit.objects.filter(leader=leader, is_active=True)
-    booth_ids_to_update = set()
-    for visit in active_visits:
-        booth_ids_to_update.add(visit.booth_id)
-        visit.is_active = False
-        visit.exited_at = timezone.now()
-        visit.save()
-    
-    for booth_id in booth_ids_to_update:
-        _safe_broadcast_capacity_update(booth_id=booth_id)
-    
-    leader.delete()
+    dwell.estimator.warm()
+    with transaction.atomic():
+        closed_per_booth = get_admission_backend().close_visits(
+            BoothVisit.objects.filter(leader=leader, is_active=True)
+        )
+        _record_dwell(closed_per_booth)
+        left = waitlist.forget(leader.id)
+        leader.delete()
+        for booth in Booth.objects.filter(pk__in=list(closed_per_booth)):
+            _record_rollup(booth.id, exits=len(closed_per_booth[booth.id]))
+            _admit_waiting(booth)
+        transaction.on_commit(bump_version)
+
+    for booth_id in {*closed_per_booth, *left}:
+        _broadcast_capacity_update(booth_id=booth_id)
     
     return JsonResponse({"success": True}, status=200)
 
@@ -427,9 +653,8 @@ def leader_reset_password(request: HttpRequest, user_id: int) -> JsonResponse:
         return JsonResponse({"error": "درخواست نامعتبر است."}, status=400)
     
     leader = get_object_or_404(User, pk=user_id)
-    leaders_group = Group.objects.get(name="leaders")
     
-    if leader not in leaders_group.user_set.all():
+    if not is_leader(leader):
         return JsonResponse(
             {"error": "این کاربر یک لیدر نیست."},
             status=400,
@@ -462,18 +687,20 @@ def toggle_booth_check(request: HttpRequest, booth_id: int) -> JsonResponse:
     )
     check.is_checked = not check.is_checked
     check.save()
-    
+    _broadcast_leader_state(user_id=request.user.id)
+
     return JsonResponse({"success": True, "is_checked": check.is_checked})
 
 
 @login_required
-@user_passes_test(is_leader)
-def get_checked_booths(request: HttpRequest) -> JsonResponse:
+@user_passes_test(ais_leader)
+async def get_checked_booths(request: HttpRequest) -> JsonResponse:
+    user = await request.auser()
     checked = LeaderBoothStatus.objects.filter(
-        leader=request.user, is_checked=True
+        leader=user, is_checked=True
     ).values_list('booth_id', flat=True)
     
-    return JsonResponse({"checked_booth_ids": list(checked)})
+    return JsonResponse({"checked_booth_ids": [booth_id async for booth_id in checked]})
 
 
 @login_required
@@ -481,4 +708,23 @@ def get_checked_booths(request: HttpRequest) -> JsonResponse:
 @require_POST
 def reset_all_booth_checks(request: HttpRequest) -> JsonResponse:
     LeaderBoothStatus.objects.filter(leader=request.user).update(is_checked=False)
-    return JsonResponse({"success": True})
\ No newline at end of file
+    _broadcast_leader_state(user_id=request.user.id)
+    return JsonResponse({"success": True})
+
+
+# ========== متریک‌ها (Prometheus) ==========
+
+
+# با EXHIBITION_METRICS_TOKEN، scraper باید هدر Authorization: Bearer <token> بفرستد؛
+# بدون آن فقط ادمین نمایشگاه (با session) به این مسیر دسترسی دارد
+def metrics(request: HttpRequest) -> HttpResponse:
+    token = settings.EXHIBITION_METRICS_TOKEN
+    if token:
+        authorized = constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    else:
+        authorized = request.user.is_authenticated and is_exhibition_admin(request.user)
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,85 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, QuerySet
+
+from .admission import Outcome, get_admission_backend
+from .models import Booth, BoothVisit, BoothWaitlistEntry
+
+# ========== صف انتظار غرفه‌ها ==========
+# به جای تلاش‌های پیاپی برای ورود به غرفه‌ی پر (هر کدام یک تراکنش نوشتنی روی ردیف همان
+# غرفه) لیدر یک بار در صف FIFO غرفه ثبت می‌شود. هر جا اسلاتی آزاد شود (خروج، اخراج توسط
+# ادمین) admit_waiting در همان تراکنش نفرهای اول صف را وارد می‌کند.
+
+
+def _queue(booth_id: int) -> QuerySet:
+    return BoothWaitlistEntry.objects.filter(booth_id=booth_id).order_by("joined_at", "id")
+
+
+def _has_free_slot(booth_id: int) -> bool:
+    return Booth.objects.filter(pk=booth_id, current_visitors__lt=F("max_groups")).exists()
+
+
+def position(booth_id: int, user_id: int) -> int | None:
+    entry = (
+        BoothWaitlistEntry.objects.filter(booth_id=booth_id, leader_id=user_id)
+        .values("id", "joined_at")
+        .first()
+    )
+    if entry is None:
+        return None
+    ahead = _queue(booth_id).filter(
+        Q(joined_at__lt=entry["joined_at"]) | Q(joined_at=entry["joined_at"], id__lt=entry["id"])
+    )
+    return ahead.count() + 1
+
+
+def admit_waiting(booth: Booth) -> list[int]:
+    admitted: list[int] = []
+    backend = get_admission_backend()
+    while _has_free_slot(booth.id):
+        entry = _queue(booth.id).values_list("id", "leader_id").first()
+        if entry is None:
+            break
+        entry_id, user_id = entry
+        outcome = backend.enter(booth, user_id)
+        if outcome in (Outcome.FULL, Outcome.LOCK_TIMEOUT):
+            # اسلات را درخواست هم‌زمان دیگری گرفت؛ صف دست نمی‌خورد
+            break
+        # ALREADY_INSIDE: لیدر در این فاصله وارد غرفه‌ی دیگری شده و فقط از صف حذف می‌شود
+        BoothWaitlistEntry.objects.filter(pk=entry_id).delete()
+        if outcome is Outcome.ADMITTED:
+            admitted.append(user_id)
+    return admitted
+
+
+# بعد از join، admit_waiting در همان تراکنش اسلات خالی احتمالی را به صف می‌دهد.
+# در کنار نتیجه، غرفه‌هایی که لیدر از صفشان خارج شد برگردانده می‌شوند (طول صفشان تغییر کرده)
+def join(booth: Booth, user_id: int) -> tuple[Outcome, list[int]]:
+    if BoothVisit.objects.filter(leader_id=user_id, is_active=True).exists():
+        return Outcome.ALREADY_INSIDE, []
+
+    # صف غرفه‌ی قبلی جای خود را به این غرفه می‌دهد
+    left = forget(user_id, keep=booth.id)
+    try:
+        with transaction.atomic():
+            BoothWaitlistEntry.objects.get_or_create(booth=booth, leader_id=user_id)
+    except IntegrityError:
+        # درخواست هم‌زمان همین لیدر برای صف غرفه‌ی دیگری (برای همین غرفه get_or_create ردیف
+        # موجود را برمی‌گرداند)؛ قفل یا شلوغی نیست
+        return Outcome.ALREADY_WAITING, left
+    return Outcome.QUEUED, left
+
+
+def leave(booth_id: int, user_id: int) -> bool:
+    deleted, _ = BoothWaitlistEntry.objects.filter(booth_id=booth_id, leader_id=user_id).delete()
+    return bool(deleted)
+
+
+# لیدری که مستقیم وارد غرفه‌ای شد دیگر منتظر غرفه‌ی دیگری نیست؛ غرفه‌های آن صف‌ها برمی‌گردند
+def forget(user_id: int, keep: int | None = None) -> list[int]:
+    entries = BoothWaitlistEntry.objects.filter(leader_id=user_id)
+    if keep is not None:
+        entries = entries.exclude(booth_id=keep)
+    booth_ids = list(entries.values_list("booth_id", flat=True))
+    if booth_ids:
+        entries.filter(booth_id__in=booth_ids).delete()
+    return booth_ids
@@ -0,0 +1,111 @@
+import json
+import zlib
+from typing import Any
+
+import msgpack
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import Booth
+from .roles import LEADERS
+
+# زیرپروتکل باینری /ws/capacity/؛ کلاینت‌هایی که آن را اعلام نکنند همان JSON قبلی را می‌گیرند
+MSGPACK_SUBPROTOCOL = "exhibition.msgpack.v1"
+
+NAMES_CACHE_KEY = "exhibition:wire:names"
+NAMES_TIMEOUT = 3600
+
+
+# ========== دیکشنری نام‌ها ==========
+# نام همه‌ی غرفه‌ها و لیدرها یک بار در snapshot فرستاده می‌شود و پیام‌های بعدی فقط
+# شناسه‌ی عددی دارند. nv نسخه‌ی دیکشنری است؛ کلاینت با دیدن nv متفاوت resync می‌کند.
+
+
+def _build_names() -> dict[str, Any]:
+    booth_names = dict(Booth.objects.order_by("id").values_list("id", "name"))
+    leader_names = dict(
+        User.objects.filter(groups__name=LEADERS).order_by("id").values_list("id", "username")
+    )
+    digest = json.dumps([sorted(booth_names.items()), sorted(leader_names.items())])
+    return {
+        "nv": zlib.crc32(digest.encode()),
+        "booth_names": booth_names,
+        "leader_names": leader_names,
+    }
+
+
+def get_names() -> dict[str, Any]:
+    return cache.get_or_set(NAMES_CACHE_KEY, _build_names, timeout=NAMES_TIMEOUT)
+
+
+def invalidate_names() -> None:
+    cache.delete(NAMES_CACHE_KEY)
+
+
+# ========== کدگذاری ==========
+
+
+# در قالب فشرده هر غرفه فقط [id, max_groups, occupied, [leader_id, ...], waiting, wait_seconds] است
+def compact_booth(booth: dict[str, Any]) -> list[Any]:
+    return [
+        booth["id"],
+        booth["max_groups"],
+        booth["occupied"],
+        [leader["id"] for leader in booth["leaders"]],
+        booth["waiting"],
+        booth.get("wait_seconds"),
+    ]
+
+
+def encode_json(message: dict[str, Any]) -> str:
+    return json.dumps(message)
+
+
+def encode_msgpack(message: dict[str, Any]) -> bytes:
+    return msgpack.packb(message, use_bin_type=True)
+
+
+def encode_snapshot(seq: int, booths: list[dict[str, Any]], binary: bool) -> str | bytes:
+    if not binary:
+        return encode_json({"type": "capacity.snapshot", "seq": seq, "booths": booths})
+    return encode_msgpack(
+        {
+            "type": "capacity.snapshot",
+            "seq": seq,
+            **get_names(),
+            "booths": [compact_booth(booth) for booth in booths],
+        }
+    )
+
+
+# since فقط در پیام جبرانی کلاینت کند می‌آید: این پیام همه‌ی تغییرات بعد از since تا seq را
+# (فقط آخرین وضعیت هر غرفه) یکجا دارد و کلاینت نباید فاصله‌ی seq را از دست رفتن پیام بداند
+def encode_update(
+    seq: int,
+    booths: list[dict[str, Any]],
+    binary: bool,
+    since: int | None = None,
+    nv: int | None = None,
+) -> str | bytes:
+    message: dict[str, Any] = {"type": "capacity.update", "seq": seq}
+    if since is not None:
+        message["since"] = since
+    if not binary:
+        return encode_json({**message, "booths": booths})
+    return encode_msgpack(
+        {
+            **message,
+            "nv": get_names()["nv"] if nv is None else nv,
+            "booths": [compact_booth(booth) for booth in booths],
+        }
+    )
+
+
+# فریم‌های هر broadcast یک بار (در BroadcastDispatcher) ساخته و بین همه‌ی گیرنده‌ها تقسیم می‌شوند
+def update_frames(seq: int, booths: list[dict[str, Any]]) -> dict[str, Any]:
+    nv = get_names()["nv"]
+    return {
+        "nv": nv,
+        "text": encode_update(seq, booths, binary=False),
+        "bytes": encode_update(seq, booths, binary=True, nv=nv),
+    }
@@ -0,0 +1,183 @@
+// قالب فشرده‌ی msgpack برای /ws/capacity/ (زیرپروتکل exhibition.msgpack.v1)
+// پیام‌ها بعد از decode به همان شکل JSON قبلی برگردانده می‌شوند تا کد داشبوردها عوض نشود.
+(function () {
+  const PROTOCOL = "exhibition.msgpack.v1";
+  const utf8 = new TextDecoder();
+
+  // ========== decoder حداقلی msgpack ==========
+  function decodeMsgpack(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const view = new DataView(buffer);
+    let offset = 0;
+
+    function str(length) {
+      const value = utf8.decode(bytes.subarray(offset, offset + length));
+      offset += length;
+      return value;
+    }
+    function bin(length) {
+      const value = bytes.slice(offset, offset + length);
+      offset += length;
+      return value;
+    }
+    function array(length) {
+      const value = new Array(length);
+      for (let i = 0; i < length; i++) value[i] = read();
+      return value;
+    }
+    function map(length) {
+      const value = {};
+      for (let i = 0; i < length; i++) {
+        const key = read();
+        value[key] = read();
+      }
+      return value;
+    }
+    function u8() { return bytes[offset++]; }
+    function u16() { const v = view.getUint16(offset); offset += 2; return v; }
+    function u32() { const v = view.getUint32(offset); offset += 4; return v; }
+
+    function read() {
+      const type = u8();
+      if (type <= 0x7f) return type;
+      if (type <= 0x8f) return map(type & 0x0f);
+      if (type <= 0x9f) return array(type & 0x0f);
+      if (type <= 0xbf) return str(type & 0x1f);
+      if (type >= 0xe0) return type - 0x100;
+      let value;
+      switch (type) {
+        case 0xc0: return null;
+        case 0xc2: return false;
+        case 0xc3: return true;
+        case 0xc4: return bin(u8());
+        case 0xc5: return bin(u16());
+        case 0xc6: return bin(u32());
+        case 0xca: value = view.getFloat32(offset); offset += 4; return value;
+        case 0xcb: value = view.getFloat64(offset); offset += 8; return value;
+        case 0xcc: return u8();
+        case 0xcd: return u16();
+        case 0xce: return u32();
+        case 0xcf: value = Number(view.getBigUint64(offset)); offset += 8; return value;
+        case 0xd0: value = view.getInt8(offset); offset += 1; return value;
+        case 0xd1: value = view.getInt16(offset); offset += 2; return value;
+        case 0xd2: value = view.getInt32(offset); offset += 4; return value;
+        case 0xd3: value = Number(view.getBigInt64(offset)); offset += 8; return value;
+        case 0xd9: return str(u8());
+        case 0xda: return str(u16());
+        case 0xdb: return str(u32());
+        case 0xdc: return array(u16());
+        case 0xdd: return array(u32());
+        case 0xde: return map(u16());
+        case 0xdf: return map(u32());
+      }
+      throw new Error(`msgpack type 0x${type.toString(16)} پشتیبانی نمی‌شود`);
+    }
+
+    return read();
+  }
+
+  // ========== تبدیل قالب فشرده به قالب JSON ==========
+  function createDecoder() {
+    let names = null;
+
+    function expandBooth(row) {
+      const [id, maxGroups, occupied, leaderIds, waiting, waitSeconds] = row;
+      return {
+        id: id,
+        name: names.booth_names[id] || `#${id}`,
+        max_groups: maxGroups,
+        occupied: occupied,
+        remaining: Math.max(maxGroups - occupied, 0),
+        waiting: waiting || 0,
+        wait_seconds: waitSeconds === undefined ? null : waitSeconds,
+        leaders: leaderIds.map((leaderId) => ({
+          id: leaderId,
+          username: names.leader_names[leaderId] || `#${leaderId}`,
+        })),
+      };
+    }
+
+    // خروجی null یعنی دیکشنری نام‌ها کهنه است و باید resync شود
+    function decode(data) {
+      if (typeof data === "string") return JSON.parse(data);
+
+      const message = decodeMsgpack(data);
+      if (message.type === "capacity.snapshot") {
+        names = { nv: message.nv, booth_names: message.booth_names, leader_names: message.leader_names };
+        return { type: message.type, seq: message.seq, booths: message.booths.map(expandBooth) };
+      }
+      if (message.type === "capacity.update") {
+        if (names === null || message.nv !== names.nv) return null;
+        const update = { type: message.type, seq: message.seq, booths: message.booths.map(expandBooth) };
+        if (message.since !== undefined) update.since = message.since;
+        return update;
+      }
+      return message;
+    }
+
+    return { decode: decode };
+  }
+
+  // ========== کنترل جریان ==========
+  // سرور بدون ack بیش از چند فریم capacity نمی‌فرستد و اتصال بی‌پاسخ به ping را می‌بندد.
+  // ack ها با تاخیر کوتاه تجمیع می‌شوند تا برای هر پیام یک فریم برنگردد.
+  // هر فریم capacity رسیده ack می‌شود، حتی اگر به خاطر فاصله در seq اعمال نشود؛ وگرنه window
+  // سرور پر می‌ماند و اتصال به جای resync بسته می‌شود. تا رسیدن snapshot فقط یک resync می‌رود.
+  const ACK_DELAY = 50;
+
+  function createFlowControl(ws) {
+    let ackTimer = null;
+    let ackSeq = null;
+    let resyncing = false;
+
+    function send(message) {
+      if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify(message));
+    }
+
+    function handled(seq) {
+      ackSeq = seq;
+      if (ackTimer) return;
+      ackTimer = setTimeout(function () {
+        ackTimer = null;
+        send({ type: "ack", seq: ackSeq });
+      }, ACK_DELAY);
+    }
+
+    return {
+      handled: handled,
+      resync() {
+        if (resyncing) return;
+        resyncing = true;
+        send({ type: "resync" });
+      },
+      synced(seq) {
+        resyncing = false;
+        handled(seq);
+      },
+      pong() {
+        send({ type: "pong" });
+      },
+    };
+  }
+
+  // پیام جبرانی (since) همه‌ی تغییرات بعد از since را یکجا دارد؛ در غیر این صورت seq باید پشت سر هم باشد
+  function isGap(message, lastSeq) {
+    const previous = message.since !== undefined ? message.since : message.seq - 1;
+    return previous > lastSeq;
+  }
+
+  function open(url) {
+    const ws = new WebSocket(url, [PROTOCOL]);
+    ws.binaryType = "arraybuffer";
+    return ws;
+  }
+
+  window.CapacityWire = {
+    PROTOCOL: PROTOCOL,
+    open: open,
+    createDecoder: createDecoder,
+    createFlowControl: createFlowControl,
+    isGap: isGap,
+    decodeMsgpack: decodeMsgpack,
+  };
+})();